@@ -45,10 +45,15 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     "django.middleware.security.SecurityMiddleware",
+    "reservasi.middleware.PrecompressedStaticMiddleware",
+    "reservasi.middleware.BranchMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "reservasi.middleware.ProfilerMiddleware",
+    "reservasi.middleware.LoadSheddingMiddleware",
+    "reservasi.middleware.RateLimitMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -84,6 +89,19 @@ DATABASES = {
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# LocMem cukup untuk satu proses; untuk beberapa worker gunakan backend bersama
+# (Redis/Memcached) agar invalidasi katalog terlihat di semua proses.
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "resresto",
+    }
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
 
@@ -122,11 +140,64 @@ STATIC_URL = 'static/'
 STATICFILES_DIRS = [
     BASE_DIR / "static",
 ]
+# Hasil `manage.py collectstatic`: nama file ber-hash + varian .gz/.br,
+# dilayani oleh reservasi.middleware.PrecompressedStaticMiddleware
+STATIC_ROOT = BASE_DIR / "staticfiles"
+
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "reservasi.storage.CompressedManifestStaticFilesStorage",
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
+# Email notifikasi (dikirim oleh `manage.py process_outbox`).
+# Console backend untuk pengembangan; ganti ke SMTP di produksi.
+EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
+DEFAULT_FROM_EMAIL = "ResResto <no-reply@resresto.local>"
+
+# Rate limit endpoint publik (token bucket di cache; rate = token per detik)
+RESERVASI_RATE_LIMITS = {
+    'reservasi:ajax_get_time_slots': {'rate': 2, 'burst': 20},
+    'reservasi:ajax_suggest_slots': {'rate': 1, 'burst': 10},
+    # Setiap koneksi SSE menahan satu task ASGI; halaman booking cukup satu per tanggal
+    'reservasi:slot_events': {'rate': 0.2, 'burst': 10},
+    'reservasi:create_reservation': {'rate': 0.2, 'burst': 5, 'methods': ['POST']},
+}
+RESERVASI_TRUST_X_FORWARDED_FOR = False
+
+# Mode degradasi saat latensi database naik (lihat reservasi/load.py)
+RESERVASI_LOAD_SHEDDING = {
+    'DB_LATENCY_THRESHOLD_MS': 250,
+    'COOLDOWN_SECONDS': 30,
+}
+
+# Broker pub/sub untuk push ketersediaan slot (SSE). InProcessBroker hanya
+# menjangkau satu proses; untuk banyak worker gunakan 'reservasi.events.RedisBroker'
+# dan isi RESERVASI_EVENT_BROKER_URL.
+RESERVASI_EVENT_BROKER = 'reservasi.events.InProcessBroker'
+
+# Profiler request (lihat reservasi/profiler.py). Mati secara bawaan; staf tetap
+# bisa memprofil satu request dengan ?_profile=1. Hasil: admin "Profil Request".
+RESERVASI_PROFILER = {
+    'SAMPLE_RATE': 0.0,
+    'MAX_RECORDS': 500,
+}
+
+# Slug cabang untuk request yang host/prefix URL-nya tidak cocok dengan cabang
+# mana pun (lihat reservasi.middleware.BranchMiddleware). None = cabang pertama.
+RESERVASI_DEFAULT_BRANCH = None
+
+# Kode negara untuk nomor telepon lokal (0812...) saat dinormalisasi ke E.164
+# pada profil tamu (lihat reservasi/guests.py)
+RESERVASI_DEFAULT_COUNTRY_CODE = '62'
+
 LOGIN_REDIRECT_URL = 'reservasi:home' # Atau 'reservasi:my_reservations'
 LOGOUT_REDIRECT_URL = 'reservasi:home'
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ResResto.settings")
 
 application = get_wsgi_application()
+
+# Warm-up opsional (RESRESTO_WARMUP=1): kompilasi template, isi resolver URL
+# dan cache katalog/slot sebelum request pertama. Lihat reservasi/warmup.py.
+from reservasi.warmup import run_if_enabled  # noqa: E402
+
+run_if_enabled()
@@ -1,40 +1,84 @@
-from django.contrib import admin
-from .models import RestaurantProfile, Reservation, Room, FoodPackage # TAMBAHKAN Room & FoodPackage
+from django.contrib import admin, messages
+from django.http import HttpResponseRedirect
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html, format_html_join
+from .models import RestaurantProfile, Reservation, ReservationConflict, Room, FoodPackage, GuestProfile, OutboxMessage, ProfiledRequest, ReservationChange, ScheduleException # TAMBAHKAN Room & FoodPackage
+from .search import search_reservations
+from .forms import CONFLICT_MESSAGE, ReservationAdminForm
+from .services import bulk_set_status, NOTIFIED_STATUSES
+from . import guests, notifications
 
 # ===================================================================
-# ADMIN UNTUK MODEL LAMA: RestaurantProfile (Tidak ada perubahan)
+# ADMIN UNTUK MODEL LAMA: RestaurantProfile (satu baris per cabang)
 # ===================================================================
 @admin.register(RestaurantProfile)
 class RestaurantProfileAdmin(admin.ModelAdmin):
-    list_display = ('name', 'opening_time', 'closing_time', 'max_guests_per_slot')
-    
-    # Mencegah penambahan lebih dari satu profil restoran
-    def has_add_permission(self, request):
-        return not RestaurantProfile.objects.exists()
+    list_display = ('name', 'slug', 'host', 'opening_time', 'closing_time', 'max_guests_per_slot', 'forecast_link')
+    search_fields = ('name', 'slug', 'host')
+    prepopulated_fields = {'slug': ('name',)}
+
+    def get_urls(self):
+        return [
+            path('<path:object_id>/prakiraan/', self.admin_site.admin_view(self.forecast_view), name='reservasi_restaurantprofile_forecast'),
+        ] + super().get_urls()
+
+    def forecast_link(self, obj):
+        return format_html('<a href="{}">Lihat</a>', reverse('admin:reservasi_restaurantprofile_forecast', args=[obj.pk]))
+    forecast_link.short_description = "Prakiraan Okupansi"
+
+    def forecast_view(self, request, object_id):
+        # NumPy baru diimpor saat halaman ini dibuka agar tidak memperlambat start worker
+        from . import forecast
+
+        profile = get_object_or_404(RestaurantProfile, pk=object_id)
+        if not self.has_view_permission(request, profile):
+            raise PermissionDenied
+        result = forecast.forecast_branch(profile)
+        return TemplateResponse(request, 'admin/reservasi/restaurantprofile/forecast.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'original': profile,
+            'title': f"Prakiraan okupansi {profile.name}",
+            'forecast': result,
+            'tables': forecast.forecast_tables(result),
+            'slots': [slot.strftime('%H:%M') for slot in result.grid],
+        })
+
+
+class BranchScopedAdmin(admin.ModelAdmin):
+    """Cabang tidak bisa dipindah setelah dibuat: cache katalog diberi versi per cabang."""
+    def get_readonly_fields(self, request, obj=None):
+        readonly = tuple(super().get_readonly_fields(request, obj))
+        return readonly + ('restaurant',) if obj else readonly
 
 # ===================================================================
 # ADMIN UNTUK MODEL BARU: Room
 # ===================================================================
 @admin.register(Room)
-class RoomAdmin(admin.ModelAdmin):
+class RoomAdmin(BranchScopedAdmin):
     """
     Konfigurasi panel admin untuk mengelola Ruangan.
     Memungkinkan admin untuk menambah, mengubah, dan menghapus ruangan.
     """
-    list_display = ('name', 'capacity', 'description')
+    list_display = ('name', 'restaurant', 'capacity', 'default_duration_minutes', 'description')
+    list_filter = ('restaurant',)
     search_fields = ('name',)
-    ordering = ('name',)
+    ordering = ('restaurant', 'name')
 
 # ===================================================================
 # ADMIN UNTUK MODEL BARU: FoodPackage
 # ===================================================================
 @admin.register(FoodPackage)
-class FoodPackageAdmin(admin.ModelAdmin):
+class FoodPackageAdmin(BranchScopedAdmin):
     """
     Konfigurasi panel admin untuk mengelola Paket Makanan.
     Memungkinkan admin untuk menambah, mengubah, dan menghapus paket.
     """
-    list_display = ('name', 'price', 'description')
+    list_display = ('name', 'restaurant', 'price', 'default_duration_minutes', 'description')
+    list_filter = ('restaurant',)
     search_fields = ('name',)
     ordering = ('price',)
     
@@ -48,6 +92,32 @@ class FoodPackageAdmin(admin.ModelAdmin):
     # Contoh: list_display = ('name', 'price_formatted', 'description')
 
 
+# ===================================================================
+# ADMIN UNTUK MODEL BARU: ScheduleException
+# ===================================================================
+@admin.register(ScheduleException)
+class ScheduleExceptionAdmin(admin.ModelAdmin):
+    """
+    Libur, jam khusus dan penutupan ruangan. Perubahan langsung berlaku
+    karena kalender yang dikompilasi ikut versi cache katalog cabang.
+    """
+    list_display = ('name', 'restaurant', 'room', 'start_date', 'end_date', 'recurrence', 'is_closed', 'opening_time', 'closing_time')
+    list_filter = ('restaurant', 'recurrence', 'is_closed')
+    search_fields = ('name',)
+    list_select_related = ('restaurant', 'room')
+    fieldsets = (
+        (None, {
+            'fields': ('restaurant', 'room', 'name')
+        }),
+        ('Berlaku', {
+            'fields': (('start_date', 'end_date'), 'recurrence')
+        }),
+        ('Jam', {
+            'fields': ('is_closed', ('opening_time', 'closing_time'), 'slot_interval_minutes')
+        }),
+    )
+
+
 # ===================================================================
 # ADMIN UNTUK MODEL LAMA YANG DIMODIFIKASI: Reservation
 # ===================================================================
@@ -60,48 +130,224 @@ class ReservationAdmin(admin.ModelAdmin):
     # Menambahkan 'room_type' dan 'food_package' ke list_display agar terlihat di tabel
     list_display = (
         'guest_name', 
+        'restaurant',
         'reservation_date', 
         'reservation_time', 
         'room_type',  # <-- Ditambahkan
         'number_of_guests',
         'food_package',  # <-- Ditambahkan
         'status', 
+        'guest_history',
         'created_at'
     )
     
     # Menambahkan 'room_type' ke filter agar bisa menyaring reservasi per ruangan
-    list_filter = ('status', 'reservation_date', 'room_type')
+    list_filter = ('restaurant', 'status', 'reservation_date', 'room_type')
+    list_select_related = ('restaurant', 'room_type', 'food_package', 'guest')
     
-    # Search fields tidak perlu diubah, tapi bisa ditambahkan jika ingin mencari berdasarkan nama ruangan
+    # search_fields tetap diisi agar kotak pencarian tampil; pencariannya sendiri
+    # memakai indeks FTS5 di get_search_results (lihat reservasi/search.py)
     search_fields = ('guest_name', 'guest_email', 'guest_phone', 'room_type__name')
     
+    form = ReservationAdminForm
+
     # Actions tetap sama
-    actions = ['confirm_reservations', 'cancel_reservations', 'mark_as_waitlisted']
+    actions = ['confirm_reservations', 'cancel_reservations', 'mark_as_waitlisted', 'mark_as_no_show']
 
     # Membuat field-field tertentu read-only di halaman detail admin untuk mencegah perubahan tidak sengaja
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'guest_history')
 
     # Mengelompokkan field di halaman edit/tambah agar lebih rapi
     fieldsets = (
         ('Detail Pemesan', {
-            'fields': ('user', ('guest_name', 'guest_email', 'guest_phone'))
+            'fields': ('user', ('guest_name', 'guest_email', 'guest_phone'), 'guest_history')
         }),
         ('Detail Reservasi', {
-            'fields': (('reservation_date', 'reservation_time'), ('room_type', 'number_of_guests'), 'food_package', 'special_requests')
+            'fields': ('restaurant', ('reservation_date', 'reservation_time'), ('room_type', 'number_of_guests'), ('food_package', 'duration_minutes'), 'special_requests')
         }),
         ('Status', {
-            'fields': ('status', ('created_at', 'updated_at'))
+            'fields': ('status', ('created_at', 'updated_at'), 'expected_version')
         }),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        # Ganti LIKE '%...%' di banyak kolom dengan pencarian awalan lewat FTS5
+        return search_reservations(queryset, search_term), False
+
+    def changeform_view(self, request, object_id=None, form_url='', extra_context=None):
+        try:
+            return super().changeform_view(request, object_id, form_url, extra_context)
+        except ReservationConflict:
+            # Transaksi changeform_view sudah dibatalkan; buka ulang dengan data terbaru
+            self.message_user(request, CONFLICT_MESSAGE, messages.ERROR)
+            return HttpResponseRedirect(request.path)
+
+    def save_model(self, request, obj, form, change):
+        expected = form.cleaned_data.get('expected_version')
+        if change and expected is not None:
+            obj.version = expected
+        super().save_model(request, obj, form, change)
+        # changeform_view sudah berjalan dalam transaksi, jadi notifikasi
+        # tersimpan atomik bersama perubahan statusnya
+        if 'status' in form.changed_data and obj.status in NOTIFIED_STATUSES:
+            notifications.enqueue(obj, obj.status)
+
+    # Aksi massal lewat bulk_set_status: satu transaksi + notifikasi ke tamu
+    def set_status(self, request, queryset, status):
+        conflicts = []
+        bulk_set_status(queryset, status, conflicts=conflicts)
+        if conflicts:
+            self.message_user(
+                request,
+                f"{len(conflicts)} reservasi dilewati karena baru saja diubah pihak lain: "
+                + ", ".join(f"#{pk}" for pk in conflicts) + ". Periksa lalu ulangi aksinya.",
+                messages.WARNING,
+            )
+
     def confirm_reservations(self, request, queryset):
-        queryset.update(status='CONFIRMED')
+        self.set_status(request, queryset, 'CONFIRMED')
     confirm_reservations.short_description = "Tandai sebagai Dikonfirmasi"
 
     def cancel_reservations(self, request, queryset):
-        queryset.update(status='CANCELLED')
+        self.set_status(request, queryset, 'CANCELLED')
     cancel_reservations.short_description = "Tandai sebagai Dibatalkan"
 
     def mark_as_waitlisted(self, request, queryset):
-        queryset.update(status='WAITLISTED')
-    mark_as_waitlisted.short_description = "Masukkan ke Waiting List"
\ No newline at end of file
+        self.set_status(request, queryset, 'WAITLISTED')
+    mark_as_waitlisted.short_description = "Masukkan ke Waiting List"
+
+    def mark_as_no_show(self, request, queryset):
+        self.set_status(request, queryset, 'NO_SHOW')
+    mark_as_no_show.short_description = "Tandai sebagai No-Show"
+
+    # Riwayat tamu dari profilnya (sudah ikut di-join lewat list_select_related)
+    def guest_history(self, obj):
+        guest = obj.guest
+        if guest is None:
+            return "-"
+        return f"{guest.visit_count} kunjungan, no-show {guest.no_show_rate:.0%}"
+    guest_history.short_description = "Riwayat Tamu"
+
+
+# ===================================================================
+# ADMIN UNTUK MODEL BARU: GuestProfile
+# ===================================================================
+@admin.register(GuestProfile)
+class GuestProfileAdmin(admin.ModelAdmin):
+    """
+    Profil tamu dibuat otomatis dari reservasi (dan perintah backfill_guests).
+    Pencarian email/telepon dinormalisasi dulu lalu memakai index unik.
+    """
+    list_display = ('name', 'email_key', 'phone_key', 'reservation_count', 'visit_count', 'no_show_count', 'no_show_rate_display', 'last_visit_date')
+    search_fields = ('name', 'email_key', 'phone_key')
+    readonly_fields = ('email_key', 'phone_key', 'reservation_count', 'visit_count', 'no_show_count', 'last_visit_date', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_search_results(self, request, queryset, search_term):
+        guest = guests.find_guest(search_term, search_term)
+        if guest is not None:
+            return queryset.filter(pk=guest.pk), False
+        return super().get_search_results(request, queryset, search_term)
+
+    def no_show_rate_display(self, obj):
+        return f"{obj.no_show_rate:.0%}"
+    no_show_rate_display.short_description = "Tingkat No-Show"
+
+
+# ===================================================================
+# ADMIN UNTUK MODEL BARU: OutboxMessage (hanya-baca)
+# ===================================================================
+@admin.register(OutboxMessage)
+class OutboxMessageAdmin(admin.ModelAdmin):
+    """
+    Memantau antrian notifikasi. Pesan dibuat otomatis oleh aplikasi dan
+    dikirim oleh perintah `process_outbox`, jadi tidak bisa ditambah manual.
+    """
+    list_display = ('kind', 'recipient', 'status', 'attempts', 'available_at', 'sent_at')
+    list_filter = ('status', 'kind')
+    search_fields = ('recipient',)
+    list_select_related = ('reservation',)
+    raw_id_fields = ('reservation',)
+    readonly_fields = ('reservation', 'kind', 'recipient', 'attempts', 'sent_at', 'last_error', 'created_at')
+
+    def has_add_permission(self, request):
+        return False
+
+
+# ===================================================================
+# ADMIN UNTUK MODEL BARU: ReservationChange (hanya-baca)
+# ===================================================================
+@admin.register(ReservationChange)
+class ReservationChangeAdmin(admin.ModelAdmin):
+    """Log perubahan bersifat append-only: tidak bisa ditambah, diubah, atau dihapus."""
+    list_display = ('seq', 'kind', 'reservation_id', 'restaurant_id', 'changed_fields', 'created_at')
+    list_filter = ('kind',)
+    search_fields = ('=reservation_id',)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+# ===================================================================
+# ADMIN UNTUK MODEL BARU: ProfiledRequest (hanya-baca)
+# ===================================================================
+@admin.register(ProfiledRequest)
+class ProfiledRequestAdmin(admin.ModelAdmin):
+    """
+    Request yang disampel ProfilerMiddleware, yang paling lambat lebih dulu. Halaman
+    detail menampilkan fungsi terpanas dan query terlama. Boleh dihapus,
+    tetapi tidak bisa ditambah atau diubah.
+    """
+    list_display = ('path', 'view_name', 'method', 'status_code', 'duration_ms', 'query_count', 'query_ms', 'top_function', 'sampled_by', 'created_at')
+    list_filter = ('sampled_by', 'method', 'view_name')
+    search_fields = ('path', 'view_name')
+    date_hierarchy = 'created_at'
+    fields = (
+        ('method', 'path'), ('view_name', 'status_code'), ('user_id', 'sampled_by', 'created_at'),
+        ('duration_ms', 'query_count', 'query_ms'), 'hot_functions', 'slow_queries',
+    )
+    readonly_fields = ('hot_functions', 'slow_queries')
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def top_function(self, obj):
+        # Waktu di fungsi itu sendiri (tottime) paling menunjuk ke sumber lambatnya
+        if not obj.functions:
+            return "-"
+        hottest = max(obj.functions, key=lambda row: row['tottime_ms'])
+        return f"{hottest['function']} ({hottest['tottime_ms']:.1f} ms)"
+    top_function.short_description = "Fungsi Terpanas"
+
+    def hot_functions(self, obj):
+        if not obj.functions:
+            return "-"
+        return format_html(
+            '<table><thead><tr><th>Fungsi</th><th>Panggilan</th><th>tottime (ms)</th><th>cumtime (ms)</th></tr></thead><tbody>{}</tbody></table>',
+            format_html_join('', '<tr><td><code>{}</code></td><td>{}</td><td>{}</td><td>{}</td></tr>', (
+                (row['function'], row['calls'], f"{row['tottime_ms']:.2f}", f"{row['cumtime_ms']:.2f}") for row in obj.functions
+            )),
+        )
+    hot_functions.short_description = "Fungsi Terpanas (urut cumtime)"
+
+    def slow_queries(self, obj):
+        if not obj.queries:
+            return "-"
+        return format_html(
+            '<table><thead><tr><th>SQL</th><th>Jumlah</th><th>Total (ms)</th></tr></thead><tbody>{}</tbody></table>',
+            format_html_join('', '<tr><td><code>{}</code></td><td>{}</td><td>{}</td></tr>', (
+                (row['sql'], row['count'], f"{row['total_ms']:.2f}") for row in obj.queries
+            )),
+        )
+    slow_queries.short_description = "Query Terlama"
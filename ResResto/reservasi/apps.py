@@ -4,3 +4,7 @@ from django.apps import AppConfig # type: ignore
 class ReservasiConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "reservasi"
+
+    def ready(self):
+        # Daftarkan receiver signals (invalidasi cache, dll.)
+        from . import signals  # noqa: F401
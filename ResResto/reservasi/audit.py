@@ -0,0 +1,120 @@
+from itertools import groupby
+
+from . import catalog
+from .models import Reservation
+from .occupancy import ACTIVE_STATUSES, build_slot_grid, slot_span
+from .schedule import effective_hours
+
+# Kolom yang dibaca per reservasi; sengaja values_list agar tidak membuat objek model
+AUDIT_FIELDS = (
+    'restaurant_id', 'reservation_date', 'room_type_id', 'reservation_time',
+    'duration_minutes', 'number_of_guests', 'created_at', 'id',
+)
+
+
+# ===================================================================
+# AUDIT KAPASITAS: satu lintasan, memori sebatas satu hari satu cabang
+# ===================================================================
+def stream_branch_days(queryset, chunk_size=2000):
+    """
+    Membaca reservasi aktif dengan urutan index reservasi_branch_date_idx
+    (cabang, tanggal) lewat iterator server-side, lalu menghasilkan
+    ((restaurant_id, tanggal), [baris...]) satu hari-cabang sekaligus.
+    """
+    rows = (
+        queryset.filter(status__in=ACTIVE_STATUSES)
+        .order_by('restaurant_id', 'reservation_date')
+        .values_list(*AUDIT_FIELDS)
+        .iterator(chunk_size=chunk_size)
+    )
+    for key, day_rows in groupby(rows, key=lambda row: (row[0], row[1])):
+        yield key, list(day_rows)
+
+
+def audit_room_day(rows, capacity, hours):
+    """
+    Memeriksa reservasi satu ruangan pada satu hari terhadap `capacity`.
+    Reservasi diterima sesuai urutan dibuat; reservasi yang membuat salah satu
+    slot yang dilewatinya melebihi kapasitas dianggap kelebihan, sehingga yang
+    dipindah selalu booking terbaru.
+
+    Mengembalikan (slot_penuh, id_kelebihan) dengan slot_penuh berisi
+    (waktu, jumlah_tamu) untuk setiap slot yang okupansinya melebihi kapasitas.
+    """
+    grid = build_slot_grid(hours.opening_time, hours.closing_time, hours.interval_minutes)
+    n_slots = len(grid)
+    if not n_slots:
+        return [], []
+
+    # Okupansi total (untuk laporan) lewat array selisih + prefix sum
+    diff = [0] * (n_slots + 1)
+    spans = []
+    for row in rows:
+        i0, i1 = slot_span(hours.opening_time, hours.interval_minutes, n_slots, row[3], row[4])
+        spans.append((i0, i1))
+        if i1 > i0:
+            diff[i0] += row[5]
+            diff[i1] -= row[5]
+    overbooked, running = [], 0
+    for i in range(n_slots):
+        running += diff[i]
+        if running > capacity:
+            overbooked.append((grid[i], running))
+    if not overbooked:
+        return [], []
+
+    # Penerimaan serakah sesuai urutan dibuat (created_at, id)
+    accepted = [0] * n_slots
+    excess = []
+    for row, (i0, i1) in sorted(zip(rows, spans), key=lambda item: (item[0][6], item[0][7])):
+        guests = row[5]
+        if i1 > i0 and max(accepted[i0:i1]) + guests > capacity:
+            excess.append(row[7])
+            continue
+        for i in range(i0, i1):
+            accepted[i] += guests
+    return overbooked, excess
+
+
+def audit(queryset=None, chunk_size=2000, stats=None):
+    """
+    Menghasilkan satu temuan (dict) untuk setiap ruangan-hari yang kelebihan
+    kapasitas atau memiliki reservasi aktif pada hari/ruangan yang tutup.
+    Jika `stats` (dict) diberikan, jumlah baris dan hari-cabang yang dipindai
+    dicatat di sana.
+    """
+    queryset = Reservation.objects.all() if queryset is None else queryset
+    stats = {} if stats is None else stats
+    stats.update(scanned=0, branch_days=0)
+    for (restaurant_id, date), day_rows in stream_branch_days(queryset, chunk_size):
+        stats['branch_days'] += 1
+        stats['scanned'] += len(day_rows)
+        profile = catalog.get_profile(restaurant_id)
+        rooms = {room.id: room for room in catalog.get_rooms(restaurant_id)}
+        by_room = {}
+        for row in day_rows:
+            if row[2] is not None:
+                by_room.setdefault(row[2], []).append(row)
+
+        for room_id, rows in sorted(by_room.items()):
+            room = rooms.get(room_id)
+            if room is None or profile is None:
+                continue
+            finding = {
+                'restaurant': profile.slug,
+                'date': date.strftime('%Y-%m-%d'),
+                'room_id': room_id,
+                'room': room.name,
+                'capacity': room.capacity,
+            }
+            hours = effective_hours(profile, date, room_id)
+            if hours.is_closed:
+                yield dict(finding, closed=hours.reason, reservation_ids=[row[7] for row in rows])
+                continue
+            overbooked, excess = audit_room_day(rows, room.capacity, hours)
+            if overbooked:
+                yield dict(
+                    finding,
+                    slots=[{'time': slot.strftime('%H:%M'), 'guests': guests} for slot, guests in overbooked],
+                    excess_reservation_ids=excess,
+                )
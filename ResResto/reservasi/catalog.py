@@ -0,0 +1,147 @@
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Room, FoodPackage, RestaurantProfile
+from .schedule import compile_calendar
+
+# Kunci versi: dinaikkan oleh signals setiap kali data katalog/profil berubah.
+# Semua entri cache lain memuat nomor versi di kuncinya, jadi menaikkan versi
+# sama dengan membuang seluruh entri lama tanpa perlu menghapusnya satu per satu.
+# Katalog diberi versi per cabang (lihat catalog_version_key), sedangkan daftar
+# profil/cabang dibaca bersama oleh BranchMiddleware sehingga versinya global.
+CATALOG_VERSION_KEY = 'reservasi:{restaurant_id}:catalog:version'
+PROFILE_VERSION_KEY = 'reservasi:profile:version'
+
+# Salinan per-proses agar pembacaan berulang dalam satu versi tidak perlu
+# unpickle dari cache lagi. Isinya otomatis usang begitu versinya naik.
+_local = {}
+
+
+# ===================================================================
+# VERSI CACHE
+# ===================================================================
+def _get_version(key):
+    version = cache.get(key)
+    if version is None:
+        # Mulai dari timestamp supaya tidak bentrok dengan entri lama di cache
+        # bersama jika kunci versinya sempat hilang (restart/eviction).
+        cache.add(key, int(time.time()), timeout=None)
+        version = cache.get(key)
+    return version
+
+
+def _bump_version(key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, int(time.time()), timeout=None)
+
+
+def catalog_version_key(restaurant_id):
+    return CATALOG_VERSION_KEY.format(restaurant_id=restaurant_id)
+
+
+def get_catalog_version(restaurant_id):
+    return _get_version(catalog_version_key(restaurant_id))
+
+
+def get_profile_version():
+    return _get_version(PROFILE_VERSION_KEY)
+
+
+def bump_catalog_version(restaurant_id):
+    _bump_version(catalog_version_key(restaurant_id))
+
+
+def bump_profile_version():
+    _bump_version(PROFILE_VERSION_KEY)
+
+
+def page_cache_version(restaurant_id):
+    """
+    Cabang + versi katalog cabang + versi profil, dipakai sebagai kunci
+    {% cache %} di template sehingga fragmen tiap cabang terpisah.
+    """
+    return f"{restaurant_id}.{get_catalog_version(restaurant_id)}.{get_profile_version()}"
+
+
+# ===================================================================
+# PEMBACA KATALOG
+# ===================================================================
+def _cached(name, version, loader):
+    key = f'reservasi:{name}:{version}'
+    if key in _local:
+        return _local[key]
+    value = cache.get(key)
+    if value is None:
+        value = loader()
+        cache.set(key, value, timeout=None)
+    # Hanya simpan satu versi per nama agar memori per-proses tidak terus tumbuh
+    for old_key in [k for k in list(_local) if k.startswith(f'reservasi:{name}:')]:
+        _local.pop(old_key, None)
+    _local[key] = value
+    return value
+
+
+def get_rooms(restaurant_id):
+    """Semua Room milik cabang `restaurant_id`, urut nama."""
+    return _cached(
+        f'{restaurant_id}:rooms', get_catalog_version(restaurant_id),
+        lambda: list(Room.objects.filter(restaurant_id=restaurant_id).order_by('name')),
+    )
+
+
+def get_food_packages(restaurant_id):
+    """Semua FoodPackage milik cabang `restaurant_id`, urut nama."""
+    return _cached(
+        f'{restaurant_id}:food_packages', get_catalog_version(restaurant_id),
+        lambda: list(FoodPackage.objects.filter(restaurant_id=restaurant_id).order_by('name')),
+    )
+
+
+def get_calendar(restaurant_id):
+    """Kalender pengecualian jadwal cabang yang sudah dikompilasi (lihat schedule.py)."""
+    return _cached(f'{restaurant_id}:calendar', get_catalog_version(restaurant_id), lambda: compile_calendar(restaurant_id))
+
+
+# ===================================================================
+# CABANG: daftar profil restoran untuk resolusi host/prefix URL
+# ===================================================================
+def get_branches():
+    """Semua RestaurantProfile (cabang), urut id."""
+    return _cached('branches', get_profile_version(), lambda: list(RestaurantProfile.objects.order_by('id')))
+
+
+def get_profile(restaurant_id=None):
+    """
+    Cabang dengan id `restaurant_id`, atau cabang bawaan jika tidak diberikan.
+    Mengembalikan None jika belum ada profil sama sekali.
+    """
+    if restaurant_id is None:
+        return default_branch()
+    return next((branch for branch in get_branches() if branch.id == restaurant_id), None)
+
+
+def default_branch():
+    """
+    Cabang untuk request yang tidak cocok dengan host/prefix mana pun:
+    `settings.RESERVASI_DEFAULT_BRANCH` (slug) jika diisi, selain itu cabang pertama.
+    """
+    branches = get_branches()
+    slug = getattr(settings, 'RESERVASI_DEFAULT_BRANCH', None)
+    if slug:
+        branch = branch_for_slug(slug)
+        if branch:
+            return branch
+    return branches[0] if branches else None
+
+
+def branch_for_host(host):
+    host = (host or '').lower()
+    return next((branch for branch in get_branches() if branch.host and branch.host == host), None)
+
+
+def branch_for_slug(slug):
+    return next((branch for branch in get_branches() if branch.slug == slug), None)
@@ -0,0 +1,83 @@
+from .models import Reservation, ReservationChange
+
+# Kolom reservasi yang dikirim ke sistem lain lewat feed perubahan
+FEED_FIELDS = (
+    'restaurant_id', 'room_type_id', 'food_package_id', 'user_id',
+    'guest_name', 'guest_email', 'guest_phone',
+    'reservation_date', 'reservation_time', 'number_of_guests', 'duration_minutes',
+    'special_requests', 'status', 'created_at', 'updated_at', 'version',
+)
+# Perubahan kolom ini saja tidak menarik bagi konsumen (hanya dipakai internal)
+IGNORED_FIELDS = {'updated_at', 'reminder_queued_at', 'version'}
+
+
+# ===================================================================
+# MENULIS LOG (dipanggil di transaksi yang sama dengan perubahannya)
+# ===================================================================
+def snapshot(reservation):
+    return {name: getattr(reservation, name) for name in FEED_FIELDS}
+
+
+def changed_fields(reservation):
+    """Kolom feed yang berbeda dari nilai saat objek dimuat/terakhir disimpan."""
+    loaded = getattr(reservation, '_loaded_values', None) or {}
+    return [
+        name for name in FEED_FIELDS
+        if name not in IGNORED_FIELDS and name in loaded and loaded[name] != getattr(reservation, name)
+    ]
+
+
+def record(reservation, kind, fields=()):
+    return ReservationChange.objects.create(
+        reservation_id=reservation.pk,
+        restaurant_id=reservation.restaurant_id,
+        kind=kind,
+        changed_fields=list(fields),
+        data=snapshot(reservation),
+    )
+
+
+def record_saved(reservation, created):
+    """Dipanggil dari signal post_save: CREATED, STATUS_CHANGED atau UPDATED."""
+    if created:
+        return record(reservation, 'CREATED')
+    fields = changed_fields(reservation)
+    if not fields:
+        return None
+    return record(reservation, 'STATUS_CHANGED' if 'status' in fields else 'UPDATED', fields)
+
+
+def record_bulk(ids, kind, fields):
+    """
+    Versi massal untuk perubahan lewat queryset.update() (yang melewati
+    signals). Membaca nilai terbaru sekali lalu menulis log dengan bulk_create.
+    """
+    rows = Reservation.objects.filter(pk__in=ids).order_by('pk').values('pk', *FEED_FIELDS)
+    changes = [
+        ReservationChange(
+            reservation_id=row.pop('pk'),
+            restaurant_id=row['restaurant_id'],
+            kind=kind,
+            changed_fields=list(fields),
+            data=row,
+        )
+        for row in rows
+    ]
+    ReservationChange.objects.bulk_create(changes, batch_size=500)
+    return len(changes)
+
+
+# ===================================================================
+# MEMBACA FEED
+# ===================================================================
+def changes_since(since, limit=500, restaurant_id=None):
+    """
+    Perubahan dengan seq > `since`, urut seq, paling banyak `limit` baris.
+    Memakai index reservasi_change_feed_idx jika `restaurant_id` diberikan.
+    """
+    queryset = ReservationChange.objects.filter(seq__gt=since)
+    if restaurant_id is not None:
+        queryset = queryset.filter(restaurant_id=restaurant_id)
+    return list(
+        queryset.order_by('seq').values('seq', 'reservation_id', 'kind', 'changed_fields', 'data', 'created_at')[:limit]
+    )
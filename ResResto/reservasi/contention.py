@@ -0,0 +1,154 @@
+import datetime
+import os
+import random
+import shutil
+import threading
+import time
+
+from django.db import connections, transaction
+from django.utils import timezone
+
+from . import catalog, stress
+from .models import Reservation, ReservationConflict
+
+# naive: baca, jeda, UPDATE tanpa pemeriksaan (perilaku sebelum kolom version)
+# optimistic: compare-and-swap lewat Reservation.version, ulangi jika konflik
+# pessimistic: kunci selama jeda (select_for_update; di SQLite: BEGIN IMMEDIATE)
+MODES = ('naive', 'optimistic', 'pessimistic')
+MAX_RETRIES = 20
+
+
+def _percentile_ms(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] * 1000
+
+
+# ===================================================================
+# PENYUNTING (staf) DAN PEMESAN (tamu)
+# ===================================================================
+def edit_once(mode, pk, think_time):
+    """
+    Satu siklus baca-ubah-tulis pada reservasi `pk`: counter di
+    special_requests dinaikkan satu. Mengembalikan jumlah percobaan ulang.
+    """
+    if mode == 'pessimistic':
+        with transaction.atomic():
+            reservation = Reservation.objects.select_for_update().get(pk=pk)
+            time.sleep(think_time)
+            reservation.special_requests = str(int(reservation.special_requests or 0) + 1)
+            reservation.save()
+        return 0
+
+    for retries in range(MAX_RETRIES):
+        reservation = Reservation.objects.get(pk=pk)
+        time.sleep(think_time)
+        value = str(int(reservation.special_requests or 0) + 1)
+        if mode == 'naive':
+            Reservation.objects.filter(pk=pk).update(special_requests=value)
+            return retries
+        reservation.special_requests = value
+        try:
+            reservation.save()
+            return retries
+        except ReservationConflict:
+            continue
+    raise ReservationConflict(pk, None)
+
+
+def editor(mode, hot_ids, edits, think_time, rng, result):
+    try:
+        for _ in range(edits):
+            start = time.perf_counter()
+            try:
+                result['retries'] += edit_once(mode, rng.choice(hot_ids), think_time)
+                result['edits'] += 1
+            except ReservationConflict:
+                result['gave_up'] += 1
+            result['latencies'].append(time.perf_counter() - start)
+    finally:
+        connections.close_all()
+
+
+def booker(profile, room, done, rng, result):
+    # Jalur booking: INSERT reservasi baru selama penyunting masih bekerja
+    try:
+        while not done.is_set():
+            start = time.perf_counter()
+            Reservation.objects.create(
+                restaurant=profile, room_type=room, guest_name="Tamu Bench", guest_email="bench@stres.local",
+                guest_phone="081200000000", reservation_date=timezone.localdate() + datetime.timedelta(days=rng.randint(1, 30)),
+                reservation_time=datetime.time(rng.randint(10, 20), 0), number_of_guests=1,
+            )
+            result['latencies'].append(time.perf_counter() - start)
+    finally:
+        connections.close_all()
+
+
+# ===================================================================
+# SATU MODE
+# ===================================================================
+def run_mode(template, workdir, mode, threads=8, edits=20, hot_rows=3, think_time=0.01, seed=1):
+    """
+    `threads` penyunting masing-masing menjalankan `edits` siklus pada
+    `hot_rows` reservasi yang sama, sementara satu thread terus membuat
+    booking baru. Mengembalikan throughput, latensi, jumlah percobaan ulang
+    dan jumlah perubahan yang hilang (counter akhir < edit yang berhasil).
+    """
+    path = os.path.join(workdir, f'kontensi-{mode}.sqlite3')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    shutil.copyfile(template, path)
+    catalog._local.clear()
+
+    with stress.use_database(path):
+        profile = catalog.default_branch()
+        hot_room, booking_room = catalog.get_rooms(profile.id)[:2]
+        hot_ids = [
+            Reservation.objects.create(
+                restaurant=profile, room_type=hot_room, guest_name=f"Hot {i}", guest_email=f"hot{i}@stres.local",
+                guest_phone="081211111111", reservation_date=timezone.localdate() + datetime.timedelta(days=1),
+                reservation_time=datetime.time(12, 0), number_of_guests=1, special_requests='0',
+            ).pk
+            for i in range(hot_rows)
+        ]
+
+        results = [{'edits': 0, 'retries': 0, 'gave_up': 0, 'latencies': []} for _ in range(threads)]
+        bookings = {'latencies': []}
+        done = threading.Event()
+        pool = [
+            threading.Thread(target=editor, args=(mode, hot_ids, edits, think_time, random.Random(f'{seed}:{i}'), results[i]))
+            for i in range(threads)
+        ]
+        booking_thread = threading.Thread(target=booker, args=(profile, booking_room, done, random.Random(seed), bookings))
+        start = time.perf_counter()
+        booking_thread.start()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        seconds = time.perf_counter() - start
+        done.set()
+        booking_thread.join()
+
+        applied = sum(int(value or 0) for value in Reservation.objects.filter(pk__in=hot_ids).values_list('special_requests', flat=True))
+
+    succeeded = sum(result['edits'] for result in results)
+    latencies = [latency for result in results for latency in result['latencies']]
+    return {
+        'mode': mode,
+        'edits': succeeded,
+        'seconds': seconds,
+        'edits_per_second': succeeded / seconds if seconds else 0.0,
+        'retries': sum(result['retries'] for result in results),
+        'gave_up': sum(result['gave_up'] for result in results),
+        'lost_updates': succeeded - applied,
+        'edit_p50_ms': _percentile_ms(latencies, 0.5),
+        'edit_p95_ms': _percentile_ms(latencies, 0.95),
+        'bookings': len(bookings['latencies']),
+        'booking_p50_ms': _percentile_ms(bookings['latencies'], 0.5),
+        'booking_p95_ms': _percentile_ms(bookings['latencies'], 0.95),
+        'booking_max_ms': max(bookings['latencies'], default=0) * 1000,
+    }
@@ -0,0 +1,244 @@
+import asyncio
+import json
+import threading
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+from . import catalog
+from .occupancy import build_slot_grid, load_day_occupancy, total_occupancy
+from .schedule import effective_hours
+
+# Antrian per koneksi dibatasi; koneksi yang lambat membaca kehilangan
+# pesan terlama, bukan membuat memori server terus tumbuh.
+SUBSCRIPTION_QUEUE_SIZE = 100
+
+
+def streaming_supported(request):
+    """
+    True jika request dilayani server ASGI. Di bawah WSGI (runserver, gunicorn
+    sync) stream SSE yang tidak pernah selesai akan menahan satu thread worker
+    selamanya, jadi halaman booking memakai polling sebagai gantinya.
+    """
+    return isinstance(request, ASGIRequest)
+
+
+def channel_for_date(restaurant_id, date):
+    return f"slots:{restaurant_id}:{date.strftime('%Y-%m-%d')}"
+
+
+# ===================================================================
+# BROKER IN-PROCESS: fan-out ke semua koneksi SSE di proses ini
+# ===================================================================
+class InProcessSubscription:
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=SUBSCRIPTION_QUEUE_SIZE)
+
+    def deliver(self, message):
+        # Dipanggil di event loop milik koneksi ini (lihat publish)
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(message)
+
+    async def get(self, timeout):
+        return await asyncio.wait_for(self.queue.get(), timeout)
+
+    async def aclose(self):
+        self.broker.unsubscribe(self)
+
+
+class InProcessBroker:
+    """
+    Pub/sub sederhana dalam satu proses. Cukup untuk satu worker ASGI;
+    untuk beberapa worker gunakan broker bersama seperti RedisBroker.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = {}
+
+    def subscribe(self, channel):
+        subscription = InProcessSubscription(self, channel)
+        with self._lock:
+            self._subscribers.setdefault(channel, set()).add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.channel)
+            if subscribers:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.channel]
+
+    def has_subscribers(self, channel):
+        return bool(self._subscribers.get(channel))
+
+    def publish(self, channel, message):
+        # Aman dipanggil dari thread mana pun (mis. thread request WSGI)
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscription in subscribers:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.deliver, message)
+            except RuntimeError:
+                # Event loop koneksi sudah ditutup
+                self.unsubscribe(subscription)
+
+
+# ===================================================================
+# BROKER REDIS (opsional): untuk deployment dengan banyak worker
+# ===================================================================
+class RedisSubscription:
+    def __init__(self, url, channel):
+        import redis.asyncio
+
+        self.client = redis.asyncio.Redis.from_url(url)
+        self.pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        self.channel = channel
+        self.subscribed = False
+
+    async def get(self, timeout):
+        if not self.subscribed:
+            await self.pubsub.subscribe(RedisBroker.prefix + self.channel)
+            self.subscribed = True
+        message = await self.pubsub.get_message(timeout=timeout)
+        if message is None:
+            raise asyncio.TimeoutError
+        return json.loads(message['data'])
+
+    async def aclose(self):
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+class RedisBroker:
+    """
+    Broker lewat Redis pub/sub (butuh paket `redis`). Aktifkan dengan:
+
+        RESERVASI_EVENT_BROKER = 'reservasi.events.RedisBroker'
+        RESERVASI_EVENT_BROKER_URL = 'redis://localhost:6379/0'
+    """
+    prefix = 'resresto:'
+
+    def __init__(self):
+        import redis
+
+        self.url = settings.RESERVASI_EVENT_BROKER_URL
+        self.client = redis.Redis.from_url(self.url)
+
+    def subscribe(self, channel):
+        return RedisSubscription(self.url, channel)
+
+    def has_subscribers(self, channel):
+        # Pelanggan ada di proses lain; selalu publish
+        return True
+
+    def publish(self, channel, message):
+        self.client.publish(self.prefix + channel, json.dumps(message))
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                path = getattr(settings, 'RESERVASI_EVENT_BROKER', 'reservasi.events.InProcessBroker')
+                _broker = import_string(path)()
+    return _broker
+
+
+# ===================================================================
+# PUBLIKASI PERUBAHAN OKUPANSI
+# ===================================================================
+def occupancy_messages(restaurant_id, date, room_ids):
+    """
+    Sisa kapasitas terbaru pada `date` di cabang `restaurant_id` untuk setiap
+    ruangan di `room_ids` (per slot), ditambah total seperti yang dipakai
+    ajax_get_time_slots. Okupansi hari itu dihitung sekali (satu query) untuk semua pesan.
+    """
+    profile = catalog.get_profile(restaurant_id)
+    if not profile:
+        return []
+    hours = effective_hours(profile, date)
+    if hours.is_closed:
+        return []
+    grid = build_slot_grid(hours.opening_time, hours.closing_time, hours.interval_minutes)
+    occupancy_by_room = load_day_occupancy(profile.id, date, hours.opening_time, hours.interval_minutes, len(grid))
+    keys = [slot.strftime('%H:%M:%S') for slot in grid]
+    total_remaining = {
+        key: profile.max_guests_per_slot - guests
+        for key, guests in zip(keys, total_occupancy(occupancy_by_room, len(grid)))
+    }
+    rooms = {room.id: room for room in catalog.get_rooms(profile.id)}
+
+    messages = []
+    for room_id in room_ids:
+        room = rooms.get(room_id)
+        room_occupancy = occupancy_by_room.get(room_id) or [0] * len(grid)
+        messages.append({
+            'date': date.strftime('%Y-%m-%d'),
+            'room_id': room_id,
+            'room_remaining': (
+                {key: room.capacity - guests for key, guests in zip(keys, room_occupancy)} if room else {}
+            ),
+            'total_remaining': total_remaining,
+        })
+    return messages
+
+
+def publish_occupancy(restaurant_id, date, room_ids):
+    """Mengirim pesan okupansi untuk setiap ruangan cabang yang berubah pada `date`."""
+    broker = get_broker()
+    channel = channel_for_date(restaurant_id, date)
+    # Tidak ada yang menonton tanggal ini: tidak perlu menghitung apa pun
+    if not broker.has_subscribers(channel):
+        return
+    for message in occupancy_messages(restaurant_id, date, set(room_ids)):
+        broker.publish(channel, message)
+
+
+def schedule_occupancy_publish(keys):
+    """
+    Menjadwalkan publish untuk setiap (restaurant_id, tanggal, room_id) setelah
+    transaksi commit, sehingga penonton tidak melihat perubahan yang kemudian
+    di-rollback.
+    """
+    by_day = {}
+    for restaurant_id, date, room_id in keys:
+        if restaurant_id is not None and date is not None:
+            by_day.setdefault((restaurant_id, date), set()).add(room_id)
+    if not by_day:
+        return
+
+    def publish():
+        for (restaurant_id, date), room_ids in by_day.items():
+            publish_occupancy(restaurant_id, date, room_ids)
+
+    transaction.on_commit(publish, robust=True)
+
+
+async def event_stream(channel, heartbeat_seconds=15):
+    """Generator Server-Sent Events untuk satu koneksi."""
+    subscription = get_broker().subscribe(channel)
+    try:
+        yield "retry: 5000\n\n"
+        while True:
+            try:
+                message = await subscription.get(heartbeat_seconds)
+            except asyncio.TimeoutError:
+                # Komentar SSE sebagai heartbeat agar proxy tidak memutus koneksi
+                yield ": ping\n\n"
+                continue
+            yield f"event: occupancy\ndata: {json.dumps(message)}\n\n"
+    finally:
+        await subscription.aclose()
@@ -0,0 +1,202 @@
+import datetime
+import time
+from collections import namedtuple
+
+import numpy as np
+from django.db.models import CharField, Min, Sum
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+from . import catalog
+from .models import Reservation
+from .occupancy import DEFAULT_DURATION_MINUTES, build_slot_grid
+from .schedule import effective_hours
+
+# Status yang dihitung sebagai permintaan: termasuk WAITLISTED (tamu yang
+# sebenarnya ingin datang), COMPLETED (sudah terlayani) dan NO_SHOW (kursinya
+# tetap tertahan walaupun tamunya tidak datang)
+DEMAND_STATUSES = ['PENDING', 'CONFIRMED', 'COMPLETED', 'WAITLISTED', 'NO_SHOW']
+HISTORY_WEEKS = 104
+# Bobot EWMA per minggu: minggu terbaru paling berpengaruh
+EWMA_ALPHA = 0.15
+# Slot dianggap "kemungkinan penuh" jika permintaan persentil ini >= kapasitas
+PEAK_PERCENTILE = 90
+
+WEEKDAY_NAMES = ['Senin', 'Selasa', 'Rabu', 'Kamis', 'Jumat', 'Sabtu', 'Minggu']
+
+# Semua array berbentuk (7 hari, slot, ruangan)
+Forecast = namedtuple('Forecast', 'grid rooms demand peak_demand fill_rate cancel_rate waitlist weeks elapsed_ms')
+
+
+def _minutes(value):
+    return value.hour * 60 + value.minute
+
+
+# ===================================================================
+# RIWAYAT -> ARRAY (hari, slot, ruangan)
+# ===================================================================
+def load_history(profile, rooms, grid, date_from, date_to):
+    """
+    Okupansi historis cabang `profile` dari `date_from` sampai `date_to`
+    (inklusif) sebagai dua array float (hari, slot, ruangan): permintaan dan
+    tamu yang membatalkan. Database hanya mengembalikan jumlah tamu per
+    (ruangan, tanggal, jam, durasi, status); sisanya dihitung NumPy dengan
+    array selisih + cumsum, sama seperti sweep-line di occupancy.py.
+    """
+    n_days = (date_to - date_from).days + 1
+    n_slots, n_rooms = len(grid), len(rooms)
+    room_index = {room.id: i for i, room in enumerate(rooms)}
+    rows = list(
+        Reservation.objects.filter(
+            restaurant=profile, reservation_date__range=(date_from, date_to),
+            room_type_id__in=list(room_index),
+        )
+        # Tanggal & jam dibaca sebagai teks ('YYYY-MM-DD', 'HH:MM:SS'): jauh lebih
+        # murah daripada membuat puluhan ribu objek date/time lewat converter Django
+        .annotate(day=Cast('reservation_date', CharField()), start=Cast('reservation_time', CharField()))
+        .values_list('room_type_id', 'day', 'start', 'duration_minutes', 'status')
+        .annotate(guests=Sum('number_of_guests'))
+        .order_by()
+    )
+    demand = np.zeros((n_days, n_slots, n_rooms), dtype=np.float64)
+    cancelled = np.zeros_like(demand)
+    if not rows or not n_slots:
+        return demand, cancelled
+
+    day_index = {(date_from + datetime.timedelta(days=i)).isoformat(): i for i in range(n_days)}
+    opening, interval = _minutes(grid[0]), profile.slot_interval_minutes
+    day = np.fromiter((day_index[row[1][:10]] for row in rows), dtype=np.int64, count=len(rows))
+    room = np.fromiter((room_index[row[0]] for row in rows), dtype=np.int64, count=len(rows))
+    offset = np.fromiter((int(row[2][:2]) * 60 + int(row[2][3:5]) for row in rows), dtype=np.int64, count=len(rows)) - opening
+    duration = np.fromiter((row[3] or DEFAULT_DURATION_MINUTES for row in rows), dtype=np.int64, count=len(rows))
+    guests = np.fromiter((row[5] for row in rows), dtype=np.float64, count=len(rows))
+    status = np.array([row[4] for row in rows])
+
+    # Rentang slot [i0, i1) setiap baris, sama dengan occupancy.slot_span
+    i0 = np.clip(offset // interval, 0, n_slots)
+    i1 = np.clip(-(-(offset + duration) // interval), 0, n_slots)
+    for target, mask in ((demand, np.isin(status, DEMAND_STATUSES)), (cancelled, status == 'CANCELLED')):
+        mask &= i1 > i0
+        diff = np.zeros((n_days, n_slots + 1, n_rooms), dtype=np.float64)
+        np.add.at(diff, (day[mask], i0[mask], room[mask]), guests[mask])
+        np.add.at(diff, (day[mask], i1[mask], room[mask]), -guests[mask])
+        target += np.cumsum(diff, axis=1)[:, :n_slots, :]
+    return demand, cancelled
+
+
+def by_weekday(daily, date_from, open_days):
+    """
+    Melipat array (hari, ...) menjadi (minggu, 7, ...) yang diawali hari
+    Senin. Hari di luar rentang atau saat cabang tutup diisi NaN agar tidak
+    menurunkan rata-rata.
+    """
+    daily = daily.copy()
+    daily[~open_days] = np.nan
+    lead = date_from.weekday()
+    n_weeks = -(-(lead + len(daily)) // 7)
+    weekly = np.full((n_weeks * 7,) + daily.shape[1:], np.nan)
+    weekly[lead:lead + len(daily)] = daily
+    return weekly.reshape((n_weeks, 7) + daily.shape[1:])
+
+
+# ===================================================================
+# PRAKIRAAN
+# ===================================================================
+def percentile(weekly, q):
+    """
+    Persentil `q` sepanjang sumbu minggu dengan interpolasi linear, mengabaikan
+    NaN (0 jika semuanya NaN). Setara np.nanpercentile, tetapi sepenuhnya
+    vektor: nanpercentile memproses setiap sel satu per satu.
+    """
+    ordered = np.sort(weekly, axis=0)  # NaN selalu di akhir
+    count = (~np.isnan(weekly)).sum(axis=0)
+    position = np.maximum(count - 1, 0) * (q / 100)
+    lower = np.floor(position).astype(np.int64)
+    upper = np.minimum(lower + 1, np.maximum(count - 1, 0))
+    low = np.take_along_axis(ordered, lower[np.newaxis], axis=0)[0]
+    high = np.take_along_axis(ordered, upper[np.newaxis], axis=0)[0]
+    return np.where(count > 0, np.nan_to_num(low + (high - low) * (position - lower)), 0.0)
+
+
+def ewma(weekly, alpha=EWMA_ALPHA):
+    """Rata-rata berbobot eksponensial sepanjang sumbu minggu, mengabaikan NaN."""
+    n_weeks = weekly.shape[0]
+    weights = alpha * (1 - alpha) ** np.arange(n_weeks - 1, -1, -1, dtype=np.float64)
+    weights = weights.reshape((n_weeks,) + (1,) * (weekly.ndim - 1))
+    present = ~np.isnan(weekly)
+    total = np.where(present, weights, 0).sum(axis=0)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return np.where(total > 0, np.where(present, weekly * weights, 0).sum(axis=0) / total, 0.0)
+
+
+def forecast_branch(profile, today=None, weeks=HISTORY_WEEKS):
+    """
+    Prakiraan per (hari dalam minggu, slot, ruangan) untuk cabang `profile`
+    dari riwayat `weeks` minggu terakhir:
+
+    - demand: permintaan tamu (EWMA per hari dalam minggu),
+    - peak_demand: permintaan persentil PEAK_PERCENTILE,
+    - fill_rate: prakiraan keterisian (demand dibatasi kapasitas / kapasitas),
+    - cancel_rate: porsi tamu yang membatalkan,
+    - waitlist: jumlah tamu waiting list yang disarankan, yaitu kursi yang
+      diperkirakan kosong karena pembatalan, hanya untuk slot yang
+      kemungkinan penuh.
+    """
+    started = time.perf_counter()
+    today = today or timezone.localdate()
+    date_to = today - datetime.timedelta(days=1)
+    # Minggu sebelum cabang punya reservasi pertama bukan "permintaan nol"
+    first = Reservation.objects.filter(restaurant=profile).aggregate(first=Min('reservation_date'))['first']
+    date_from = max(today - datetime.timedelta(weeks=weeks), min(first or today, date_to))
+    rooms = list(catalog.get_rooms(profile.id))
+    grid = build_slot_grid(profile.opening_time, profile.closing_time, profile.slot_interval_minutes)
+
+    demand, cancelled = load_history(profile, rooms, grid, date_from, date_to)
+    # Hari libur cabang tidak ikut dirata-rata (kalender sudah ada di cache)
+    open_days = np.array([
+        not effective_hours(profile, date_from + datetime.timedelta(days=i)).is_closed
+        for i in range(len(demand))
+    ], dtype=bool)
+    weekly_demand = by_weekday(demand, date_from, open_days)
+    weekly_cancelled = by_weekday(cancelled, date_from, open_days)
+
+    capacity = np.array([room.capacity for room in rooms], dtype=np.float64)
+    expected = ewma(weekly_demand)
+    peak = percentile(weekly_demand, PEAK_PERCENTILE)
+    requested = np.nansum(weekly_demand, axis=0) + np.nansum(weekly_cancelled, axis=0)
+    cancel_rate = np.where(requested > 0, np.nansum(weekly_cancelled, axis=0) / np.where(requested > 0, requested, 1), 0.0)
+    fill_rate = np.where(capacity > 0, np.minimum(expected, capacity) / np.where(capacity > 0, capacity, 1), 0.0)
+    waitlist = np.where(peak >= capacity, np.ceil(cancel_rate * np.minimum(expected, capacity)), 0).astype(np.int64)
+
+    return Forecast(
+        grid=grid,
+        rooms=rooms,
+        demand=expected,
+        peak_demand=peak,
+        fill_rate=fill_rate,
+        cancel_rate=cancel_rate,
+        waitlist=waitlist,
+        weeks=weekly_demand.shape[0],
+        elapsed_ms=(time.perf_counter() - started) * 1000,
+    )
+
+
+def forecast_tables(forecast):
+    """Bentuk siap-render: satu tabel per ruangan, baris hari, kolom slot."""
+    tables = []
+    for r, room in enumerate(forecast.rooms):
+        rows = []
+        for weekday, name in enumerate(WEEKDAY_NAMES):
+            rows.append({
+                'weekday': name,
+                'cells': [
+                    {
+                        'fill': int(round(forecast.fill_rate[weekday, s, r] * 100)),
+                        'demand': round(float(forecast.demand[weekday, s, r]), 1),
+                        'waitlist': int(forecast.waitlist[weekday, s, r]),
+                    }
+                    for s in range(len(forecast.grid))
+                ],
+            })
+        tables.append({'room': room, 'rows': rows})
+    return tables
@@ -1,22 +1,79 @@
 from django import forms
-from .models import Reservation, RestaurantProfile, Room, FoodPackage # TAMBAHKAN Room & FoodPackage
+from .models import Reservation, Room, FoodPackage
+from .occupancy import build_slot_grid, load_day_occupancy, slot_span, peak_occupancy
+from .suggestions import suggest_alternatives
+from .schedule import EffectiveHours, effective_hours
+from . import catalog, load
 from django.utils import timezone
+from django.utils.choices import BaseChoiceIterator
 import datetime
-from django.db.models import Sum
+
+
+class CatalogChoiceIterator(BaseChoiceIterator):
+    """Iterator pilihan yang dibaca (lazily) dari katalog ter-cache."""
+    def __init__(self, field):
+        self.field = field
+
+    def __iter__(self):
+        if self.field.empty_label is not None:
+            yield ("", self.field.empty_label)
+        for obj in self.field.loader():
+            yield (obj.pk, self.field.label_from_instance(obj))
+
+    def __len__(self):
+        return len(self.field.loader()) + (1 if self.field.empty_label is not None else 0)
+
+    def __bool__(self):
+        return self.field.empty_label is not None or bool(self.field.loader())
+
+
+class CatalogChoiceField(forms.ModelChoiceField):
+    """
+    ModelChoiceField yang pilihan dan validasinya diambil dari katalog ter-cache
+    (lihat reservasi/catalog.py), sehingga merender dan memvalidasi select
+    Ruangan/Paket tidak menjalankan query. `queryset` tetap diisi untuk
+    kompatibilitas, tapi tidak pernah dievaluasi.
+
+    `loader` dipasang per form oleh ReservationForm karena katalog bergantung
+    pada cabang; tanpa loader, pilihannya kosong.
+    """
+    def __init__(self, *args, loader=None, **kwargs):
+        self.loader = loader or (lambda: [])
+        super().__init__(*args, **kwargs)
+
+    def _get_choices(self):
+        return CatalogChoiceIterator(self)
+
+    choices = property(_get_choices, forms.ChoiceField.choices.fset)
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        for obj in self.loader():
+            if str(obj.pk) == str(value):
+                return obj
+        raise forms.ValidationError(
+            self.error_messages['invalid_choice'],
+            code='invalid_choice',
+            params={'value': value},
+        )
+
 
 class ReservationForm(forms.ModelForm):
     # ===================================================================
     # FIELD FORM BARU DIDEFINISIKAN DI SINI
     # ===================================================================
-    room_type = forms.ModelChoiceField(
-        queryset=Room.objects.all().order_by('name'), # Ambil semua objek Room
+    room_type = CatalogChoiceField(
+        # Pilihan diambil dari cache katalog cabang (lihat __init__)
+        queryset=Room.objects.all().order_by('name'),
         label="Tipe Ruangan",
         empty_label="-- Pilih Ruangan --", # Teks untuk pilihan kosong
         widget=forms.Select() # Nanti di-style di template dengan widget_tweaks
     )
     
-    food_package = forms.ModelChoiceField(
-        queryset=FoodPackage.objects.all().order_by('name'), # Ambil semua objek FoodPackage
+    food_package = CatalogChoiceField(
+        # Pilihan diambil dari cache katalog cabang (lihat __init__)
+        queryset=FoodPackage.objects.all().order_by('name'),
         label="Paket Makanan (Opsional)",
         required=False, # Penting! Membuat field ini tidak wajib diisi
         empty_label="-- Tanpa Paket Makanan --",
@@ -72,7 +129,16 @@ class ReservationForm(forms.ModelForm):
     # __init__ dan clean_* methods tetap sama seperti sebelumnya, tidak perlu diubah untuk penambahan field ini
     def __init__(self, *args, **kwargs):
         self.user = kwargs.pop('user', None) 
+        # Cabang tempat reservasi dibuat (request.restaurant dari BranchMiddleware)
+        self.restaurant = kwargs.pop('restaurant', None) or catalog.get_profile()
         super().__init__(*args, **kwargs)
+        restaurant_id = self.restaurant.id if self.restaurant else None
+        if self.restaurant and not self.instance.restaurant_id:
+            self.instance.restaurant = self.restaurant
+        self.fields['room_type'].loader = lambda: catalog.get_rooms(restaurant_id)
+        self.fields['food_package'].loader = lambda: catalog.get_food_packages(restaurant_id)
+        # Diisi oleh clean() jika slot yang diminta penuh
+        self.suggestions = []
         
         if self.user and self.user.is_authenticated:
             if not self.initial.get('guest_name') and (self.user.get_full_name() or self.user.username):
@@ -80,22 +146,28 @@ class ReservationForm(forms.ModelForm):
             if not self.initial.get('guest_email') and self.user.email: 
                  self.initial['guest_email'] = self.user.email
             
-        profile = RestaurantProfile.objects.first()
+        profile = self.restaurant
         time_choices = [('', 'Pilih Waktu')]
-        if profile and profile.opening_time and profile.closing_time and profile.slot_interval_minutes and profile.slot_interval_minutes > 0:
-            try:
-                current_time_dt = datetime.datetime.combine(datetime.date.today(), profile.opening_time)
-                closing_time_dt = datetime.datetime.combine(datetime.date.today(), profile.closing_time)
-                max_loops = (24 * 60) // profile.slot_interval_minutes
-                loop_count = 0
-                while current_time_dt < closing_time_dt and loop_count < max_loops:
-                    loop_count += 1
-                    time_choices.append((current_time_dt.time().strftime('%H:%M:%S'), current_time_dt.time().strftime('%H:%M %p')))
-                    current_time_dt += datetime.timedelta(minutes=profile.slot_interval_minutes)
-            except Exception as e:
-                print(f"[ERROR Form Init] Generating time choices: {e}")
+        if profile:
+            hours = self._hours_for_bound_date()
+            for slot in build_slot_grid(hours.opening_time, hours.closing_time, hours.interval_minutes):
+                time_choices.append((slot.strftime('%H:%M:%S'), slot.strftime('%H:%M %p')))
         self.fields['reservation_time'].widget.choices = time_choices
 
+    def _hours_for_bound_date(self):
+        # Form yang dikirim ulang (ada error) menampilkan slot sesuai tanggal yang
+        # dipilih; form kosong memakai jam biasa, lalu JS memuat slot per tanggal.
+        profile = self.restaurant
+        hours = EffectiveHours(profile.opening_time, profile.closing_time, profile.slot_interval_minutes, False, '')
+        if self.is_bound:
+            try:
+                date = self.fields['reservation_date'].to_python(self.data.get(self.add_prefix('reservation_date')))
+            except forms.ValidationError:
+                date = None
+            if date:
+                hours = effective_hours(profile, date)
+        return hours
+
     def clean_reservation_date(self):
         date = self.cleaned_data.get('reservation_date')
         if date and date < timezone.now().date():
@@ -148,31 +220,75 @@ class ReservationForm(forms.ModelForm):
             self.add_error('reservation_time', "Waktu reservasi tidak valid.")
             return cleaned_data
 
-        profile = RestaurantProfile.objects.first()
+        profile = self.restaurant
         if not profile or not isinstance(profile.opening_time, datetime.time) or not isinstance(profile.closing_time, datetime.time):
             raise forms.ValidationError("Pengaturan jam operasional restoran tidak valid.")
+
+        # Jam efektif tanggal & ruangan ini: libur, jam khusus, ruangan ditutup
+        hours = effective_hours(profile, date, room.id)
+        if hours.is_closed:
+            self.add_error('reservation_date', f"Maaf, {room.name} tidak menerima reservasi pada tanggal ini ({hours.reason}).")
+            return cleaned_data
         
-        if not (profile.opening_time <= time_obj < profile.closing_time):
-            self.add_error('reservation_time', f"Restoran hanya buka dari {profile.opening_time.strftime('%H:%M')} sampai {profile.closing_time.strftime('%H:%M')}.")
+        if not (hours.opening_time <= time_obj < hours.closing_time):
+            self.add_error('reservation_time', f"Pada tanggal ini restoran hanya buka dari {hours.opening_time.strftime('%H:%M')} sampai {hours.closing_time.strftime('%H:%M')}.")
             return cleaned_data
 
-        # Validasi 2: Cek ketersediaan slot untuk RUANGAN SPESIFIK tersebut
-        existing_reservations_in_room = Reservation.objects.filter(
-            room_type=room,  # <-- Filter berdasarkan ruangan yang dipilih
-            reservation_date=date,
-            reservation_time=time_obj,
-            status__in=['CONFIRMED', 'PENDING']
-        )
-        
-        total_guests_in_room = existing_reservations_in_room.aggregate(
-            total=Sum('number_of_guests')
-        )['total'] or 0
+        # Validasi 2: Cek ketersediaan RUANGAN SPESIFIK selama durasi makan.
+        # Reservasi jam 19:00 selama 2 jam juga menempati 19:30, 20:00 dan 20:30,
+        # jadi yang dibandingkan adalah okupansi tertinggi di seluruh rentang slot.
+        duration = Reservation.resolve_duration(room, cleaned_data.get('food_package'))
+        grid = build_slot_grid(hours.opening_time, hours.closing_time, hours.interval_minutes)
+        occupancy = load_day_occupancy(
+            profile.id, date, hours.opening_time, hours.interval_minutes, len(grid),
+            room=room, exclude_pk=self.instance.pk,
+        ).get(room.id)
+        i0, i1 = slot_span(hours.opening_time, hours.interval_minutes, len(grid), time_obj, duration)
+        total_guests_in_room = peak_occupancy(occupancy, i0, i1)
 
         # Cek apakah penambahan tamu baru akan melebihi kapasitas ruangan
         if (total_guests_in_room + num_guests) > room.capacity:
             self.add_error(None, f"Maaf, slot di {room.name} pada jam {time_obj.strftime('%H:%M')} sudah penuh atau tidak cukup untuk {num_guests} orang.")
             self.is_waitlist_candidate = True 
+            # Beri alternatif terdekat agar tamu tidak perlu mencoba satu per satu
+            # (dilewati saat mode degradasi karena butuh query tambahan; lihat load.py)
+            if not load.is_degraded():
+                self.suggestions = suggest_alternatives(
+                    profile, room, date, time_obj, num_guests,
+                    food_package=cleaned_data.get('food_package'),
+                )
         else:
             self.is_waitlist_candidate = False
             
-        return cleaned_data
\ No newline at end of file
+        return cleaned_data
+
+# ===================================================================
+# FORM ADMIN RESERVASI: membawa versi saat halaman ubah dibuka
+# ===================================================================
+CONFLICT_MESSAGE = (
+    "Reservasi ini sudah diubah oleh pihak lain sejak halaman ini dibuka. "
+    "Muat ulang halaman untuk melihat data terbaru, lalu ulangi perubahan Anda."
+)
+
+
+class ReservationAdminForm(forms.ModelForm):
+    # Versi yang dilihat staf; save_model menyimpan dengan compare-and-swap terhadap versi ini
+    expected_version = forms.IntegerField(widget=forms.HiddenInput, required=False)
+
+    class Meta:
+        model = Reservation
+        fields = '__all__'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        if self.instance.pk:
+            self.fields['expected_version'].initial = self.instance.version
+
+    def clean(self):
+        cleaned_data = super().clean()
+        expected = cleaned_data.get('expected_version')
+        # Deteksi dini (form tampil lagi dengan isian staf); balapan yang tersisa
+        # antara validasi dan simpan ditangkap ReservationConflict saat save()
+        if self.instance.pk and expected is not None and expected != self.instance.version:
+            raise forms.ValidationError(CONFLICT_MESSAGE, code='conflict')
+        return cleaned_data
@@ -0,0 +1,217 @@
+import re
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Max, Q
+
+from .models import GuestProfile, Reservation
+
+# Kode negara untuk nomor lokal (0812...) jika settings tidak menentukan lain
+DEFAULT_COUNTRY_CODE = '62'
+NON_DIGIT_RE = re.compile(r'\D')
+STAT_FIELDS = ['reservation_count', 'visit_count', 'no_show_count', 'last_visit_date']
+
+
+# ===================================================================
+# NORMALISASI KUNCI
+# ===================================================================
+def normalize_email(value):
+    value = (value or '').strip().lower()
+    return value if '@' in value else None
+
+
+def normalize_phone(value, country_code=None):
+    """
+    Nomor telepon dalam format E.164, misalnya '0812-3456-7890',
+    '+62 812 3456 7890' dan '0062 812 3456 7890' semuanya menjadi
+    '+6281234567890'. Mengembalikan None jika jumlah digitnya tidak masuk akal.
+    """
+    raw = (value or '').strip()
+    digits = NON_DIGIT_RE.sub('', raw)
+    if not digits:
+        return None
+    country_code = country_code or str(getattr(settings, 'RESERVASI_DEFAULT_COUNTRY_CODE', DEFAULT_COUNTRY_CODE))
+    if raw.startswith('+'):
+        pass
+    elif digits.startswith('00'):
+        digits = digits[2:]
+    elif digits.startswith('0'):
+        digits = country_code + digits[1:]
+    elif not digits.startswith(country_code):
+        digits = country_code + digits
+    # E.164 paling banyak 15 digit; kurang dari 8 hampir pasti salah ketik
+    if not 8 <= len(digits) <= 15:
+        return None
+    return '+' + digits
+
+
+def _key_filter(email_keys, phone_keys):
+    query = Q(pk__in=[])
+    if email_keys:
+        query |= Q(email_key__in=email_keys)
+    if phone_keys:
+        query |= Q(phone_key__in=phone_keys)
+    return query
+
+
+def _match(email_key, phone_key, by_email, by_phone):
+    # Email didahulukan: satu nomor telepon kadang dipakai bersama (kantor, keluarga)
+    guest = by_email.get(email_key) if email_key else None
+    if guest is None and phone_key:
+        guest = by_phone.get(phone_key)
+    return guest
+
+
+def _fill_keys(guest, email_key, phone_key, by_email, by_phone):
+    """Melengkapi kunci yang belum dimiliki profil, selama belum dipakai profil lain."""
+    changed = []
+    if email_key and not guest.email_key and email_key not in by_email:
+        guest.email_key = email_key
+        by_email[email_key] = guest
+        changed.append('email_key')
+    if phone_key and not guest.phone_key and phone_key not in by_phone:
+        guest.phone_key = phone_key
+        by_phone[phone_key] = guest
+        changed.append('phone_key')
+    return changed
+
+
+# ===================================================================
+# LOOKUP (satu query lewat index unik)
+# ===================================================================
+def find_guest(email=None, phone=None):
+    """Profil tamu untuk email/telepon mentah, atau None. Dipakai form booking & admin."""
+    email_key, phone_key = normalize_email(email), normalize_phone(phone)
+    if not (email_key or phone_key):
+        return None
+    profiles = list(GuestProfile.objects.filter(_key_filter([email_key] if email_key else [], [phone_key] if phone_key else [])))
+    return _match(
+        email_key, phone_key,
+        {p.email_key: p for p in profiles if p.email_key},
+        {p.phone_key: p for p in profiles if p.phone_key},
+    )
+
+
+def get_or_create_guest(email_key, phone_key, name=''):
+    for _ in range(2):
+        profiles = list(GuestProfile.objects.filter(_key_filter([email_key] if email_key else [], [phone_key] if phone_key else [])))
+        by_email = {p.email_key: p for p in profiles if p.email_key}
+        by_phone = {p.phone_key: p for p in profiles if p.phone_key}
+        guest = _match(email_key, phone_key, by_email, by_phone)
+        try:
+            with transaction.atomic():
+                if guest is None:
+                    return GuestProfile.objects.create(email_key=email_key, phone_key=phone_key, name=name)
+                changed = _fill_keys(guest, email_key, phone_key, by_email, by_phone)
+                if name and guest.name != name:
+                    guest.name = name
+                    changed.append('name')
+                if changed:
+                    guest.save(update_fields=changed)
+                return guest
+        except IntegrityError:
+            # Request lain baru saja membuat/mengklaim kunci yang sama: baca ulang
+            continue
+    return find_guest(email_key, phone_key)
+
+
+def link_guest(reservation):
+    """
+    Menghubungkan reservasi ke profil tamunya (dipanggil signal pre_save).
+    Dilewati jika email dan telepon tidak berubah sejak dimuat.
+    """
+    loaded = getattr(reservation, '_loaded_values', None) or {}
+    if (
+        reservation.guest_id
+        and loaded.get('guest_email') == reservation.guest_email
+        and loaded.get('guest_phone') == reservation.guest_phone
+    ):
+        return
+    email_key, phone_key = normalize_email(reservation.guest_email), normalize_phone(reservation.guest_phone)
+    reservation.guest = get_or_create_guest(email_key, phone_key, reservation.guest_name) if (email_key or phone_key) else None
+
+
+# ===================================================================
+# STATISTIK KUNJUNGAN
+# ===================================================================
+def refresh_stats(guest_ids):
+    """Menghitung ulang statistik profil `guest_ids` dengan satu query agregat."""
+    ids = {guest_id for guest_id in guest_ids if guest_id}
+    if not ids:
+        return 0
+    rows = (
+        Reservation.objects.filter(guest_id__in=ids)
+        .values('guest_id')
+        .annotate(
+            total=Count('id'),
+            visits=Count('id', filter=Q(status='COMPLETED')),
+            no_shows=Count('id', filter=Q(status='NO_SHOW')),
+            last_visit=Max('reservation_date', filter=Q(status='COMPLETED')),
+        )
+        .order_by()
+    )
+    stats = {row['guest_id']: row for row in rows}
+    profiles = list(GuestProfile.objects.filter(pk__in=ids))
+    for profile in profiles:
+        row = stats.get(profile.pk, {})
+        profile.reservation_count = row.get('total', 0)
+        profile.visit_count = row.get('visits', 0)
+        profile.no_show_count = row.get('no_shows', 0)
+        profile.last_visit_date = row.get('last_visit')
+    GuestProfile.objects.bulk_update(profiles, STAT_FIELDS, batch_size=500)
+    return len(profiles)
+
+
+# ===================================================================
+# BACKFILL DATA LAMA (per batch, keyset pagination)
+# ===================================================================
+def backfill(batch_size=1000):
+    """
+    Menghubungkan reservasi yang belum punya profil tamu, `batch_size` baris
+    per transaksi. Setiap batch: satu query profil yang sudah ada, bulk_create
+    profil baru, bulk_update reservasi, lalu statistik profil yang tersentuh.
+    Menghasilkan (jumlah_dibaca, jumlah_dihubungkan) per batch.
+    """
+    last_pk = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Reservation.objects.filter(pk__gt=last_pk, guest__isnull=True)
+                .order_by('pk').values_list('pk', 'guest_name', 'guest_email', 'guest_phone')[:batch_size]
+            )
+            if not batch:
+                return
+            last_pk = batch[-1][0]
+            keyed = [(pk, name, normalize_email(email), normalize_phone(phone)) for pk, name, email, phone in batch]
+            profiles = list(GuestProfile.objects.filter(_key_filter(
+                {email for _, _, email, _ in keyed if email}, {phone for _, _, _, phone in keyed if phone},
+            )))
+            by_email = {p.email_key: p for p in profiles if p.email_key}
+            by_phone = {p.phone_key: p for p in profiles if p.phone_key}
+
+            created, dirty, links = [], {}, []
+            for pk, name, email_key, phone_key in keyed:
+                if not (email_key or phone_key):
+                    continue
+                guest = _match(email_key, phone_key, by_email, by_phone)
+                if guest is None:
+                    guest = GuestProfile(email_key=email_key, phone_key=phone_key, name=name)
+                    created.append(guest)
+                    if email_key:
+                        by_email[email_key] = guest
+                    if phone_key:
+                        by_phone[phone_key] = guest
+                else:
+                    _fill_keys(guest, email_key, phone_key, by_email, by_phone)
+                    guest.name = name or guest.name
+                    if guest.pk:
+                        dirty[guest.pk] = guest
+                links.append((pk, guest))
+
+            GuestProfile.objects.bulk_create(created, batch_size=500)
+            GuestProfile.objects.bulk_update(list(dirty.values()), ['email_key', 'phone_key', 'name'], batch_size=500)
+            Reservation.objects.bulk_update(
+                [Reservation(pk=pk, guest_id=guest.pk) for pk, guest in links], ['guest'], batch_size=500,
+            )
+            refresh_stats(guest.pk for _, guest in links)
+        yield len(batch), len(links)
@@ -0,0 +1,229 @@
+import time
+from collections import Counter
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from . import catalog
+from .models import Reservation
+
+# Tamu yang perlu disiapkan makanannya. COMPLETED tetap dihitung agar manifest
+# hari berjalan tidak menyusut saat tamu selesai makan; NO_SHOW tidak, karena
+# baru diketahui setelah slotnya lewat.
+MANIFEST_STATUSES = ('PENDING', 'CONFIRMED', 'COMPLETED')
+# Kolom reservasi yang menentukan sel manifest (nama attname, seperti _loaded_values)
+MANIFEST_FIELDS = (
+    'restaurant_id', 'reservation_date', 'reservation_time', 'room_type_id',
+    'food_package_id', 'number_of_guests', 'status',
+)
+
+MANIFEST_KEY = 'reservasi:{restaurant_id}:kitchen:{date}'
+# Dinaikkan setiap kali sebuah delta tidak bisa diterapkan; pembaca yang
+# sedang membangun ulang manifest tidak menyimpan hasilnya jika angka ini berubah
+GENERATION_KEY = MANIFEST_KEY + ':generation'
+LOCK_KEY = MANIFEST_KEY + ':lock'
+# Batas umur entri: jika suatu delta sampai terlewat, manifest pulih sendiri
+MANIFEST_TIMEOUT = 60 * 60
+LOCK_TIMEOUT = 5
+LOCK_ATTEMPTS = 20
+LOCK_WAIT_SECONDS = 0.005
+
+
+def _keys(restaurant_id, date):
+    values = {'restaurant_id': restaurant_id, 'date': date.isoformat()}
+    return MANIFEST_KEY.format(**values), GENERATION_KEY.format(**values), LOCK_KEY.format(**values)
+
+
+def cell(values):
+    """
+    (slot, ruangan, paket, jumlah tamu) untuk satu reservasi (dict berisi
+    MANIFEST_FIELDS), atau None jika reservasi itu tidak masuk manifest.
+    """
+    if values is None or values.get('status') not in MANIFEST_STATUSES or values.get('reservation_date') is None:
+        return None
+    return (
+        values['reservation_time'].strftime('%H:%M'), values['room_type_id'],
+        values['food_package_id'], values['number_of_guests'],
+    )
+
+
+# ===================================================================
+# MEMBANGUN MANIFEST (satu query GROUP BY)
+# ===================================================================
+def build_counts(restaurant_id, date):
+    """Jumlah reservasi per (slot, ruangan, paket, jumlah tamu) pada `date`."""
+    rows = (
+        Reservation.objects.filter(restaurant_id=restaurant_id, reservation_date=date, status__in=MANIFEST_STATUSES)
+        .values_list('reservation_time', 'room_type_id', 'food_package_id', 'number_of_guests')
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    return {(slot.strftime('%H:%M'), room_id, package_id, guests): count for slot, room_id, package_id, guests, count in rows}
+
+
+class _locked:
+    """Kunci singkat lewat cache.add (atomik di semua backend cache Django)."""
+
+    def __init__(self, key):
+        self.key = key
+        self.acquired = False
+
+    def __enter__(self):
+        for _ in range(LOCK_ATTEMPTS):
+            if cache.add(self.key, 1, timeout=LOCK_TIMEOUT):
+                self.acquired = True
+                break
+            time.sleep(LOCK_WAIT_SECONDS)
+        return self.acquired
+
+    def __exit__(self, *exc_info):
+        if self.acquired:
+            cache.delete(self.key)
+
+
+def _bump_generation(generation_key):
+    cache.add(generation_key, 0, timeout=None)
+    try:
+        cache.incr(generation_key)
+    except ValueError:
+        cache.set(generation_key, 1, timeout=None)
+
+
+def get_counts(restaurant_id, date):
+    """
+    Manifest `date` dari cache; jika belum ada, dibangun dengan build_counts
+    lalu disimpan, kecuali ada perubahan reservasi yang masuk selama query
+    berjalan (generation berubah) sehingga hasilnya mungkin sudah usang.
+    """
+    key, generation_key, lock_key = _keys(restaurant_id, date)
+    counts = cache.get(key)
+    if counts is not None:
+        return counts
+    generation = cache.get(generation_key, 0)
+    counts = build_counts(restaurant_id, date)
+    with _locked(lock_key) as acquired:
+        if acquired and cache.get(generation_key, 0) == generation:
+            cache.add(key, counts, timeout=MANIFEST_TIMEOUT)
+    return counts
+
+
+# ===================================================================
+# PEMBARUAN INKREMENTAL
+# ===================================================================
+def apply_deltas(deltas):
+    """
+    Menerapkan {(restaurant_id, tanggal): Counter(sel -> selisih)} ke manifest
+    yang ada di cache. Manifest yang belum di-cache cukup ditandai (generation
+    naik) agar pembangunan yang sedang berjalan tidak menyimpan hasil lama.
+    """
+    for (restaurant_id, date), delta in deltas.items():
+        key, generation_key, lock_key = _keys(restaurant_id, date)
+        with _locked(lock_key) as acquired:
+            counts = cache.get(key) if acquired else None
+            if counts is None:
+                _bump_generation(generation_key)
+                if not acquired:
+                    # Tidak bisa diperbarui dengan aman: buang, dibangun ulang saat dibaca
+                    cache.delete(key)
+                continue
+            counts = dict(counts)
+            for cell_key, change in delta.items():
+                count = counts.get(cell_key, 0) + change
+                if count > 0:
+                    counts[cell_key] = count
+                else:
+                    counts.pop(cell_key, None)
+            cache.set(key, counts, timeout=MANIFEST_TIMEOUT)
+
+
+def schedule_update(changes):
+    """
+    Menjadwalkan pembaruan manifest untuk pasangan (nilai_lama, nilai_baru)
+    setelah transaksi commit. Nilai berupa dict MANIFEST_FIELDS atau None
+    (reservasi baru/dihapus).
+    """
+    deltas = {}
+    for old, new in changes:
+        for values, sign in ((old, -1), (new, 1)):
+            cell_key = cell(values)
+            if cell_key is not None:
+                day = deltas.setdefault((values['restaurant_id'], values['reservation_date']), Counter())
+                day[cell_key] += sign
+    deltas = {day: delta for day, delta in deltas.items() if any(delta.values())}
+    if deltas:
+        transaction.on_commit(lambda: apply_deltas(deltas), robust=True)
+
+
+def instance_values(reservation):
+    return {name: getattr(reservation, name) for name in MANIFEST_FIELDS}
+
+
+# ===================================================================
+# BENTUK SIAP-RENDER / JSON
+# ===================================================================
+def _package_row(package_id, packages):
+    package = packages.get(package_id)
+    return {
+        'id': package_id,
+        'name': package.name if package else ("Tanpa paket" if package_id is None else f"Paket #{package_id}"),
+        'reservations': 0,
+        'guests': 0,
+        'party_sizes': Counter(),
+    }
+
+
+def _finish(row):
+    row['party_sizes'] = [{'guests': size, 'count': count} for size, count in sorted(row['party_sizes'].items())]
+    return row
+
+
+def manifest(profile, date):
+    """
+    Manifest dapur cabang `profile` untuk `date`: total per paket sehari, lalu
+    per slot -> ruangan -> paket, masing-masing dengan jumlah reservasi, jumlah
+    porsi (tamu) dan sebaran ukuran rombongan.
+    """
+    counts = get_counts(profile.id, date)
+    rooms = {room.id: room for room in catalog.get_rooms(profile.id)}
+    packages = {package.id: package for package in catalog.get_food_packages(profile.id)}
+
+    totals, slots = {}, {}
+    for (slot, room_id, package_id, guests), count in counts.items():
+        room_rows = slots.setdefault(slot, {})
+        rows = room_rows.setdefault(room_id, {})
+        for row in (
+            totals.setdefault(package_id, _package_row(package_id, packages)),
+            rows.setdefault(package_id, _package_row(package_id, packages)),
+        ):
+            row['reservations'] += count
+            row['guests'] += count * guests
+            row['party_sizes'][guests] += count
+
+    by_name = lambda row: (row['id'] is None, row['name'])
+    slot_rows = []
+    for slot in sorted(slots):
+        room_rows = []
+        for room_id, rows in slots[slot].items():
+            room = rooms.get(room_id)
+            room_rows.append({
+                'id': room_id,
+                'name': room.name if room else f"Ruangan #{room_id}",
+                'packages': [_finish(row) for row in sorted(rows.values(), key=by_name)],
+            })
+        room_rows.sort(key=lambda row: row['name'])
+        slot_rows.append({
+            'time': slot,
+            'reservations': sum(p['reservations'] for r in room_rows for p in r['packages']),
+            'guests': sum(p['guests'] for r in room_rows for p in r['packages']),
+            'rooms': room_rows,
+        })
+    package_rows = [_finish(row) for row in sorted(totals.values(), key=by_name)]
+    return {
+        'date': date.isoformat(),
+        'restaurant': profile.name,
+        'reservations': sum(row['reservations'] for row in package_rows),
+        'guests': sum(row['guests'] for row in package_rows),
+        'packages': package_rows,
+        'slots': slot_rows,
+    }
@@ -0,0 +1,133 @@
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+# Flag "sedang kelebihan beban" disimpan di cache bersama agar semua worker
+# ikut menurunkan beban, bukan hanya worker yang kebetulan mengukur lambat.
+DEGRADED_KEY = 'reservasi:load:degraded'
+
+# Yang dilakukan selama mode degradasi:
+# - ajax_get_time_slots menyajikan ketersediaan terakhir dari cache (stale).
+# - Saran slot alternatif (form booking dan ajax_suggest_slots) TIDAK dihitung.
+#   Pekerjaan ini tidak diantrekan: saran hanya berguna selama tamu masih di
+#   halaman, jadi hasil yang dikirim belakangan sudah tidak relevan. Sebagai
+#   gantinya ajax_suggest_slots mengembalikan `retry_after` + header Retry-After
+#   (sisa cooldown) agar klien meminta lagi setelah beban turun.
+# - Email tetap lewat outbox (process_outbox), yang memang sudah tertunda.
+
+DEFAULT_LOAD_SHEDDING = {
+    'DB_LATENCY_THRESHOLD_MS': 250,  # rata-rata (EWMA) waktu query yang dianggap lambat
+    'EWMA_ALPHA': 0.2,               # bobot sampel terbaru
+    'COOLDOWN_SECONDS': 30,          # lama mode degradasi setelah terakhir kali lambat
+}
+
+_lock = threading.Lock()
+_state = {'ewma_ms': 0.0}
+
+
+def get_config():
+    config = dict(DEFAULT_LOAD_SHEDDING)
+    config.update(getattr(settings, 'RESERVASI_LOAD_SHEDDING', {}))
+    return config
+
+
+# ===================================================================
+# PEMANTAU LATENSI DATABASE
+# ===================================================================
+def record_query_time(duration_ms):
+    """Memperbarui rata-rata bergerak latensi query dan menyalakan mode degradasi jika perlu."""
+    config = get_config()
+    alpha = config['EWMA_ALPHA']
+    with _lock:
+        _state['ewma_ms'] = alpha * duration_ms + (1 - alpha) * _state['ewma_ms']
+        ewma_ms = _state['ewma_ms']
+    if ewma_ms > config['DB_LATENCY_THRESHOLD_MS']:
+        cache.set(DEGRADED_KEY, True, timeout=config['COOLDOWN_SECONDS'])
+
+
+def current_latency_ms():
+    return _state['ewma_ms']
+
+
+def is_degraded():
+    return bool(cache.get(DEGRADED_KEY, False))
+
+
+def retry_after_seconds():
+    """Perkiraan detik sampai mode degradasi bisa berakhir (cooldown penuh)."""
+    return get_config()['COOLDOWN_SECONDS']
+
+
+def query_timer(execute, sql, params, many, context):
+    """execute_wrapper untuk connection: mengukur durasi setiap query."""
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        record_query_time((time.perf_counter() - start) * 1000)
+
+
+# ===================================================================
+# TOKEN BUCKET DI CACHE BERSAMA
+# ===================================================================
+def _refill(key, rate, burst, now, timeout):
+    """
+    Menambahkan token yang terkumpul sejak isi ulang terakhir. Hanya satu
+    request per bucket yang mengisi ulang pada satu waktu (kunci cache.add);
+    request lain cukup melewatinya karena isi ulang tidak mendesak.
+    """
+    stamp_key, lock_key = f'{key}:stamp', f'{key}:lock'
+    if not cache.add(lock_key, 1, timeout=1):
+        return
+    try:
+        last = cache.get(stamp_key)
+        if last is None:
+            cache.set(stamp_key, now, timeout=timeout)
+            return
+        earned = int(max(0.0, now - last) * rate)
+        if earned <= 0:
+            return
+        tokens = cache.get(key)
+        if tokens is None:
+            return
+        # incr (bukan set) agar decr yang terjadi bersamaan tidak tertimpa;
+        # token hanya bisa berkurang sejak dibaca, jadi batas burst tetap terjaga
+        space = burst - max(tokens, 0)
+        if space > 0:
+            cache.incr(key, min(earned, space))
+        # Sisa pecahan waktu dibawa ke isi ulang berikutnya, kecuali bucket penuh
+        stamp = now if earned >= space else last + earned / rate
+        cache.set(stamp_key, stamp, timeout=timeout)
+        cache.touch(key, timeout)
+    finally:
+        cache.delete(lock_key)
+
+
+def take_token(key, rate, burst, now=None):
+    """
+    Mengambil satu token dari bucket `key` (isi ulang `rate` token/detik,
+    maksimal `burst`). Mengembalikan (diizinkan, detik_tunggu).
+
+    Jumlah token berupa integer di cache: cache.add untuk nilai awal dan
+    cache.decr untuk mengambil token, jadi setiap request mendapat hasil
+    baca-ubah-tulis atomik sendiri dan burst serentak tidak bisa lolos bersama.
+    """
+    now = time.time() if now is None else now
+    burst = int(burst)
+    timeout = int(burst / rate) + 1
+    cache.add(key, burst, timeout=timeout)
+    _refill(key, rate, burst, now, timeout)
+    try:
+        remaining = cache.decr(key)
+    except ValueError:
+        # Entri baru saja kedaluwarsa/dibuang: mulai lagi dari bucket penuh
+        cache.add(key, burst, timeout=timeout)
+        remaining = cache.decr(key)
+    if remaining >= 0:
+        return True, 0
+    # Kembalikan token yang tidak jadi dipakai
+    cache.incr(key)
+    last = cache.get(f'{key}:stamp', now)
+    return False, max(0.0, last + 1 / rate - now)
@@ -0,0 +1,87 @@
+import datetime
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from reservasi import audit, catalog
+from reservasi.models import Reservation
+from reservasi.occupancy import ACTIVE_STATUSES
+from reservasi.services import bulk_set_status
+
+
+class Command(BaseCommand):
+    help = (
+        "Memeriksa seluruh reservasi aktif terhadap kapasitas ruangan dalam satu "
+        "lintasan dan melaporkan slot yang kelebihan tamu sebagai JSON. Dengan --fix, "
+        "booking terbaru yang melebihi kapasitas dipindah ke WAITLISTED."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--branch', help="Slug cabang yang diperiksa (default: semua cabang)")
+        parser.add_argument('--from-date', help="Mulai tanggal YYYY-MM-DD (default: hari ini)")
+        parser.add_argument('--to-date', help="Sampai tanggal YYYY-MM-DD (default: tanpa batas)")
+        parser.add_argument('--fix', action='store_true', help="Pindahkan booking kelebihan ke WAITLISTED")
+        parser.add_argument('--batch-size', type=int, default=200, help="Jumlah reservasi per transaksi perbaikan (default 200)")
+        parser.add_argument('--chunk-size', type=int, default=2000, help="Jumlah baris yang dibaca per fetch (default 2000)")
+        parser.add_argument('--output', help="Tulis laporan JSON ke file ini (default: stdout)")
+
+    def parse_date(self, value, option):
+        try:
+            return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f"{option} harus berformat YYYY-MM-DD.")
+
+    def handle(self, *args, **options):
+        queryset = Reservation.objects.filter(
+            reservation_date__gte=self.parse_date(options['from_date'], '--from-date') if options['from_date'] else timezone.localdate()
+        )
+        if options['to_date']:
+            queryset = queryset.filter(reservation_date__lte=self.parse_date(options['to_date'], '--to-date'))
+        if options['branch']:
+            branch = catalog.branch_for_slug(options['branch'])
+            if branch is None:
+                raise CommandError(f"Cabang '{options['branch']}' tidak ditemukan.")
+            queryset = queryset.filter(restaurant=branch)
+
+        out = open(options['output'], 'w', encoding='utf-8') if options['output'] else self.stdout
+        stats = {}
+        pending, fixed, excess_total, findings = [], 0, 0, 0
+        try:
+            # Laporan ditulis bertahap agar memori tidak bergantung pada jumlah temuan
+            out.write('{"findings": [')
+            for finding in audit.audit(queryset, options['chunk_size'], stats):
+                out.write((',' if findings else '') + '\n  ' + json.dumps(finding))
+                findings += 1
+                excess = finding.get('excess_reservation_ids', [])
+                excess_total += len(excess)
+                if options['fix']:
+                    pending.extend(excess)
+                    while len(pending) >= options['batch_size']:
+                        fixed += self.fix_batch(pending[:options['batch_size']])
+                        del pending[:options['batch_size']]
+            if options['fix'] and pending:
+                fixed += self.fix_batch(pending)
+
+            summary = {
+                'scanned': stats.get('scanned', 0),
+                'branch_days': stats.get('branch_days', 0),
+                'findings': findings,
+                'excess_reservations': excess_total,
+                'waitlisted': fixed,
+            }
+            out.write('\n], "summary": ' + json.dumps(summary) + '}\n')
+        finally:
+            if options['output']:
+                out.close()
+
+        if options['output'] or options['fix']:
+            message = f"{findings} temuan, {excess_total} booking melebihi kapasitas"
+            if options['fix']:
+                message += f", {fixed} dipindah ke waiting list"
+            self.stderr.write(message + ".")
+
+    def fix_batch(self, ids):
+        # Satu transaksi per batch (bulk_set_status), termasuk notifikasi ke tamu.
+        # Hanya baris yang masih aktif yang dipindah, jika sempat diubah staf.
+        return bulk_set_status(Reservation.objects.filter(pk__in=ids, status__in=ACTIVE_STATUSES), 'WAITLISTED')
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from reservasi import guests
+
+
+class Command(BaseCommand):
+    help = (
+        "Menghubungkan reservasi lama ke profil tamu berdasarkan email dan nomor "
+        "telepon yang dinormalisasi, per batch. Aman dijalankan ulang: hanya "
+        "reservasi yang belum punya profil yang diproses."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000, help="Jumlah reservasi per transaksi (default 1000)")
+
+    def handle(self, *args, **options):
+        scanned = linked = 0
+        for batch_scanned, batch_linked in guests.backfill(options['batch_size']):
+            scanned += batch_scanned
+            linked += batch_linked
+            self.stdout.write(f"{scanned} reservasi dibaca, {linked} dihubungkan ke profil tamu...")
+        self.stdout.write(self.style.SUCCESS(f"Selesai: {linked} dari {scanned} reservasi dihubungkan."))
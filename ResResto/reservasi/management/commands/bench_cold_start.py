@@ -0,0 +1,113 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Dijalankan di proses Python baru agar setiap pengukuran benar-benar "dingin".
+# Mencetak satu baris JSON: waktu impor modul entrypoint dan waktu sampai
+# respons pertama untuk setiap path.
+CHILD_SCRIPT = r'''
+import asyncio, io, json, os, sys, time
+from wsgiref.util import setup_testing_defaults
+
+kind, paths = sys.argv[1], sys.argv[2:]
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "ResResto.settings")
+
+start = time.perf_counter()
+if kind == "wsgi":
+    from ResResto.wsgi import application
+else:
+    from ResResto.asgi import application
+import_seconds = time.perf_counter() - start
+
+
+def wsgi_get(path):
+    environ = {"PATH_INFO": path, "HTTP_HOST": "localhost", "wsgi.input": io.BytesIO()}
+    setup_testing_defaults(environ)
+    status = []
+    body = b"".join(application(environ, lambda s, h, exc_info=None: status.append(s)))
+    return int(status[0].split()[0])
+
+
+async def asgi_get(path):
+    status = []
+    sent = [False]
+
+    async def receive():
+        if not sent[0]:
+            sent[0] = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"localhost")], "server": ("localhost", 80), "client": ("127.0.0.1", 0),
+    }
+    await application(scope, receive, send)
+    return status[0]
+
+
+responses = []
+for path in paths:
+    t = time.perf_counter()
+    code = wsgi_get(path) if kind == "wsgi" else asyncio.run(asgi_get(path))
+    responses.append({"path": path, "status": code, "seconds": time.perf_counter() - t})
+
+print(json.dumps({
+    "import_seconds": import_seconds,
+    "first_response_seconds": import_seconds + responses[0]["seconds"],
+    "responses": responses,
+}))
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark cold start: mengukur waktu impor ResResto.wsgi/ResResto.asgi "
+        "dan waktu sampai respons pertama di proses baru, dengan dan tanpa warm-up."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Jumlah proses baru per skenario (default 5)")
+        parser.add_argument('--path', action='append', dest='paths', help="Path yang diminta (boleh diulang; default / dan /buat-reservasi/)")
+        parser.add_argument('--json', action='store_true', help="Keluarkan hasil mentah dalam JSON")
+
+    def measure(self, kind, warmup, paths):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get('DJANGO_SETTINGS_MODULE', 'ResResto.settings'))
+        env['RESRESTO_WARMUP'] = '1' if warmup else '0'
+        completed = subprocess.run(
+            [sys.executable, '-c', CHILD_SCRIPT, kind, *paths],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        # Baris terakhir stdout adalah JSON (baris sebelumnya bisa berupa log aplikasi)
+        return json.loads(completed.stdout.strip().splitlines()[-1])
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or ['/', '/buat-reservasi/']
+        results = {}
+        for kind in ('wsgi', 'asgi'):
+            for warmup in (False, True):
+                label = f"{kind}{' + warmup' if warmup else ''}"
+                results[label] = [self.measure(kind, warmup, paths) for _ in range(options['runs'])]
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+            return
+
+        self.stdout.write(f"{'skenario':<16} {'impor (ms)':>12} {'respons 1 (ms)':>15} {'t. respons 1 (ms)':>18}  status")
+        for label, runs in results.items():
+            import_ms = statistics.median(r['import_seconds'] for r in runs) * 1000
+            first_ms = statistics.median(r['responses'][0]['seconds'] for r in runs) * 1000
+            total_ms = statistics.median(r['first_response_seconds'] for r in runs) * 1000
+            codes = sorted({resp['status'] for r in runs for resp in r['responses']})
+            self.stdout.write(f"{label:<16} {import_ms:12.1f} {first_ms:15.1f} {total_ms:18.1f}  {codes}")
+        self.stdout.write("Nilai adalah median. 'impor' termasuk django.setup() dan warm-up (jika aktif).")
@@ -0,0 +1,45 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from reservasi import load, notifications
+
+
+class Command(BaseCommand):
+    help = (
+        "Mengirim notifikasi reservasi yang tertunda di outbox secara batch "
+        "dan mengantrikan pengingat untuk reservasi yang akan datang."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50, help="Jumlah pesan per batch (default 50)")
+        parser.add_argument('--workers', type=int, default=4, help="Jumlah thread pengirim (default 4)")
+        parser.add_argument('--loop', action='store_true', help="Terus berjalan dan memeriksa outbox secara berkala")
+        parser.add_argument('--interval', type=float, default=5.0, help="Jeda antar pemeriksaan dalam mode --loop (detik)")
+        parser.add_argument('--no-reminders', action='store_true', help="Jangan mengantrikan pengingat terjadwal")
+
+    def handle(self, *args, **options):
+        while True:
+            if options['loop'] and load.is_degraded():
+                # Notifikasi tidak mendesak: beri ruang ke request booking saat DB lambat
+                time.sleep(options['interval'])
+                continue
+
+            if not options['no_reminders']:
+                queued = notifications.queue_due_reminders()
+                if queued:
+                    self.stdout.write(f"{queued} pengingat diantrikan.")
+
+            total_sent = total_failed = 0
+            while True:
+                sent, failed = notifications.dispatch_batch(options['batch_size'], options['workers'])
+                total_sent += sent
+                total_failed += failed
+                if sent + failed < options['batch_size']:
+                    break
+            if total_sent or total_failed or not options['loop']:
+                self.stdout.write(self.style.SUCCESS(f"{total_sent} notifikasi terkirim, {total_failed} gagal."))
+
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,114 @@
+import json
+import os
+import shutil
+import tempfile
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reservasi import stress
+
+
+class Command(BaseCommand):
+    help = (
+        "Stress test konkurensi: banyak thread memesan, membatalkan, memindah ke "
+        "waiting list dan menjalankan aksi admin lewat view sebenarnya terhadap "
+        "database SQLite berbasis file, lalu memeriksa invarian (kapasitas ruangan, "
+        "tidak ada perubahan status yang hilang). Melaporkan throughput dan seed "
+        "gagal terkecil."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seed', type=int, default=1, help="Seed pertama (default 1)")
+        parser.add_argument('--runs', type=int, default=5, help="Jumlah seed berurutan yang dijalankan (default 5)")
+        parser.add_argument('--threads', type=int, default=8, help="Jumlah thread worker (default 8)")
+        parser.add_argument('--operations', type=int, default=50, help="Operasi per thread (default 50)")
+        parser.add_argument('--days', type=int, default=3, help="Rentang tanggal booking mulai besok (default 3)")
+        parser.add_argument('--think-ms', type=float, default=5, help="Jeda acak maksimum antara baca dan tulis di aksi admin (default 5 ms)")
+        parser.add_argument('--booking-gap-ms', type=float, default=5, help="Jeda antara cek kapasitas dan insert di jalur booking (default 5 ms)")
+        parser.add_argument('--shrink', action='store_true', help="Perkecil jumlah operasi untuk seed gagal terkecil")
+        parser.add_argument('--keep-going', action='store_true', help="Tetap jalankan seed berikutnya setelah ada yang gagal")
+        parser.add_argument('--workdir', help="Folder untuk file database (default: folder sementara, dihapus setelah selesai)")
+        parser.add_argument('--json', action='store_true', help="Keluarkan hasil mentah dalam JSON")
+
+    def handle(self, *args, **options):
+        if options['threads'] < 1 or options['operations'] < 1:
+            raise CommandError("--threads dan --operations harus lebih dari 0.")
+        workdir = options['workdir'] or tempfile.mkdtemp(prefix='resresto-stres-')
+        os.makedirs(workdir, exist_ok=True)
+        template = os.path.join(workdir, 'template.sqlite3')
+        if os.path.exists(template):
+            os.remove(template)
+        try:
+            stress.prepare_template(template, options['threads'])
+            results = []
+            for seed in range(options['seed'], options['seed'] + options['runs']):
+                result = self.run(template, workdir, seed, options['operations'], options)
+                results.append(result)
+                if result['violations'] and not options['keep_going']:
+                    break
+
+            failing = [result['seed'] for result in results if result['violations']]
+            report = {'runs': results, 'failing_seeds': failing, 'minimal_failing_seed': min(failing) if failing else None}
+            if failing and options['shrink']:
+                report['shrunk'] = self.shrink(template, workdir, min(failing), options)
+        finally:
+            if not options['workdir']:
+                shutil.rmtree(workdir, ignore_errors=True)
+
+        if options['json']:
+            self.stdout.write(json.dumps(report, indent=2, default=str))
+        else:
+            self.print_report(report, options)
+        if failing:
+            raise CommandError(f"Invarian dilanggar pada seed {failing}.")
+
+    def run(self, template, workdir, seed, operations, options):
+        result = stress.run_seed(
+            template, workdir, seed, options['threads'], operations,
+            days=options['days'], think_time=options['think_ms'] / 1000,
+            booking_gap_time=options['booking_gap_ms'] / 1000,
+        )
+        if not options['json']:
+            status = f"{len(result['violations'])} pelanggaran" if result['violations'] else "OK"
+            self.stderr.write(
+                f"seed {seed}: {result['operations']} operasi, {result['throughput']:.1f} op/detik, {status}"
+            )
+        return result
+
+    def shrink(self, template, workdir, seed, options, attempts=3):
+        """
+        Membagi dua jumlah operasi per thread selama seed ini masih gagal.
+        Interleaving thread tidak deterministik, jadi setiap ukuran dicoba
+        beberapa kali sebelum dianggap lolos.
+        """
+        smallest = options['operations']
+        operations = smallest // 2
+        while operations >= 1:
+            if not any(self.run(template, workdir, seed, operations, options)['violations'] for _ in range(attempts)):
+                break
+            smallest = operations
+            operations //= 2
+        return {'seed': seed, 'operations': smallest}
+
+    def print_report(self, report, options):
+        self.stdout.write(f"{'seed':>6} {'operasi':>8} {'op/detik':>9} {'p50 ms':>8} {'p95 ms':>8} {'error':>6} {'pelanggaran':>12}")
+        for result in report['runs']:
+            self.stdout.write(
+                f"{result['seed']:>6} {result['operations']:>8} {result['throughput']:>9.1f} "
+                f"{result['p50_ms']:>8.1f} {result['p95_ms']:>8.1f} {len(result['errors']):>6} {len(result['violations']):>12}"
+            )
+        for result in report['runs']:
+            for violation in result['violations'][:10]:
+                self.stdout.write(f"  seed {result['seed']} [{violation['invariant']}] {violation['message']}")
+            for error in result['errors'][:5]:
+                self.stdout.write(f"  seed {result['seed']} error: {error}")
+
+        minimal = report['minimal_failing_seed']
+        if minimal is None:
+            self.stdout.write(self.style.SUCCESS("Semua invarian terpenuhi."))
+            return
+        operations = report.get('shrunk', {}).get('operations', options['operations'])
+        self.stdout.write(self.style.ERROR(
+            f"Seed gagal terkecil: {minimal}. Ulangi dengan: manage.py stress_test --seed {minimal} --runs 1 "
+            f"--threads {options['threads']} --operations {operations}"
+        ))
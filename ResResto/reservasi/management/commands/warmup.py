@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from reservasi import warmup
+
+
+class Command(BaseCommand):
+    help = (
+        "Memanaskan proses: mengisi resolver URL, mengompilasi template, "
+        "serta mengisi cache katalog dan slot waktu beberapa hari ke depan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=7, help="Jumlah hari slot waktu yang di-cache (default 7)")
+
+    def handle(self, *args, **options):
+        results = warmup.run(days=options['days'])
+        total = 0.0
+        for name, elapsed, outcome in results:
+            total += elapsed
+            self.stdout.write(f"{name:<12} {elapsed * 1000:8.1f} ms  {outcome}")
+        self.stdout.write(self.style.SUCCESS(f"Warm-up selesai dalam {total * 1000:.1f} ms."))
@@ -0,0 +1,277 @@
+import math
+import mimetypes
+import os
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.db import connection
+from django.core.exceptions import DisallowedHost
+from django.http import FileResponse, HttpResponse, HttpResponseNotModified, HttpResponsePermanentRedirect, JsonResponse
+from django.urls import get_script_prefix, set_script_prefix
+from django.utils.http import http_date
+
+from . import catalog, load, profiler
+
+
+# ===================================================================
+# CABANG: tentukan restoran dari host atau prefix URL
+# ===================================================================
+class BranchMiddleware:
+    """
+    Mengisi `request.restaurant` dengan cabang yang dilayani request ini:
+
+    1. host yang cocok dengan `RestaurantProfile.host` (bandung.resresto.id), lalu
+    2. prefix URL berupa slug cabang (/bandung/buat-reservasi/). Prefix dilepas
+       dari path_info dan dijadikan script prefix, sehingga urls.py tetap sama
+       dan {% url %}/reverse() otomatis menghasilkan link di cabang yang sama.
+    3. Selain itu cabang bawaan (lihat catalog.default_branch).
+
+    Daftar cabang dibaca dari cache katalog, jadi resolusi ini tidak menjalankan query.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        restaurant = None
+        script_prefix = get_script_prefix()
+        try:
+            restaurant = catalog.branch_for_host(request.get_host().rsplit(':', 1)[0])
+        except DisallowedHost:
+            # Biarkan CommonMiddleware yang menolak host ini
+            pass
+
+        if restaurant is None:
+            slug, slash, rest = request.path_info.lstrip('/').partition('/')
+            restaurant = catalog.branch_for_slug(slug) if slug else None
+            if restaurant is not None:
+                if not slash:
+                    # /bandung -> /bandung/
+                    query = request.META.get('QUERY_STRING', '')
+                    return HttpResponsePermanentRedirect(request.path + '/' + (f'?{query}' if query else ''))
+                set_script_prefix(f"{script_prefix}{slug}/")
+                request.path_info = '/' + rest
+
+        request.restaurant = restaurant or catalog.default_branch()
+        try:
+            return self.get_response(request)
+        finally:
+            # Script prefix disimpan per thread; kembalikan agar tidak bocor ke kode lain
+            set_script_prefix(script_prefix)
+
+
+# ===================================================================
+# PROFILER: cProfile + SQL untuk request yang disampel
+# ===================================================================
+class ProfilerMiddleware:
+    """
+    Memprofil request terpilih (lihat `RESERVASI_PROFILER`): sebagian kecil
+    request secara acak (`SAMPLE_RATE`, bawaan 0 = mati), atau request staf
+    yang diberi ?_profile=1 / header `X-Profile: 1`. Hasilnya disimpan sebagai
+    ProfiledRequest dan id-nya dikirim di header `X-Profile-Id`. Request lain
+    hanya membayar satu pemeriksaan konfigurasi.
+
+    Dipasang setelah AuthenticationMiddleware (butuh request.user), sehingga
+    middleware berikutnya, view dan rendering template ikut terukur.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = profiler.get_config()
+        reason = profiler.sample_reason(request, config)
+        if reason is None:
+            return self.get_response(request)
+
+        with profiler.RequestProfile() as profile:
+            response = self.get_response(request)
+        # Respons streaming (SSE) belum selesai di sini; profilnya tidak bermakna
+        if not response.streaming:
+            record = profiler.save(request, response, profile, reason, config)
+            if record is not None:
+                response['X-Profile-Id'] = str(record.pk)
+        return response
+
+
+# ===================================================================
+# RATE LIMIT: token bucket per klien per endpoint
+# ===================================================================
+class RateLimitMiddleware:
+    """
+    Membatasi endpoint publik sesuai `settings.RESERVASI_RATE_LIMITS`, yang
+    dikunci dengan nama URL lengkap, misalnya:
+
+        'reservasi:ajax_get_time_slots': {'rate': 2, 'burst': 20},
+        'reservasi:create_reservation': {'rate': 0.2, 'burst': 5, 'methods': ['POST']},
+
+    `rate` adalah token per detik, `burst` kapasitas bucket. Klien dikenali
+    dari user yang login, lalu IP; `'key': 'session'` memakai session key
+    jika ada. Endpoint yang tidak terdaftar tidak dibatasi.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        return self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        match = request.resolver_match
+        if match is None:
+            return None
+        budgets = getattr(settings, 'RESERVASI_RATE_LIMITS', {})
+        budget = budgets.get(match.view_name)
+        if not budget:
+            return None
+        methods = budget.get('methods')
+        if methods and request.method not in methods:
+            return None
+
+        bucket_key = f"reservasi:ratelimit:{match.view_name}:{self.client_key(request, budget.get('key'))}"
+        allowed, retry_after = load.take_token(bucket_key, budget['rate'], budget['burst'])
+        if allowed:
+            return None
+
+        retry_after = max(1, math.ceil(retry_after))
+        message = "Terlalu banyak permintaan. Silakan coba lagi sebentar lagi."
+        if match.url_name.startswith('ajax_'):
+            response = JsonResponse({'error': message}, status=429)
+        else:
+            response = HttpResponse(message, status=429, content_type='text/plain; charset=utf-8')
+        response['Retry-After'] = str(retry_after)
+        return response
+
+    @staticmethod
+    def client_key(request, mode=None):
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            return f'user:{user.pk}'
+        if mode == 'session':
+            session = getattr(request, 'session', None)
+            if session is not None and session.session_key:
+                return f'session:{session.session_key}'
+        return f'ip:{client_ip(request)}'
+
+
+def client_ip(request):
+    # X-Forwarded-For hanya dipercaya jika aplikasi memang di belakang proxy
+    if getattr(settings, 'RESERVASI_TRUST_X_FORWARDED_FOR', False):
+        forwarded = request.META.get('HTTP_X_FORWARDED_FOR')
+        if forwarded:
+            return forwarded.split(',')[0].strip()
+    return request.META.get('REMOTE_ADDR', 'unknown')
+
+
+# ===================================================================
+# LOAD SHEDDING: ukur latensi DB untuk menentukan mode degradasi
+# ===================================================================
+class LoadSheddingMiddleware:
+    """
+    Mengukur durasi setiap query selama request. Jika rata-rata latensinya
+    melewati ambang `RESERVASI_LOAD_SHEDDING['DB_LATENCY_THRESHOLD_MS']`,
+    aplikasi masuk mode degradasi (lihat reservasi/load.py): ketersediaan
+    slot dilayani dari cache dan pekerjaan yang tidak mendesak dilewati.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        with connection.execute_wrapper(load.query_timer):
+            response = self.get_response(request)
+        if load.is_degraded():
+            response['X-Load-Shedding'] = 'on'
+        return response
+
+
+# ===================================================================
+# STATIC: sajikan varian .br/.gz hasil collectstatic tanpa melewati view
+# ===================================================================
+# Nama dari ManifestStaticFilesStorage: nama.<12 hex>.ext
+HASHED_NAME_RE = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+# File tanpa hash bisa berubah pada deploy berikutnya; cache sebentar saja
+MUTABLE_CACHE_CONTROL = 'public, max-age=60'
+ENCODINGS = [('br', '.br'), ('gzip', '.gz')]
+# Varian yang diminta langsung (app.css.gz) dikirim apa adanya sebagai arsip
+ARCHIVE_CONTENT_TYPES = {'br': 'application/x-brotli', 'gzip': 'application/gzip'}
+# Manifest collectstatic memetakan semua nama file; bukan untuk publik
+HIDDEN_NAMES = {ManifestStaticFilesStorage.manifest_name}
+
+
+def accepted_encodings(header):
+    """Himpunan encoding di Accept-Encoding yang tidak ditolak (q=0)."""
+    accepted = set()
+    for part in header.split(','):
+        token, _, params = part.strip().partition(';')
+        params = params.replace(' ', '')
+        if token and not re.fullmatch(r'q=0(\.0*)?', params):
+            accepted.add(token.strip().lower())
+    return accepted
+
+
+class PrecompressedStaticMiddleware:
+    """
+    Melayani file di STATIC_ROOT (hasil `collectstatic`) langsung dari
+    middleware. Jika browser menerima br/gzip dan varian .br/.gz tersedia,
+    varian itu yang dikirim, jadi tidak ada kompresi saat request. File
+    bernama ber-hash diberi Cache-Control immutable selama setahun.
+
+    Request lain, atau jika STATIC_ROOT belum dibuat, diteruskan seperti biasa.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.root = os.path.realpath(settings.STATIC_ROOT) if getattr(settings, 'STATIC_ROOT', None) else None
+        self.prefix = '/' + settings.STATIC_URL.lstrip('/') if settings.STATIC_URL and '://' not in settings.STATIC_URL else None
+
+    def __call__(self, request):
+        if self.root and self.prefix and request.path.startswith(self.prefix) and request.method in ('GET', 'HEAD'):
+            response = self.serve(request, request.path[len(self.prefix):])
+            if response is not None:
+                return response
+        return self.get_response(request)
+
+    def resolve(self, name):
+        path = os.path.realpath(os.path.join(self.root, name))
+        # Tolak path traversal keluar dari STATIC_ROOT
+        if not path.startswith(self.root + os.sep) or not os.path.isfile(path):
+            return None
+        base_name = os.path.relpath(path, self.root).replace(os.sep, '/')
+        for _, suffix in ENCODINGS:
+            base_name = base_name.removesuffix(suffix)
+        if base_name in HIDDEN_NAMES:
+            return None
+        return path
+
+    def serve(self, request, name):
+        path = self.resolve(name)
+        if path is None:
+            return None
+
+        accepted = accepted_encodings(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        encoding, served_path = None, path
+        for candidate, suffix in ENCODINGS:
+            if candidate in accepted and os.path.isfile(path + suffix):
+                encoding, served_path = candidate, path + suffix
+                break
+
+        stat = os.stat(served_path)
+        etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+        cache_control = IMMUTABLE_CACHE_CONTROL if HASHED_NAME_RE.search(name) else MUTABLE_CACHE_CONTROL
+        if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+            response = HttpResponseNotModified()
+        else:
+            content_type, archive = mimetypes.guess_type(path)
+            content_type = ARCHIVE_CONTENT_TYPES.get(archive) or content_type or 'application/octet-stream'
+            response = FileResponse(open(served_path, 'rb'), content_type=content_type)
+            response['Content-Length'] = stat.st_size
+            if encoding:
+                response['Content-Encoding'] = encoding
+        response['ETag'] = etag
+        response['Last-Modified'] = http_date(stat.st_mtime)
+        response['Cache-Control'] = cache_control
+        response['Vary'] = 'Accept-Encoding'
+        return response
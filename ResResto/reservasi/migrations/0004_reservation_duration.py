@@ -0,0 +1,42 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:05
+
+from django.db import migrations, models
+
+
+def backfill_duration(apps, schema_editor):
+    # Reservasi lama belum punya durasi: isi dari durasi bawaan ruangannya
+    Reservation = apps.get_model('reservasi', 'Reservation')
+    Room = apps.get_model('reservasi', 'Room')
+    for room_id, duration in Room.objects.values_list('id', 'default_duration_minutes'):
+        Reservation.objects.filter(room_type_id=room_id, duration_minutes__isnull=True).update(duration_minutes=duration)
+    Reservation.objects.filter(duration_minutes__isnull=True).update(duration_minutes=120)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservasi', '0003_foodpackage_room_alter_reservation_options_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodpackage',
+            name='default_duration_minutes',
+            field=models.PositiveIntegerField(blank=True, help_text='Lama makan (menit) untuk paket ini. Kosongkan untuk mengikuti durasi ruangan.', null=True, verbose_name='Durasi Paket (menit)'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='duration_minutes',
+            field=models.PositiveIntegerField(blank=True, help_text='Lama makan (menit). Kosongkan untuk memakai durasi paket atau ruangan.', null=True, verbose_name='Durasi (menit)'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='default_duration_minutes',
+            field=models.PositiveIntegerField(default=120, help_text='Lama makan bawaan (menit) untuk reservasi di ruangan ini', verbose_name='Durasi Bawaan (menit)'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['reservation_date', 'status'], name='reservasi_date_status_idx'),
+        ),
+        migrations.RunPython(backfill_duration, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,79 @@
+from django.db import migrations
+
+FTS_TABLE = 'reservasi_reservation_fts'
+
+# Nomor telepon disimpan di indeks hanya berupa digit agar "0812-3456" dan
+# "0812 3456" sama-sama cocok dengan "08123456".
+NORMALIZED_PHONE = (
+    "REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(COALESCE({row}.guest_phone, ''),"
+    " ' ', ''), '-', ''), '+', ''), '(', ''), ')', ''), '.', '')"
+)
+
+
+def _values(row):
+    return (
+        f"{row}.id, {row}.guest_name, {row}.guest_email, "
+        f"{NORMALIZED_PHONE.format(row=row)}, COALESCE({row}.special_requests, '')"
+    )
+
+
+FORWARD_SQL = [
+    f"""
+    CREATE VIRTUAL TABLE {FTS_TABLE} USING fts5(
+        guest_name, guest_email, guest_phone, special_requests,
+        tokenize = 'unicode61 remove_diacritics 2',
+        prefix = '2 3'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ai AFTER INSERT ON reservasi_reservation BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, guest_name, guest_email, guest_phone, special_requests)
+        VALUES ({_values('new')});
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_ad AFTER DELETE ON reservasi_reservation BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {FTS_TABLE}_au AFTER UPDATE OF guest_name, guest_email, guest_phone, special_requests
+    ON reservasi_reservation BEGIN
+        DELETE FROM {FTS_TABLE} WHERE rowid = old.id;
+        INSERT INTO {FTS_TABLE}(rowid, guest_name, guest_email, guest_phone, special_requests)
+        VALUES ({_values('new')});
+    END
+    """,
+    f"""
+    INSERT INTO {FTS_TABLE}(rowid, guest_name, guest_email, guest_phone, special_requests)
+    SELECT {_values('reservasi_reservation')} FROM reservasi_reservation
+    """,
+]
+
+REVERSE_SQL = [
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_au",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ad",
+    f"DROP TRIGGER IF EXISTS {FTS_TABLE}_ai",
+    f"DROP TABLE IF EXISTS {FTS_TABLE}",
+]
+
+
+def _run(statements):
+    def run(apps, schema_editor):
+        # FTS5 khusus SQLite; database lain memakai pencarian icontains biasa
+        if schema_editor.connection.vendor != 'sqlite':
+            return
+        for statement in statements:
+            schema_editor.execute(statement)
+    return run
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservasi', '0004_reservation_duration'),
+    ]
+
+    operations = [
+        migrations.RunPython(_run(FORWARD_SQL), _run(REVERSE_SQL)),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservasi', '0005_reservation_fts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OutboxMessage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('RECEIVED', 'Reservasi Diterima'), ('CONFIRMED', 'Reservasi Dikonfirmasi'), ('CANCELLED', 'Reservasi Dibatalkan'), ('WAITLISTED', 'Masuk Waiting List'), ('REMINDER', 'Pengingat Reservasi')], max_length=20, verbose_name='Jenis')),
+                ('recipient', models.EmailField(max_length=254, verbose_name='Penerima')),
+                ('status', models.CharField(choices=[('PENDING', 'Menunggu'), ('PROCESSING', 'Sedang Dikirim'), ('SENT', 'Terkirim'), ('FAILED', 'Gagal')], default='PENDING', max_length=20, verbose_name='Status')),
+                ('attempts', models.PositiveIntegerField(default=0, verbose_name='Percobaan')),
+                ('available_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Dikirim Mulai')),
+                ('lock_token', models.CharField(blank=True, default='', editable=False, max_length=32)),
+                ('locked_at', models.DateTimeField(blank=True, editable=False, null=True)),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name='Terkirim Pada')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Error Terakhir')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Dibuat Pada')),
+            ],
+            options={
+                'verbose_name': 'Notifikasi Keluar',
+                'verbose_name_plural': 'Antrian Notifikasi',
+                'ordering': ['available_at', 'id'],
+            },
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='reminder_queued_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='Pengingat Diantrikan Pada'),
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(condition=models.Q(('reminder_queued_at__isnull', True)), fields=['status', 'reservation_date', 'reservation_time'], name='reservasi_reminder_due_idx'),
+        ),
+        migrations.AddField(
+            model_name='outboxmessage',
+            name='reservation',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='outbox_messages', to='reservasi.reservation', verbose_name='Reservasi'),
+        ),
+        migrations.AddIndex(
+            model_name='outboxmessage',
+            index=models.Index(fields=['status', 'available_at'], name='reservasi_outbox_due_idx'),
+        ),
+    ]
@@ -0,0 +1,144 @@
+# Generated by Django 5.2.3 on 2026-10-19 15:20
+
+from importlib import import_module
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils.text import slugify
+
+fts = import_module('reservasi.migrations.0005_reservation_fts')
+
+
+def backfill_branches(apps, schema_editor):
+    # Data lama milik satu restoran: jadikan profil yang ada sebagai cabang pertama
+    RestaurantProfile = apps.get_model('reservasi', 'RestaurantProfile')
+    Room = apps.get_model('reservasi', 'Room')
+    FoodPackage = apps.get_model('reservasi', 'FoodPackage')
+    Reservation = apps.get_model('reservasi', 'Reservation')
+
+    used = set()
+    for profile in RestaurantProfile.objects.order_by('id'):
+        base = slugify(profile.name)[:40] or 'cabang'
+        slug, n = base, 1
+        while slug in used:
+            n += 1
+            slug = f"{base}-{n}"
+        used.add(slug)
+        RestaurantProfile.objects.filter(pk=profile.pk).update(slug=slug)
+
+    has_data = Room.objects.exists() or FoodPackage.objects.exists() or Reservation.objects.exists()
+    default = RestaurantProfile.objects.order_by('id').first()
+    if default is None:
+        if not has_data:
+            return
+        default = RestaurantProfile.objects.create(slug='utama')
+
+    Room.objects.filter(restaurant__isnull=True).update(restaurant=default)
+    FoodPackage.objects.filter(restaurant__isnull=True).update(restaurant=default)
+    for room_id, restaurant_id in Room.objects.values_list('id', 'restaurant_id'):
+        Reservation.objects.filter(room_type_id=room_id, restaurant__isnull=True).update(restaurant_id=restaurant_id)
+    Reservation.objects.filter(restaurant__isnull=True).update(restaurant=default)
+
+
+def restore_fts(apps, schema_editor):
+    # AlterField di SQLite membuat ulang tabel reservasi_reservation, dan trigger
+    # FTS ikut terhapus bersama tabel lamanya. Pasang ulang lalu sinkronkan indeks.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in fts.REVERSE_SQL[:3]:
+        schema_editor.execute(statement)
+    for statement in fts.FORWARD_SQL[1:4]:
+        schema_editor.execute(statement)
+    schema_editor.execute(f"DELETE FROM {fts.FTS_TABLE}")
+    schema_editor.execute(fts.FORWARD_SQL[4])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservasi', '0006_outbox'),
+    ]
+
+    operations = [
+        # Saat migrasi dibalik, operasi ini berjalan terakhir (setelah tabel dibuat ulang)
+        migrations.RunPython(migrations.RunPython.noop, restore_fts),
+        migrations.AlterModelOptions(
+            name='restaurantprofile',
+            options={'ordering': ['id'], 'verbose_name': 'Profil Restoran (Cabang)', 'verbose_name_plural': 'Profil Restoran (Cabang)'},
+        ),
+        migrations.AddField(
+            model_name='restaurantprofile',
+            name='slug',
+            field=models.SlugField(default='', max_length=50),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='restaurantprofile',
+            name='host',
+            field=models.CharField(blank=True, help_text='Domain khusus cabang (opsional), misal bandung.resresto.id', max_length=255, null=True, unique=True, verbose_name='Host'),
+        ),
+        migrations.AddField(
+            model_name='room',
+            name='restaurant',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='rooms', to='reservasi.restaurantprofile', verbose_name='Cabang'),
+        ),
+        migrations.AddField(
+            model_name='foodpackage',
+            name='restaurant',
+            field=models.ForeignKey(db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='food_packages', to='reservasi.restaurantprofile', verbose_name='Cabang'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='restaurant',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='reservasi.restaurantprofile', verbose_name='Cabang'),
+        ),
+        migrations.RunPython(backfill_branches, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='restaurantprofile',
+            name='slug',
+            field=models.SlugField(help_text="Prefix URL cabang, misal 'bandung' untuk /bandung/buat-reservasi/", unique=True, verbose_name='Slug Cabang'),
+        ),
+        migrations.AlterField(
+            model_name='room',
+            name='restaurant',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='rooms', to='reservasi.restaurantprofile', verbose_name='Cabang'),
+        ),
+        migrations.AlterField(
+            model_name='foodpackage',
+            name='restaurant',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='food_packages', to='reservasi.restaurantprofile', verbose_name='Cabang'),
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='restaurant',
+            field=models.ForeignKey(blank=True, db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='reservations', to='reservasi.restaurantprofile', verbose_name='Cabang'),
+        ),
+        # Nama ruangan/paket kini unik per cabang, bukan global
+        migrations.AlterField(
+            model_name='room',
+            name='name',
+            field=models.CharField(max_length=100, verbose_name='Nama Ruangan'),
+        ),
+        migrations.AlterField(
+            model_name='foodpackage',
+            name='name',
+            field=models.CharField(max_length=100, verbose_name='Nama Paket'),
+        ),
+        migrations.AddConstraint(
+            model_name='room',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'name'), name='reservasi_room_branch_name_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='foodpackage',
+            constraint=models.UniqueConstraint(fields=('restaurant', 'name'), name='reservasi_package_branch_name_uniq'),
+        ),
+        migrations.RemoveIndex(
+            model_name='reservation',
+            name='reservasi_date_status_idx',
+        ),
+        migrations.AddIndex(
+            model_name='reservation',
+            index=models.Index(fields=['restaurant', 'reservation_date', 'status'], name='reservasi_branch_date_idx'),
+        ),
+        migrations.RunPython(restore_fts, migrations.RunPython.noop),
+    ]
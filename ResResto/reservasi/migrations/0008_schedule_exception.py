@@ -0,0 +1,35 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservasi', '0007_multi_branch'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScheduleException',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(help_text='Misal: Libur Idul Fitri, Jam Ramadan, Acara Privat', max_length=100, verbose_name='Keterangan')),
+                ('start_date', models.DateField(verbose_name='Mulai Tanggal')),
+                ('end_date', models.DateField(blank=True, help_text='Kosongkan untuk satu hari saja. Untuk pengulangan mingguan: batas akhir pengulangan (kosong = seterusnya).', null=True, verbose_name='Sampai Tanggal')),
+                ('recurrence', models.CharField(choices=[('NONE', 'Tanggal tertentu'), ('WEEKLY', 'Setiap minggu'), ('YEARLY', 'Setiap tahun')], default='NONE', help_text='Mingguan: setiap hari yang sama dengan Mulai Tanggal. Tahunan: tanggal dan bulan yang sama setiap tahun.', max_length=10, verbose_name='Pengulangan')),
+                ('is_closed', models.BooleanField(default=False, verbose_name='Tutup')),
+                ('opening_time', models.TimeField(blank=True, help_text='Kosongkan untuk mengikuti jam buka biasa', null=True, verbose_name='Jam Buka')),
+                ('closing_time', models.TimeField(blank=True, help_text='Kosongkan untuk mengikuti jam tutup biasa', null=True, verbose_name='Jam Tutup')),
+                ('slot_interval_minutes', models.PositiveIntegerField(blank=True, null=True, verbose_name='Interval Slot (menit)')),
+                ('restaurant', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='schedule_exceptions', to='reservasi.restaurantprofile', verbose_name='Cabang')),
+                ('room', models.ForeignKey(blank=True, help_text='Kosongkan jika berlaku untuk seluruh restoran', null=True, on_delete=django.db.models.deletion.CASCADE, related_name='schedule_exceptions', to='reservasi.room', verbose_name='Ruangan')),
+            ],
+            options={
+                'verbose_name': 'Pengecualian Jadwal',
+                'verbose_name_plural': 'Pengecualian Jadwal',
+                'ordering': ['start_date'],
+            },
+        ),
+    ]
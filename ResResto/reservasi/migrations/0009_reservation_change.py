@@ -0,0 +1,32 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:25
+
+import django.core.serializers.json
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservasi', '0008_schedule_exception'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReservationChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('reservation_id', models.BigIntegerField(verbose_name='ID Reservasi')),
+                ('restaurant_id', models.BigIntegerField(null=True, verbose_name='ID Cabang')),
+                ('kind', models.CharField(choices=[('CREATED', 'Dibuat'), ('UPDATED', 'Diubah'), ('STATUS_CHANGED', 'Status Berubah'), ('DELETED', 'Dihapus')], max_length=20, verbose_name='Jenis')),
+                ('changed_fields', models.JSONField(blank=True, default=list, verbose_name='Field Berubah')),
+                ('data', models.JSONField(encoder=django.core.serializers.json.DjangoJSONEncoder, verbose_name='Data Reservasi')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Dicatat Pada')),
+            ],
+            options={
+                'verbose_name': 'Perubahan Reservasi',
+                'verbose_name_plural': 'Log Perubahan Reservasi',
+                'ordering': ['seq'],
+                'indexes': [models.Index(fields=['restaurant_id', 'seq'], name='reservasi_change_feed_idx')],
+            },
+        ),
+    ]
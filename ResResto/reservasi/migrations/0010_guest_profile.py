@@ -0,0 +1,42 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:34
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservasi', '0009_reservation_change'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GuestProfile',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('email_key', models.CharField(blank=True, max_length=254, null=True, unique=True, verbose_name='Email (ternormalisasi)')),
+                ('phone_key', models.CharField(blank=True, max_length=16, null=True, unique=True, verbose_name='Telepon (E.164)')),
+                ('name', models.CharField(blank=True, max_length=100, verbose_name='Nama Terakhir')),
+                ('reservation_count', models.PositiveIntegerField(default=0, verbose_name='Jumlah Reservasi')),
+                ('visit_count', models.PositiveIntegerField(default=0, verbose_name='Jumlah Kunjungan')),
+                ('no_show_count', models.PositiveIntegerField(default=0, verbose_name='Jumlah No-Show')),
+                ('last_visit_date', models.DateField(blank=True, null=True, verbose_name='Kunjungan Terakhir')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Dibuat Pada')),
+            ],
+            options={
+                'verbose_name': 'Profil Tamu',
+                'verbose_name_plural': 'Profil Tamu',
+            },
+        ),
+        migrations.AlterField(
+            model_name='reservation',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending'), ('CONFIRMED', 'Confirmed'), ('CANCELLED', 'Cancelled'), ('COMPLETED', 'Completed'), ('WAITLISTED', 'Waitlisted'), ('NO_SHOW', 'No-Show')], default='PENDING', max_length=20, verbose_name='Status'),
+        ),
+        migrations.AddField(
+            model_name='reservation',
+            name='guest',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='reservations', to='reservasi.guestprofile', verbose_name='Profil Tamu'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:36
+
+from importlib import import_module
+
+from django.db import migrations, models
+
+# AddField NOT NULL dengan default membuat ulang tabel di SQLite (trigger FTS
+# ikut hilang), jadi dipasang ulang dengan fungsi yang sama seperti 0007
+multi_branch = import_module('reservasi.migrations.0007_multi_branch')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservasi', '0010_guest_profile'),
+    ]
+
+    operations = [
+        migrations.RunPython(migrations.RunPython.noop, multi_branch.restore_fts),
+        migrations.AddField(
+            model_name='reservation',
+            name='version',
+            field=models.PositiveIntegerField(default=1, editable=False, verbose_name='Versi'),
+        ),
+        migrations.RunPython(multi_branch.restore_fts, migrations.RunPython.noop),
+    ]
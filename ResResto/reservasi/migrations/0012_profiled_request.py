@@ -0,0 +1,36 @@
+# Generated by Django 5.2.3 on 2026-10-19 11:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reservasi', '0011_reservation_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProfiledRequest',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(max_length=10, verbose_name='Metode')),
+                ('path', models.CharField(max_length=255, verbose_name='Path')),
+                ('view_name', models.CharField(blank=True, default='', max_length=200, verbose_name='View')),
+                ('status_code', models.PositiveSmallIntegerField(verbose_name='Status HTTP')),
+                ('user_id', models.BigIntegerField(blank=True, null=True, verbose_name='ID User')),
+                ('sampled_by', models.CharField(choices=[('RATE', 'Sampling Acak'), ('MANUAL', 'Diminta Staf')], max_length=10, verbose_name='Disampel Karena')),
+                ('duration_ms', models.FloatField(verbose_name='Durasi (ms)')),
+                ('query_count', models.PositiveIntegerField(default=0, verbose_name='Jumlah Query')),
+                ('query_ms', models.FloatField(default=0, verbose_name='Waktu Query (ms)')),
+                ('functions', models.JSONField(blank=True, default=list, verbose_name='Fungsi Terpanas')),
+                ('queries', models.JSONField(blank=True, default=list, verbose_name='Query Terlama')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Dicatat Pada')),
+            ],
+            options={
+                'verbose_name': 'Profil Request',
+                'verbose_name_plural': 'Profil Request',
+                'ordering': ['-duration_ms'],
+            },
+        ),
+    ]
@@ -1,15 +1,89 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import ValidationError
 from django.utils import timezone
+from django.utils.text import slugify
 import datetime
 
+# Lama makan bawaan (menit) jika ruangan/paket tidak menentukan sendiri
+DEFAULT_DURATION_MINUTES = 120
+
+# ===================================================================
+# MODEL LAMA YANG DIMODIFIKASI: RestaurantProfile (sekarang satu baris per cabang)
+# ===================================================================
+# Segmen URL pertama yang sudah dipakai aplikasi; tidak boleh menjadi slug cabang
+RESERVED_BRANCH_SLUGS = {
+    'admin', 'static', 'media', 'ajax', 'api', 'staf', 'login', 'logout', 'register',
+    'buat-reservasi', 'reservasi-sukses', 'reservasi-saya', 'batalkan-reservasi',
+}
+
+
+class RestaurantProfile(models.Model):
+    name = models.CharField(max_length=100, default="Nama Restoran Kami")
+    slug = models.SlugField(
+        max_length=50,
+        unique=True,
+        help_text="Prefix URL cabang, misal 'bandung' untuk /bandung/buat-reservasi/",
+        verbose_name="Slug Cabang"
+    )
+    host = models.CharField(
+        max_length=255,
+        unique=True,
+        blank=True,
+        null=True,
+        help_text="Domain khusus cabang (opsional), misal bandung.resresto.id",
+        verbose_name="Host"
+    )
+    address = models.TextField(default="Alamat Lengkap Restoran")
+    phone_number = models.CharField(max_length=20, default="08123456789")
+    description = models.TextField(blank=True, null=True, help_text="Deskripsi singkat tentang restoran")
+    opening_time = models.TimeField(default=datetime.time(10, 0))
+    closing_time = models.TimeField(default=datetime.time(22, 0))
+    slot_interval_minutes = models.PositiveIntegerField(default=30, help_text="Interval slot waktu dalam menit (misal: 30 menit)")
+    # Field ini sekarang kurang relevan karena kapasitas diatur per-ruangan,
+    # tapi bisa dipertahankan sebagai referensi atau untuk skenario lain.
+    max_guests_per_slot = models.PositiveIntegerField(default=20, help_text="Total maksimum tamu yang bisa dilayani dalam satu slot waktu (sekarang digantikan oleh kapasitas per ruangan)")
+
+    def __str__(self):
+        return self.name
+
+    def clean(self):
+        if self.slug in RESERVED_BRANCH_SLUGS:
+            raise ValidationError({'slug': f"Slug '{self.slug}' sudah dipakai sebagai alamat halaman aplikasi."})
+
+    def save(self, *args, **kwargs):
+        if not self.slug:
+            # Slug unik dari nama, misal "resto-kami", "resto-kami-2", ...
+            base = slugify(self.name)[:40] or 'cabang'
+            slug, n = base, 1
+            while slug in RESERVED_BRANCH_SLUGS or RestaurantProfile.objects.filter(slug=slug).exclude(pk=self.pk).exists():
+                n += 1
+                slug = f"{base}-{n}"
+            self.slug = slug
+        # NULL (bukan '') agar banyak cabang tanpa host tidak melanggar unique
+        self.host = self.host.strip().lower() if self.host and self.host.strip() else None
+        return super(RestaurantProfile, self).save(*args, **kwargs)
+
+    class Meta:
+        ordering = ['id']
+        verbose_name = "Profil Restoran (Cabang)"
+        verbose_name_plural = "Profil Restoran (Cabang)"
+
+
 # ===================================================================
 # MODEL BARU: Untuk Ruangan (Reguler, VIP, dll.)
 # ===================================================================
 class Room(models.Model):
+    restaurant = models.ForeignKey(
+        RestaurantProfile,
+        on_delete=models.CASCADE,
+        related_name="rooms",
+        db_index=False,  # sudah tercakup constraint unik (restaurant, name)
+        verbose_name="Cabang"
+    )
     name = models.CharField(
         max_length=100,
-        unique=True,
         verbose_name="Nama Ruangan"
     )
     description = models.TextField(
@@ -21,11 +95,19 @@ class Room(models.Model):
         help_text="Kapasitas maksimum tamu untuk ruangan ini",
         verbose_name="Kapasitas"
     )
+    default_duration_minutes = models.PositiveIntegerField(
+        default=DEFAULT_DURATION_MINUTES,
+        help_text="Lama makan bawaan (menit) untuk reservasi di ruangan ini",
+        verbose_name="Durasi Bawaan (menit)"
+    )
 
     def __str__(self):
         return self.name
 
     class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'name'], name='reservasi_room_branch_name_uniq'),
+        ]
         verbose_name = "Ruangan"
         verbose_name_plural = "Daftar Ruangan"
 
@@ -34,9 +116,15 @@ class Room(models.Model):
 # MODEL BARU: Untuk Paket Makanan
 # ===================================================================
 class FoodPackage(models.Model):
+    restaurant = models.ForeignKey(
+        RestaurantProfile,
+        on_delete=models.CASCADE,
+        related_name="food_packages",
+        db_index=False,  # sudah tercakup constraint unik (restaurant, name)
+        verbose_name="Cabang"
+    )
     name = models.CharField(
         max_length=100,
-        unique=True,
         verbose_name="Nama Paket"
     )
     description = models.TextField(
@@ -49,47 +137,145 @@ class FoodPackage(models.Model):
         help_text="Harga per paket",
         verbose_name="Harga"
     )
+    default_duration_minutes = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        help_text="Lama makan (menit) untuk paket ini. Kosongkan untuk mengikuti durasi ruangan.",
+        verbose_name="Durasi Paket (menit)"
+    )
 
     def __str__(self):
         # Format harga agar lebih mudah dibaca
         return f"{self.name} - Rp{self.price:,.0f}"
 
     class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['restaurant', 'name'], name='reservasi_package_branch_name_uniq'),
+        ]
         verbose_name = "Paket Makanan"
         verbose_name_plural = "Daftar Paket Makanan"
 
 
 # ===================================================================
-# MODEL LAMA: RestaurantProfile (Tidak ada perubahan)
+# MODEL BARU: ScheduleException (libur, jam khusus, penutupan ruangan)
 # ===================================================================
-class RestaurantProfile(models.Model):
-    name = models.CharField(max_length=100, default="Nama Restoran Kami")
-    address = models.TextField(default="Alamat Lengkap Restoran")
-    phone_number = models.CharField(max_length=20, default="08123456789")
-    description = models.TextField(blank=True, null=True, help_text="Deskripsi singkat tentang restoran")
-    opening_time = models.TimeField(default=datetime.time(10, 0))
-    closing_time = models.TimeField(default=datetime.time(22, 0))
-    slot_interval_minutes = models.PositiveIntegerField(default=30, help_text="Interval slot waktu dalam menit (misal: 30 menit)")
-    # Field ini sekarang kurang relevan karena kapasitas diatur per-ruangan,
-    # tapi bisa dipertahankan sebagai referensi atau untuk skenario lain.
-    max_guests_per_slot = models.PositiveIntegerField(default=20, help_text="Total maksimum tamu yang bisa dilayani dalam satu slot waktu (sekarang digantikan oleh kapasitas per ruangan)")
+class ScheduleException(models.Model):
+    """
+    Pengecualian dari jam operasional di RestaurantProfile untuk tanggal
+    tertentu, misalnya libur nasional, jam Ramadan, acara privat, atau
+    ruangan yang ditutup. Semua pengecualian satu cabang dikompilasi menjadi
+    kalender di memori (lihat reservasi/schedule.py).
+    """
+    RECURRENCE_CHOICES = [
+        ('NONE', 'Tanggal tertentu'),
+        ('WEEKLY', 'Setiap minggu'),
+        ('YEARLY', 'Setiap tahun'),
+    ]
+
+    restaurant = models.ForeignKey(RestaurantProfile, on_delete=models.CASCADE, related_name="schedule_exceptions", verbose_name="Cabang")
+    room = models.ForeignKey(
+        Room,
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name="schedule_exceptions",
+        help_text="Kosongkan jika berlaku untuk seluruh restoran",
+        verbose_name="Ruangan"
+    )
+    name = models.CharField(max_length=100, help_text="Misal: Libur Idul Fitri, Jam Ramadan, Acara Privat", verbose_name="Keterangan")
+    start_date = models.DateField(verbose_name="Mulai Tanggal")
+    end_date = models.DateField(
+        blank=True,
+        null=True,
+        help_text="Kosongkan untuk satu hari saja. Untuk pengulangan mingguan: batas akhir pengulangan (kosong = seterusnya).",
+        verbose_name="Sampai Tanggal"
+    )
+    recurrence = models.CharField(
+        max_length=10,
+        choices=RECURRENCE_CHOICES,
+        default='NONE',
+        help_text="Mingguan: setiap hari yang sama dengan Mulai Tanggal. Tahunan: tanggal dan bulan yang sama setiap tahun.",
+        verbose_name="Pengulangan"
+    )
+    is_closed = models.BooleanField(default=False, verbose_name="Tutup")
+    opening_time = models.TimeField(blank=True, null=True, help_text="Kosongkan untuk mengikuti jam buka biasa", verbose_name="Jam Buka")
+    closing_time = models.TimeField(blank=True, null=True, help_text="Kosongkan untuk mengikuti jam tutup biasa", verbose_name="Jam Tutup")
+    slot_interval_minutes = models.PositiveIntegerField(blank=True, null=True, verbose_name="Interval Slot (menit)")
 
     def __str__(self):
-        return self.name
+        return f"{self.name} ({self.start_date})"
 
-    def save(self, *args, **kwargs):
-        if not self.pk and RestaurantProfile.objects.exists():
-            raise ValueError("Hanya boleh ada satu RestaurantProfile.")
-        return super(RestaurantProfile, self).save(*args, **kwargs)
+    def clean(self):
+        if self.end_date and self.end_date < self.start_date:
+            raise ValidationError({'end_date': "Tanggal akhir tidak boleh sebelum tanggal mulai."})
+        if self.recurrence == 'YEARLY' and self.end_date and (self.end_date - self.start_date).days >= 366:
+            raise ValidationError({'end_date': "Pengulangan tahunan maksimal mencakup satu tahun."})
+        if self.room_id and self.restaurant_id and self.room.restaurant_id != self.restaurant_id:
+            raise ValidationError({'room': "Ruangan ini bukan milik cabang yang dipilih."})
+        if not self.is_closed:
+            if not (self.opening_time or self.closing_time or self.slot_interval_minutes):
+                raise ValidationError("Isi jam buka/tutup/interval, atau centang Tutup.")
+            if self.opening_time and self.closing_time and self.opening_time >= self.closing_time:
+                raise ValidationError({'closing_time': "Jam tutup harus setelah jam buka."})
+
+    class Meta:
+        ordering = ['start_date']
+        verbose_name = "Pengecualian Jadwal"
+        verbose_name_plural = "Pengecualian Jadwal"
+
+
+# ===================================================================
+# MODEL BARU: GuestProfile (identitas tamu lintas reservasi)
+# ===================================================================
+class GuestProfile(models.Model):
+    """
+    Satu baris per tamu, dikenali dari email dan nomor telepon yang sudah
+    dinormalisasi (lihat reservasi/guests.py). Statistik kunjungan disimpan
+    di sini agar riwayat tamu cukup dibaca lewat satu lookup index.
+    """
+    # Kunci ternormalisasi: email huruf kecil, telepon format E.164 (+628...)
+    email_key = models.CharField(max_length=254, unique=True, null=True, blank=True, verbose_name="Email (ternormalisasi)")
+    phone_key = models.CharField(max_length=16, unique=True, null=True, blank=True, verbose_name="Telepon (E.164)")
+    name = models.CharField(max_length=100, blank=True, verbose_name="Nama Terakhir")
+
+    # Diperbarui oleh guests.refresh_stats() setiap kali status reservasinya berubah
+    reservation_count = models.PositiveIntegerField(default=0, verbose_name="Jumlah Reservasi")
+    visit_count = models.PositiveIntegerField(default=0, verbose_name="Jumlah Kunjungan")
+    no_show_count = models.PositiveIntegerField(default=0, verbose_name="Jumlah No-Show")
+    last_visit_date = models.DateField(null=True, blank=True, verbose_name="Kunjungan Terakhir")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Dibuat Pada")
+
+    def __str__(self):
+        return self.name or self.email_key or self.phone_key or f"Tamu #{self.pk}"
+
+    @property
+    def no_show_rate(self):
+        # Dari reservasi yang sudah lewat: datang (COMPLETED) atau tidak (NO_SHOW)
+        finished = self.visit_count + self.no_show_count
+        return self.no_show_count / finished if finished else 0.0
 
     class Meta:
-        verbose_name = "Profil Restoran"
-        verbose_name_plural = "Profil Restoran"
+        verbose_name = "Profil Tamu"
+        verbose_name_plural = "Profil Tamu"
 
 
 # ===================================================================
 # MODEL LAMA YANG DIMODIFIKASI: Reservation
 # ===================================================================
+class ReservationConflict(Exception):
+    """
+    Reservasi sudah diubah pihak lain (tamu, staf, aksi massal) sejak dibaca,
+    sehingga penyimpanan ditolak agar perubahan tersebut tidak tertimpa.
+    Seperti IntegrityError, transaksi yang sedang berjalan ikut ditandai
+    rollback: tangkap di luar blok transaction.atomic().
+    """
+
+    def __init__(self, reservation_id, expected_version):
+        self.reservation_id = reservation_id
+        self.expected_version = expected_version
+        super().__init__(f"Reservasi #{reservation_id} sudah diubah (versi {expected_version} tidak lagi terbaru).")
+
+
 class Reservation(models.Model):
     STATUS_CHOICES = [
         ('PENDING', 'Pending'),
@@ -97,18 +283,45 @@ class Reservation(models.Model):
         ('CANCELLED', 'Cancelled'),
         ('COMPLETED', 'Completed'),
         ('WAITLISTED', 'Waitlisted'),
+        ('NO_SHOW', 'No-Show'),
     ]
 
+    # --- Cabang: semua query reservasi disaring lewat kolom ini ---
+    restaurant = models.ForeignKey(
+        RestaurantProfile,
+        on_delete=models.CASCADE,
+        blank=True,              # Jika kosong, diisi dari cabang ruangan saat save()
+        related_name="reservations",
+        db_index=False,          # index gabungan di Meta sudah diawali kolom ini
+        verbose_name="Cabang"
+    )
+
     # --- Detail Pemesan ---
     user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True, verbose_name="Akun Pengguna")
     guest_name = models.CharField(max_length=100, verbose_name="Nama Tamu")
     guest_email = models.EmailField(verbose_name="Email Tamu")
     guest_phone = models.CharField(max_length=20, verbose_name="Telepon Tamu")
+    # Diisi otomatis dari email/telepon (signals -> guests.link_guest)
+    guest = models.ForeignKey(
+        GuestProfile,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        editable=False,
+        related_name="reservations",
+        verbose_name="Profil Tamu"
+    )
 
     # --- Detail Waktu dan Jumlah ---
     reservation_date = models.DateField(verbose_name="Tanggal Reservasi")
     reservation_time = models.TimeField(verbose_name="Waktu Reservasi")
     number_of_guests = models.PositiveIntegerField(verbose_name="Jumlah Tamu")
+    duration_minutes = models.PositiveIntegerField(
+        blank=True,
+        null=True,
+        help_text="Lama makan (menit). Kosongkan untuk memakai durasi paket atau ruangan.",
+        verbose_name="Durasi (menit)"
+    )
 
     # --- PERUBAHAN BARU: Menghubungkan ke Room dan FoodPackage ---
     room_type = models.ForeignKey(
@@ -134,6 +347,10 @@ class Reservation(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING', verbose_name="Status")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Dibuat Pada")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Diperbarui Pada")
+    reminder_queued_at = models.DateTimeField(blank=True, null=True, editable=False, verbose_name="Pengingat Diantrikan Pada")
+    # Naik setiap kali baris disimpan; UPDATE hanya berhasil jika versinya masih
+    # sama dengan saat dibaca (optimistic concurrency, tanpa mengunci baris)
+    version = models.PositiveIntegerField(default=1, editable=False, verbose_name="Versi")
 
     def __str__(self):
         # Tampilkan nama ruangan di string representasi
@@ -142,7 +359,215 @@ class Reservation(models.Model):
             return f"Reservasi {self.user.username} di {room_name} pada {self.reservation_date} @ {self.reservation_time}"
         return f"Reservasi {self.guest_name} di {room_name} pada {self.reservation_date} @ {self.reservation_time}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Simpan nilai saat dimuat agar signals tahu tanggal/ruangan sebelumnya
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    @staticmethod
+    def resolve_duration(room=None, food_package=None):
+        # Paket makanan lebih spesifik daripada ruangan, jadi didahulukan
+        if food_package and food_package.default_duration_minutes:
+            return food_package.default_duration_minutes
+        if room and room.default_duration_minutes:
+            return room.default_duration_minutes
+        return DEFAULT_DURATION_MINUTES
+
+    def clean(self):
+        if self.room_type_id and self.restaurant_id and self.room_type.restaurant_id != self.restaurant_id:
+            raise ValidationError({'room_type': "Ruangan ini bukan milik cabang yang dipilih."})
+        if self.food_package_id and self.restaurant_id and self.food_package.restaurant_id != self.restaurant_id:
+            raise ValidationError({'food_package': "Paket makanan ini bukan milik cabang yang dipilih."})
+
+    def save(self, *args, **kwargs):
+        if not self.restaurant_id and self.room_type_id:
+            self.restaurant_id = self.room_type.restaurant_id
+        # Simpan durasi efektif agar perhitungan okupansi cukup membaca satu kolom
+        if not self.duration_minutes or self._duration_follows_old_choice():
+            self.duration_minutes = self.resolve_duration(self.room_type, self.food_package)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'duration_minutes'}
+        # Compare-and-swap: simpan dengan versi berikutnya, dan _do_update hanya
+        # mengubah baris yang versinya masih versi yang dibaca objek ini
+        self._expected_version = None if self._state.adding else self.version
+        if self._expected_version is not None:
+            self.version = self._expected_version + 1
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = set(kwargs['update_fields']) | {'version'}
+        try:
+            super().save(*args, **kwargs)
+        except ReservationConflict:
+            self.version = self._expected_version
+            raise
+        finally:
+            self._expected_version = None
+        # Semua receiver post_save sudah berjalan; nilai tersimpan menjadi titik
+        # banding baru untuk save() berikutnya pada objek yang sama
+        self._loaded_values = {field.attname: getattr(self, field.attname) for field in self._meta.concrete_fields}
+
+    def _duration_follows_old_choice(self):
+        """
+        True jika ruangan/paket diganti sementara durasi tersimpan masih durasi
+        otomatis dari pilihan lama. Durasi yang diisi staf (berbeda dari durasi
+        otomatis, atau diubah bersamaan) tidak ditimpa.
+        """
+        loaded = getattr(self, '_loaded_values', None)
+        if not loaded or 'duration_minutes' not in loaded:
+            return False
+        old_room_id, old_package_id = loaded.get('room_type_id'), loaded.get('food_package_id')
+        if (old_room_id, old_package_id) == (self.room_type_id, self.food_package_id):
+            return False
+        if self.duration_minutes != loaded['duration_minutes']:
+            return False
+        old_room = Room.objects.filter(pk=old_room_id).first() if old_room_id else None
+        old_package = FoodPackage.objects.filter(pk=old_package_id).first() if old_package_id else None
+        return self.duration_minutes == self.resolve_duration(old_room, old_package)
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields, forced_update):
+        expected = getattr(self, '_expected_version', None)
+        if expected is None:
+            return super()._do_update(base_qs, using, pk_val, values, update_fields, forced_update)
+        if super()._do_update(base_qs.filter(version=expected), using, pk_val, values, update_fields, forced_update):
+            return True
+        if base_qs.filter(pk=pk_val).exists():
+            raise ReservationConflict(pk_val, expected)
+        return False  # baris sudah dihapus: perilaku bawaan Django (INSERT ulang)
+
     class Meta:
         ordering = ['reservation_date', 'reservation_time']
+        indexes = [
+            # Dipakai perhitungan okupansi harian (satu query per cabang per tanggal);
+            # diawali cabang agar query satu cabang tidak memindai baris cabang lain
+            models.Index(fields=['restaurant', 'reservation_date', 'status'], name='reservasi_branch_date_idx'),
+            # Pemindaian pengingat: hanya baris yang pengingatnya belum diantrikan
+            models.Index(
+                fields=['status', 'reservation_date', 'reservation_time'],
+                name='reservasi_reminder_due_idx',
+                condition=models.Q(reminder_queued_at__isnull=True),
+            ),
+        ]
         verbose_name = "Reservasi"
-        verbose_name_plural = "Semua Reservasi"
\ No newline at end of file
+        verbose_name_plural = "Semua Reservasi"
+
+# ===================================================================
+# MODEL BARU: OutboxMessage (antrian notifikasi untuk tamu)
+# ===================================================================
+class OutboxMessage(models.Model):
+    """
+    Notifikasi yang menunggu dikirim. Baris ini ditulis dalam transaksi yang
+    sama dengan perubahan status reservasi, lalu dikirim oleh perintah
+    `process_outbox`, sehingga latensi SMTP tidak membebani request booking.
+    """
+    KIND_CHOICES = [
+        ('RECEIVED', 'Reservasi Diterima'),
+        ('CONFIRMED', 'Reservasi Dikonfirmasi'),
+        ('CANCELLED', 'Reservasi Dibatalkan'),
+        ('WAITLISTED', 'Masuk Waiting List'),
+        ('REMINDER', 'Pengingat Reservasi'),
+    ]
+    STATUS_CHOICES = [
+        ('PENDING', 'Menunggu'),
+        ('PROCESSING', 'Sedang Dikirim'),
+        ('SENT', 'Terkirim'),
+        ('FAILED', 'Gagal'),
+    ]
+
+    reservation = models.ForeignKey(Reservation, on_delete=models.CASCADE, related_name="outbox_messages", verbose_name="Reservasi")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="Jenis")
+    recipient = models.EmailField(verbose_name="Penerima")
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='PENDING', verbose_name="Status")
+    attempts = models.PositiveIntegerField(default=0, verbose_name="Percobaan")
+    available_at = models.DateTimeField(default=timezone.now, verbose_name="Dikirim Mulai")
+    lock_token = models.CharField(max_length=32, blank=True, default='', editable=False)
+    locked_at = models.DateTimeField(blank=True, null=True, editable=False)
+    sent_at = models.DateTimeField(blank=True, null=True, verbose_name="Terkirim Pada")
+    last_error = models.TextField(blank=True, default='', verbose_name="Error Terakhir")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Dibuat Pada")
+
+    def __str__(self):
+        return f"{self.get_kind_display()} untuk {self.recipient} ({self.get_status_display()})"
+
+    class Meta:
+        ordering = ['available_at', 'id']
+        indexes = [
+            models.Index(fields=['status', 'available_at'], name='reservasi_outbox_due_idx'),
+        ]
+        verbose_name = "Notifikasi Keluar"
+        verbose_name_plural = "Antrian Notifikasi"
+
+
+# ===================================================================
+# MODEL BARU: ReservationChange (log perubahan append-only)
+# ===================================================================
+class ReservationChange(models.Model):
+    """
+    Satu baris untuk setiap perubahan reservasi (dibuat, diubah, status
+    berubah, dihapus), termasuk aksi massal yang memakai queryset.update().
+    `seq` naik terus sehingga sistem lain (POS, kitchen display, analitik)
+    cukup meminta perubahan setelah seq terakhir yang sudah mereka proses.
+    """
+    KIND_CHOICES = [
+        ('CREATED', 'Dibuat'),
+        ('UPDATED', 'Diubah'),
+        ('STATUS_CHANGED', 'Status Berubah'),
+        ('DELETED', 'Dihapus'),
+    ]
+
+    seq = models.BigAutoField(primary_key=True)
+    # Bukan FK: log tetap utuh walaupun reservasinya dihapus
+    reservation_id = models.BigIntegerField(verbose_name="ID Reservasi")
+    restaurant_id = models.BigIntegerField(null=True, verbose_name="ID Cabang")
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES, verbose_name="Jenis")
+    changed_fields = models.JSONField(default=list, blank=True, verbose_name="Field Berubah")
+    data = models.JSONField(encoder=DjangoJSONEncoder, verbose_name="Data Reservasi")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Dicatat Pada")
+
+    def __str__(self):
+        return f"#{self.seq} {self.get_kind_display()} reservasi {self.reservation_id}"
+
+    class Meta:
+        ordering = ['seq']
+        indexes = [
+            # Feed per cabang: WHERE restaurant_id = ? AND seq > ? ORDER BY seq
+            models.Index(fields=['restaurant_id', 'seq'], name='reservasi_change_feed_idx'),
+        ]
+        verbose_name = "Perubahan Reservasi"
+        verbose_name_plural = "Log Perubahan Reservasi"
+
+# ===================================================================
+# MODEL BARU: ProfiledRequest (hasil profil request dari ProfilerMiddleware)
+# ===================================================================
+class ProfiledRequest(models.Model):
+    """
+    Ringkasan profil satu request yang disampel ProfilerMiddleware: fungsi
+    terpanas dari cProfile dan query SQL terlama. Jumlah dan umurnya dibatasi
+    `RESERVASI_PROFILER` (lihat reservasi/profiler.py).
+    """
+    SAMPLED_BY_CHOICES = [
+        ('RATE', 'Sampling Acak'),
+        ('MANUAL', 'Diminta Staf'),
+    ]
+
+    method = models.CharField(max_length=10, verbose_name="Metode")
+    path = models.CharField(max_length=255, verbose_name="Path")
+    view_name = models.CharField(max_length=200, blank=True, default='', verbose_name="View")
+    status_code = models.PositiveSmallIntegerField(verbose_name="Status HTTP")
+    # Bukan FK: profil tetap ada walaupun user-nya dihapus
+    user_id = models.BigIntegerField(null=True, blank=True, verbose_name="ID User")
+    sampled_by = models.CharField(max_length=10, choices=SAMPLED_BY_CHOICES, verbose_name="Disampel Karena")
+    duration_ms = models.FloatField(verbose_name="Durasi (ms)")
+    query_count = models.PositiveIntegerField(default=0, verbose_name="Jumlah Query")
+    query_ms = models.FloatField(default=0, verbose_name="Waktu Query (ms)")
+    functions = models.JSONField(default=list, blank=True, verbose_name="Fungsi Terpanas")
+    queries = models.JSONField(default=list, blank=True, verbose_name="Query Terlama")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Dicatat Pada")
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
+
+    class Meta:
+        ordering = ['-duration_ms']
+        verbose_name = "Profil Request"
+        verbose_name_plural = "Profil Request"
@@ -0,0 +1,192 @@
+import datetime
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import OutboxMessage, Reservation
+
+MAX_ATTEMPTS = 5
+# Baris PROCESSING yang lebih tua dari ini dianggap ditinggal worker yang mati
+STALE_LOCK_MINUTES = 10
+# Pengingat dikirim untuk reservasi yang dimulai dalam jendela ini
+REMINDER_LEAD_HOURS = 24
+
+SUBJECTS = {
+    'RECEIVED': "Reservasi Anda telah kami terima",
+    'CONFIRMED': "Reservasi Anda telah dikonfirmasi",
+    'CANCELLED': "Reservasi Anda telah dibatalkan",
+    'WAITLISTED': "Anda masuk waiting list",
+    'REMINDER': "Pengingat reservasi Anda",
+}
+
+OPENINGS = {
+    'RECEIVED': "Terima kasih, reservasi Anda sudah kami terima dan sedang diproses.",
+    'CONFIRMED': "Reservasi Anda sudah dikonfirmasi. Kami menantikan kedatangan Anda.",
+    'CANCELLED': "Reservasi Anda telah dibatalkan.",
+    'WAITLISTED': "Slot yang Anda pilih sedang penuh, jadi Anda kami masukkan ke waiting list. Kami akan mengabari jika ada tempat.",
+    'REMINDER': "Ini pengingat untuk reservasi Anda yang akan datang.",
+}
+
+
+# ===================================================================
+# MENULIS KE OUTBOX (dipanggil di dalam transaksi perubahan status)
+# ===================================================================
+def _recipient(reservation):
+    if reservation.guest_email:
+        return reservation.guest_email
+    if reservation.user_id and reservation.user.email:
+        return reservation.user.email
+    return ''
+
+
+def enqueue(reservation, kind, available_at=None):
+    """Menambahkan satu notifikasi untuk `reservation`. Tidak melakukan apa pun jika tak ada email."""
+    recipient = _recipient(reservation)
+    if not recipient:
+        return None
+    return OutboxMessage.objects.create(
+        reservation=reservation,
+        kind=kind,
+        recipient=recipient,
+        available_at=available_at or timezone.now(),
+    )
+
+
+def enqueue_for_ids(reservation_ids, kind):
+    """Versi massal dari enqueue(), dipakai aksi admin dan pengingat."""
+    now = timezone.now()
+    rows = Reservation.objects.filter(pk__in=reservation_ids).values_list('pk', 'guest_email', 'user__email')
+    messages = [
+        OutboxMessage(reservation_id=pk, kind=kind, recipient=guest_email or user_email, available_at=now)
+        for pk, guest_email, user_email in rows
+        if guest_email or user_email
+    ]
+    OutboxMessage.objects.bulk_create(messages, batch_size=500)
+    return len(messages)
+
+
+# ===================================================================
+# PENGINGAT TERJADWAL
+# ===================================================================
+def due_reminder_queryset(now=None, lead_hours=REMINDER_LEAD_HOURS):
+    """
+    Reservasi CONFIRMED yang mulai dalam `lead_hours` ke depan dan belum
+    diberi pengingat. Memakai index parsial reservasi_reminder_due_idx.
+    """
+    now = timezone.localtime(now or timezone.now())
+    end = now + datetime.timedelta(hours=lead_hours)
+    window = Q(reservation_date=now.date(), reservation_time__gte=now.time())
+    if end.date() > now.date():
+        window |= Q(reservation_date__gt=now.date(), reservation_date__lt=end.date())
+        window |= Q(reservation_date=end.date(), reservation_time__lte=end.time())
+    else:
+        window &= Q(reservation_time__lte=end.time())
+    return Reservation.objects.filter(window, status='CONFIRMED', reminder_queued_at__isnull=True)
+
+
+def queue_due_reminders(now=None, batch_size=500):
+    """Mengantrikan pengingat untuk semua reservasi yang jatuh tempo. Mengembalikan jumlahnya."""
+    queued = 0
+    while True:
+        with transaction.atomic():
+            ids = list(due_reminder_queryset(now).values_list('pk', flat=True)[:batch_size])
+            if not ids:
+                return queued
+            Reservation.objects.filter(pk__in=ids).update(reminder_queued_at=timezone.now())
+            queued += enqueue_for_ids(ids, 'REMINDER')
+
+
+# ===================================================================
+# MENGIRIM ISI OUTBOX
+# ===================================================================
+def render_message(message):
+    """(subjek, isi) email untuk satu OutboxMessage."""
+    reservation = message.reservation
+    room_name = reservation.room_type.name if reservation.room_type else "-"
+    body = "\n".join([
+        f"Halo {reservation.guest_name},",
+        "",
+        OPENINGS.get(message.kind, ""),
+        "",
+        f"Restoran: {reservation.restaurant.name}",
+        f"Tanggal : {reservation.reservation_date.strftime('%d %B %Y')}",
+        f"Waktu   : {reservation.reservation_time.strftime('%H:%M')}",
+        f"Ruangan : {room_name}",
+        f"Tamu    : {reservation.number_of_guests} orang",
+        f"Status  : {reservation.get_status_display()}",
+    ])
+    return SUBJECTS.get(message.kind, "Informasi reservasi"), body
+
+
+def _send(payload):
+    message_id, recipient, subject, body = payload
+    try:
+        send_mail(subject, body, settings.DEFAULT_FROM_EMAIL, [recipient], fail_silently=False)
+        return message_id, None
+    except Exception as e:
+        return message_id, f"{type(e).__name__}: {e}"
+
+
+def claim_batch(batch_size):
+    """
+    Menandai hingga `batch_size` pesan yang siap kirim sebagai PROCESSING milik
+    worker ini. UPDATE bersyarat status='PENDING' mencegah dua worker mengambil
+    pesan yang sama.
+    """
+    now = timezone.now()
+    # Pulihkan pesan yang tertahan oleh worker yang berhenti di tengah jalan
+    OutboxMessage.objects.filter(
+        status='PROCESSING', locked_at__lt=now - datetime.timedelta(minutes=STALE_LOCK_MINUTES),
+    ).update(status='PENDING', lock_token='')
+
+    token = uuid.uuid4().hex
+    ids = list(
+        OutboxMessage.objects.filter(status='PENDING', available_at__lte=now)
+        .order_by('available_at', 'id').values_list('pk', flat=True)[:batch_size]
+    )
+    if not ids:
+        return []
+    OutboxMessage.objects.filter(pk__in=ids, status='PENDING').update(status='PROCESSING', lock_token=token, locked_at=now)
+    return list(
+        OutboxMessage.objects.filter(lock_token=token, status='PROCESSING')
+        .select_related('reservation', 'reservation__room_type', 'reservation__restaurant')
+    )
+
+
+def dispatch_batch(batch_size=50, workers=4):
+    """
+    Mengirim satu batch pesan secara paralel dengan thread pool.
+    Mengembalikan (jumlah_terkirim, jumlah_gagal).
+    """
+    messages = claim_batch(batch_size)
+    if not messages:
+        return 0, 0
+
+    # Render di thread utama (butuh data reservasi), kirim di thread pool
+    payloads = [(m.pk, m.recipient, *render_message(m)) for m in messages]
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = list(pool.map(_send, payloads))
+
+    now = timezone.now()
+    sent_ids = [message_id for message_id, error in results if error is None]
+    OutboxMessage.objects.filter(pk__in=sent_ids).update(status='SENT', sent_at=now, lock_token='')
+
+    by_id = {m.pk: m for m in messages}
+    failures = [(message_id, error) for message_id, error in results if error is not None]
+    for message_id, error in failures:
+        message = by_id[message_id]
+        attempts = message.attempts + 1
+        # Backoff eksponensial: 1, 2, 4, 8 ... menit
+        OutboxMessage.objects.filter(pk=message_id).update(
+            status='FAILED' if attempts >= MAX_ATTEMPTS else 'PENDING',
+            attempts=attempts,
+            last_error=error,
+            lock_token='',
+            available_at=now + datetime.timedelta(minutes=2 ** (attempts - 1)),
+        )
+    return len(sent_ids), len(failures)
@@ -0,0 +1,129 @@
+import datetime
+
+from .models import Reservation, DEFAULT_DURATION_MINUTES
+
+# Status yang dihitung sebagai "menempati" kursi di ruangan
+ACTIVE_STATUSES = ['CONFIRMED', 'PENDING']
+
+
+# ===================================================================
+# GRID SLOT: daftar jam mulai slot untuk satu hari operasional
+# ===================================================================
+def build_slot_grid(opening_time, closing_time, interval_minutes):
+    """
+    Menghasilkan daftar objek time dari jam buka sampai sebelum jam tutup
+    dengan jarak `interval_minutes`. Mengembalikan list kosong jika
+    pengaturan tidak valid.
+    """
+    if not isinstance(opening_time, datetime.time) or not isinstance(closing_time, datetime.time):
+        return []
+    if not interval_minutes or interval_minutes <= 0:
+        return []
+
+    grid = []
+    current_dt = datetime.datetime.combine(datetime.date.min, opening_time)
+    closing_dt = datetime.datetime.combine(datetime.date.min, closing_time)
+    step = datetime.timedelta(minutes=interval_minutes)
+    # Safety break: tidak mungkin ada lebih dari (24 jam / interval) slot
+    max_loops = (24 * 60) // interval_minutes
+    while current_dt < closing_dt and len(grid) < max_loops:
+        grid.append(current_dt.time())
+        current_dt += step
+    return grid
+
+
+def _minutes(t):
+    return t.hour * 60 + t.minute
+
+
+def slot_span(opening_time, interval_minutes, n_slots, start_time, duration_minutes):
+    """
+    Rentang indeks slot [i0, i1) yang ditempati reservasi yang mulai pada
+    `start_time` selama `duration_minutes`. Slot yang hanya tersentuh
+    sebagian tetap dihitung terpakai.
+    """
+    if not interval_minutes or interval_minutes <= 0 or n_slots <= 0:
+        return 0, 0
+    offset = _minutes(start_time) - _minutes(opening_time)
+    end = offset + (duration_minutes or DEFAULT_DURATION_MINUTES)
+    i0 = max(0, offset // interval_minutes)
+    i1 = min(n_slots, -(-end // interval_minutes))  # pembulatan ke atas
+    return i0, i1
+
+
+# ===================================================================
+# OKUPANSI HARIAN: satu query + sweep-line (prefix sum) per ruangan
+# ===================================================================
+def sweep_occupancy(rows, opening_time, interval_minutes, n_slots):
+    """
+    Menghitung okupansi per slot dari baris (kunci, waktu, durasi, tamu).
+    Setiap reservasi hanya menambah dua titik pada array selisih, lalu satu
+    prefix sum menghasilkan okupansi, jadi biayanya O(slot + reservasi).
+
+    Kunci biasanya room_id, atau (tanggal, room_id) untuk rentang beberapa hari.
+    Mengembalikan dict {kunci: [jumlah_tamu_per_slot, ...]}.
+    """
+    diffs = {}
+    for room_id, start_time, duration, guests in rows:
+        i0, i1 = slot_span(opening_time, interval_minutes, n_slots, start_time, duration)
+        if i1 <= i0:
+            continue
+        diff = diffs.get(room_id)
+        if diff is None:
+            diff = diffs[room_id] = [0] * (n_slots + 1)
+        diff[i0] += guests
+        diff[i1] -= guests
+
+    occupancy = {}
+    for room_id, diff in diffs.items():
+        running = 0
+        occ = [0] * n_slots
+        for i in range(n_slots):
+            running += diff[i]
+            occ[i] = running
+        occupancy[room_id] = occ
+    return occupancy
+
+
+def load_day_occupancy(restaurant_id, date, opening_time, interval_minutes, n_slots, room=None, exclude_pk=None):
+    """
+    Mengambil semua reservasi aktif cabang `restaurant_id` pada `date` dengan
+    SATU query (lewat index reservasi_branch_date_idx) lalu menghitung
+    okupansinya per ruangan. Jika `room` diberikan, hanya ruangan itu yang dimuat.
+    """
+    queryset = Reservation.objects.filter(restaurant_id=restaurant_id, reservation_date=date, status__in=ACTIVE_STATUSES)
+    if room is not None:
+        queryset = queryset.filter(room_type=room)
+    if exclude_pk is not None:
+        queryset = queryset.exclude(pk=exclude_pk)
+    rows = queryset.values_list('room_type_id', 'reservation_time', 'duration_minutes', 'number_of_guests')
+    return sweep_occupancy(rows, opening_time, interval_minutes, n_slots)
+
+
+def load_range_occupancy(restaurant_id, date_from, date_to, opening_time, interval_minutes, n_slots):
+    """
+    Seperti load_day_occupancy, tetapi untuk rentang tanggal [date_from, date_to]
+    sekaligus. Tetap SATU query; hasilnya dikunci dengan (tanggal, room_id).
+    """
+    rows = Reservation.objects.filter(
+        restaurant_id=restaurant_id,
+        reservation_date__range=(date_from, date_to),
+        status__in=ACTIVE_STATUSES,
+    ).values_list('reservation_date', 'room_type_id', 'reservation_time', 'duration_minutes', 'number_of_guests')
+    keyed_rows = (((date, room_id), start, duration, guests) for date, room_id, start, duration, guests in rows)
+    return sweep_occupancy(keyed_rows, opening_time, interval_minutes, n_slots)
+
+
+def total_occupancy(occupancy_by_room, n_slots):
+    """Menjumlahkan okupansi semua ruangan per slot."""
+    totals = [0] * n_slots
+    for occ in occupancy_by_room.values():
+        for i, guests in enumerate(occ):
+            totals[i] += guests
+    return totals
+
+
+def peak_occupancy(occupancy, i0, i1):
+    """Okupansi tertinggi dalam rentang slot [i0, i1)."""
+    window = occupancy[i0:i1] if occupancy else []
+    return max(window) if window else 0
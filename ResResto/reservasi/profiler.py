@@ -0,0 +1,178 @@
+import cProfile
+import logging
+import pstats
+import random
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import DatabaseError, connection
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILER = {
+    'SAMPLE_RATE': 0.0,        # porsi request yang diprofil acak (0 = mati)
+    'ALLOW_ON_DEMAND': True,   # staf boleh meminta profil lewat ?_profile=1 / header X-Profile: 1
+    'MAX_RECORDS': 500,        # hanya sekian hasil terbaru yang disimpan
+    'MAX_AGE_DAYS': 7,         # hasil yang lebih tua dihapus
+    'TOP_FUNCTIONS': 25,       # fungsi terpanas (tottime & cumtime) yang disimpan
+    'TOP_QUERIES': 25,         # query terlama (dikelompokkan per teks SQL) yang disimpan
+}
+ON_DEMAND_PARAM = '_profile'
+ON_DEMAND_HEADER = 'HTTP_X_PROFILE'
+MAX_SQL_LENGTH = 2000
+
+
+def get_config():
+    config = dict(DEFAULT_PROFILER)
+    config.update(getattr(settings, 'RESERVASI_PROFILER', {}))
+    return config
+
+
+def sample_reason(request, config):
+    """
+    'MANUAL' jika staf meminta profil untuk request ini, 'RATE' jika terpilih
+    sampling acak, atau None (tidak diprofil).
+    """
+    if config['ALLOW_ON_DEMAND'] and (request.GET.get(ON_DEMAND_PARAM) == '1' or request.META.get(ON_DEMAND_HEADER) == '1'):
+        user = getattr(request, 'user', None)
+        # Hanya staf: profiling memperlambat request, jangan jadi celah bagi publik
+        if user is not None and user.is_staff:
+            return 'MANUAL'
+    rate = config['SAMPLE_RATE']
+    if rate > 0 and random.random() < rate:
+        return 'RATE'
+    return None
+
+
+# ===================================================================
+# PENGUKURAN SATU REQUEST: cProfile + query SQL
+# ===================================================================
+class RequestProfile:
+    """
+    Context manager yang menyalakan cProfile dan mencatat setiap query di
+    koneksi default selama blok berjalan. Jika profiler lain sudah aktif
+    (mis. di Python 3.12+ cProfile bersifat global), hanya SQL yang dicatat.
+    """
+
+    def __init__(self):
+        self.profiler = cProfile.Profile()
+        self.profiling = False
+        self.queries = {}
+        self.query_count = 0
+        self.query_ms = 0.0
+        self.duration_ms = 0.0
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = (time.perf_counter() - start) * 1000
+            entry = self.queries.setdefault(sql, [0, 0.0])
+            entry[0] += 1
+            entry[1] += elapsed
+            self.query_count += 1
+            self.query_ms += elapsed
+
+    def __enter__(self):
+        self._wrapper = connection.execute_wrapper(self.record_query)
+        self._wrapper.__enter__()
+        self._start = time.perf_counter()
+        try:
+            self.profiler.enable()
+            self.profiling = True
+        except ValueError:
+            logger.warning("Profiler lain sedang aktif; hanya SQL yang dicatat.")
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.profiling:
+            self.profiler.disable()
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        self._wrapper.__exit__(*exc_info)
+
+    def hot_functions(self, limit):
+        """
+        Gabungan `limit` fungsi dengan tottime (waktu di fungsi itu sendiri)
+        dan cumtime (termasuk fungsi yang dipanggilnya) terbesar.
+        """
+        if not self.profiling:
+            return []
+        stats = pstats.Stats(self.profiler).stats
+        rows = [
+            {
+                'function': function_label(key),
+                'calls': calls,
+                'tottime_ms': round(tottime * 1000, 3),
+                'cumtime_ms': round(cumtime * 1000, 3),
+            }
+            for key, (_, calls, tottime, cumtime, _) in stats.items()
+        ]
+        by_total = sorted(rows, key=lambda row: row['tottime_ms'], reverse=True)[:limit]
+        by_cumulative = sorted(rows, key=lambda row: row['cumtime_ms'], reverse=True)[:limit]
+        selected = {row['function']: row for row in by_total + by_cumulative}
+        return sorted(selected.values(), key=lambda row: row['cumtime_ms'], reverse=True)
+
+    def slow_queries(self, limit):
+        # Dikelompokkan per teks SQL (parameter tidak ikut), jadi pola N+1 terlihat sebagai count besar
+        rows = [
+            {'sql': sql[:MAX_SQL_LENGTH], 'count': count, 'total_ms': round(total, 3)}
+            for sql, (count, total) in self.queries.items()
+        ]
+        return sorted(rows, key=lambda row: row['total_ms'], reverse=True)[:limit]
+
+
+def function_label(key):
+    filename, line, name = key
+    if filename == '~':
+        return name  # fungsi bawaan, mis. <method 'execute' of 'sqlite3.Cursor' objects>
+    base_dir = str(settings.BASE_DIR)
+    if filename.startswith(base_dir):
+        filename = filename[len(base_dir):].lstrip('/\\')
+    elif 'site-packages' in filename:
+        filename = filename.split('site-packages', 1)[1].lstrip('/\\')
+    return f"{filename}:{line}({name})"
+
+
+# ===================================================================
+# PENYIMPANAN + RETENSI
+# ===================================================================
+def save(request, response, profile, reason, config):
+    from .models import ProfiledRequest
+
+    match = getattr(request, 'resolver_match', None)
+    user = getattr(request, 'user', None)
+    try:
+        record = ProfiledRequest.objects.create(
+            method=request.method,
+            path=request.path[:255],
+            view_name=(match.view_name if match else '')[:200],
+            status_code=response.status_code,
+            user_id=user.pk if user is not None and user.is_authenticated else None,
+            sampled_by=reason,
+            duration_ms=profile.duration_ms,
+            query_count=profile.query_count,
+            query_ms=profile.query_ms,
+            functions=profile.hot_functions(config['TOP_FUNCTIONS']),
+            queries=profile.slow_queries(config['TOP_QUERIES']),
+        )
+        prune(config)
+    except DatabaseError:
+        # Profil hanya alat bantu: gagal menyimpan tidak boleh menggagalkan request
+        logger.exception("Gagal menyimpan hasil profil request %s", request.path)
+        return None
+    return record
+
+
+def prune(config):
+    """Menghapus hasil di luar MAX_RECORDS terbaru atau lebih tua dari MAX_AGE_DAYS."""
+    from .models import ProfiledRequest
+
+    stale = ProfiledRequest.objects.filter(created_at__lt=timezone.now() - timedelta(days=config['MAX_AGE_DAYS']))
+    cutoff = ProfiledRequest.objects.order_by('-pk').values_list('pk', flat=True)[config['MAX_RECORDS']:config['MAX_RECORDS'] + 1]
+    cutoff = list(cutoff)
+    if cutoff:
+        stale = stale | ProfiledRequest.objects.filter(pk__lte=cutoff[0])
+    return stale.delete()[0]
@@ -0,0 +1,150 @@
+import datetime
+from bisect import bisect_right
+from collections import namedtuple
+
+from .models import ScheduleException
+
+# Satu pengecualian jadwal dalam bentuk ringkas (mudah di-pickle ke cache)
+Rule = namedtuple('Rule', 'id name is_closed opening_time closing_time interval_minutes')
+
+# Jam efektif untuk satu tanggal (dan ruangan) setelah pengecualian diterapkan
+EffectiveHours = namedtuple('EffectiveHours', 'opening_time closing_time interval_minutes is_closed reason')
+
+# Urutan prioritas dalam satu level (cabang atau ruangan): tanggal tertentu
+# mengalahkan pengulangan tahunan, tahunan mengalahkan mingguan.
+RECURRENCE_PRIORITY = {'NONE': 3, 'YEARLY': 2, 'WEEKLY': 1}
+
+
+# ===================================================================
+# KOMPILASI: pengecualian -> segmen tanggal terurut tanpa tumpang tindih
+# ===================================================================
+def compile_segments(ranges):
+    """
+    Mengubah daftar (mulai, akhir, prioritas, rule) berbasis ordinal tanggal
+    (akhir inklusif) menjadi (starts, segments): segmen terurut yang tidak
+    saling tumpang tindih, masing-masing dengan satu rule pemenang. Pencarian
+    satu tanggal cukup bisect pada `starts`, jadi O(log n).
+    """
+    if not ranges:
+        return [], []
+    boundaries = sorted({start for start, _, _, _ in ranges} | {end + 1 for _, end, _, _ in ranges})
+    starts, segments = [], []
+    for seg_start, next_start in zip(boundaries, boundaries[1:]):
+        covering = [(priority, rule) for start, end, priority, rule in ranges if start <= seg_start and end >= seg_start]
+        if not covering:
+            continue
+        winner = max(covering, key=lambda item: item[0])[1]
+        # Gabungkan dengan segmen sebelumnya jika bersambung dan rule-nya sama
+        if segments and segments[-1][1] == seg_start - 1 and segments[-1][2] is winner:
+            segments[-1] = (segments[-1][0], next_start - 1, winner)
+            continue
+        starts.append(seg_start)
+        segments.append((seg_start, next_start - 1, winner))
+    return starts, segments
+
+
+def _find(starts, segments, ordinal):
+    i = bisect_right(starts, ordinal) - 1
+    if i >= 0 and segments[i][1] >= ordinal:
+        return segments[i][2]
+    return None
+
+
+class CalendarLevel:
+    """Pengecualian untuk satu cakupan: seluruh cabang, atau satu ruangan."""
+
+    def __init__(self, exceptions):
+        dated, weekly, yearly = [], {}, {}
+        for exc in exceptions:
+            rule = Rule(exc.id, exc.name, exc.is_closed, exc.opening_time, exc.closing_time, exc.slot_interval_minutes)
+            start = exc.start_date.toordinal()
+            end = (exc.end_date or (datetime.date.max if exc.recurrence == 'WEEKLY' else exc.start_date)).toordinal()
+            # Id lebih besar (dibuat belakangan) menang jika prioritasnya sama
+            priority = (RECURRENCE_PRIORITY[exc.recurrence], exc.id)
+            if exc.recurrence == 'WEEKLY':
+                weekly.setdefault(exc.start_date.weekday(), []).append((start, end, priority, rule))
+            elif exc.recurrence == 'YEARLY':
+                # Berlaku sejak kemunculan pertamanya: libur yang dibuat tahun
+                # ini tidak ikut menutup tanggal yang sama di tahun-tahun lalu
+                day = exc.start_date
+                while day.toordinal() <= end:
+                    yearly.setdefault((day.month, day.day), []).append((priority, day.toordinal(), rule))
+                    day += datetime.timedelta(days=1)
+            else:
+                dated.append((start, end, priority, rule))
+
+        self.dated = compile_segments(dated)
+        self.weekly = {weekday: compile_segments(ranges) for weekday, ranges in weekly.items()}
+        # Per (bulan, tanggal): (berlaku_sejak, rule), prioritas tertinggi lebih dulu
+        self.yearly = {
+            key: [(since, rule) for _, since, rule in sorted(rules, key=lambda item: item[0], reverse=True)]
+            for key, rules in yearly.items()
+        }
+
+    def lookup(self, date):
+        ordinal = date.toordinal()
+        rule = _find(*self.dated, ordinal)
+        if rule is None:
+            rule = next((rule for since, rule in self.yearly.get((date.month, date.day), ()) if since <= ordinal), None)
+        if rule is None and date.weekday() in self.weekly:
+            rule = _find(*self.weekly[date.weekday()], ordinal)
+        return rule
+
+
+class CompiledCalendar:
+    """
+    Semua pengecualian jadwal satu cabang, dikompilasi sekali (satu query) dan
+    disimpan di cache katalog. Setelah itu menentukan jam buka suatu tanggal
+    tidak menjalankan query sama sekali.
+    """
+
+    def __init__(self, exceptions):
+        by_room = {}
+        for exc in exceptions:
+            by_room.setdefault(exc.room_id, []).append(exc)
+        self.branch = CalendarLevel(by_room.pop(None, []))
+        self.rooms = {room_id: CalendarLevel(items) for room_id, items in by_room.items()}
+
+    def lookup(self, date, room_id=None):
+        """Rule pemenang untuk `date` (level ruangan jika `room_id` diberikan), atau None."""
+        if room_id is None:
+            return self.branch.lookup(date)
+        level = self.rooms.get(room_id)
+        return level.lookup(date) if level else None
+
+
+def compile_calendar(restaurant_id):
+    return CompiledCalendar(list(ScheduleException.objects.filter(restaurant_id=restaurant_id)))
+
+
+# ===================================================================
+# JAM EFEKTIF
+# ===================================================================
+def _apply(hours, rule):
+    if rule is None:
+        return hours
+    if rule.is_closed:
+        return hours._replace(is_closed=True, reason=rule.name)
+    return EffectiveHours(
+        rule.opening_time or hours.opening_time,
+        rule.closing_time or hours.closing_time,
+        rule.interval_minutes or hours.interval_minutes,
+        False,
+        rule.name,
+    )
+
+
+def effective_hours(profile, date, room_id=None):
+    """
+    Jam buka, jam tutup dan interval slot cabang `profile` pada `date`.
+    Pengecualian tingkat cabang diterapkan dulu, lalu pengecualian ruangan
+    `room_id` (jika ada). Cabang yang tutup tetap tutup untuk semua ruangan.
+    """
+    from . import catalog
+
+    calendar = catalog.get_calendar(profile.id)
+    hours = EffectiveHours(profile.opening_time, profile.closing_time, profile.slot_interval_minutes, False, '')
+    hours = _apply(hours, calendar.lookup(date))
+    if hours.is_closed or room_id is None:
+        return hours
+    return _apply(hours, calendar.lookup(date, room_id))
@@ -0,0 +1,92 @@
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Reservation, Room
+
+# Tabel virtual FTS5 yang dibuat dan dijaga trigger di migrasi 0005
+FTS_TABLE = 'reservasi_reservation_fts'
+
+# Gabungkan kelompok digit yang dipisah spasi/tanda baca ("0812-3456 789")
+# supaya cocok dengan nomor telepon yang disimpan di indeks tanpa pemisah.
+_PHONE_SEPARATORS = re.compile(r'(?<=\d)[\s\-.()]+(?=\d)')
+_TOKEN = re.compile(r'\w+', re.UNICODE)
+
+
+# ===================================================================
+# PENCARIAN FULL-TEXT (SQLite FTS5) UNTUK RESERVASI
+# ===================================================================
+def normalize_phone(value):
+    """Hanya menyisakan digit dari nomor telepon."""
+    return re.sub(r'\D', '', value or '')
+
+
+def build_match_query(text):
+    """
+    Mengubah input bebas menjadi ekspresi MATCH FTS5 yang aman: setiap kata
+    dijadikan string ber-kutip dengan pencocokan awalan ("budi"*), digabung AND.
+    Mengembalikan string kosong jika tidak ada kata yang bisa dicari.
+    """
+    text = _PHONE_SEPARATORS.sub('', text or '')
+    tokens = _TOKEN.findall(text.lower())
+    return ' '.join(f'"{token}"*' for token in tokens)
+
+
+def fts_available(using='default'):
+    return connections[using].vendor == 'sqlite'
+
+
+def fts_subquery(match_query):
+    """Subquery id reservasi yang cocok, dijalankan sepenuhnya di database."""
+    return RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [match_query])
+
+
+def search_reservations(queryset, text):
+    """
+    Menyaring `queryset` Reservation berdasarkan nama, email, telepon dan
+    permintaan khusus lewat indeks FTS5, plus nama ruangan. Pada database
+    selain SQLite kembali ke pencarian icontains.
+    """
+    text = (text or '').strip()
+    if not text:
+        return queryset
+
+    # Tabel Room kecil, jadi cukup ambil id-nya lalu filter lewat indeks FK
+    room_ids = list(Room.objects.filter(name__icontains=text).values_list('id', flat=True))
+    room_filter = Q(room_type_id__in=room_ids) if room_ids else Q(pk__in=[])
+
+    if not fts_available(queryset.db):
+        return queryset.filter(
+            Q(guest_name__icontains=text) | Q(guest_email__icontains=text)
+            | Q(guest_phone__icontains=text) | Q(special_requests__icontains=text)
+            | room_filter
+        )
+
+    match_query = build_match_query(text)
+    if not match_query:
+        return queryset.filter(room_filter)
+    return queryset.filter(Q(pk__in=fts_subquery(match_query)) | room_filter)
+
+
+def ranked_reservation_ids(text, limit=20, using='default', restaurant_id=None):
+    """
+    Id reservasi yang cocok, diurutkan berdasarkan relevansi FTS5 (bm25).
+    Dipakai endpoint pencarian staf yang butuh hasil teratas saja. Jika
+    `restaurant_id` diberikan, hanya reservasi cabang itu yang dikembalikan
+    (disaring sebelum LIMIT agar hasil teratas tidak "dimakan" cabang lain).
+    """
+    match_query = build_match_query(text)
+    if not match_query or not fts_available(using):
+        return []
+    sql = f"SELECT {FTS_TABLE}.rowid FROM {FTS_TABLE}"
+    params = [match_query]
+    where = f"WHERE {FTS_TABLE} MATCH %s"
+    if restaurant_id is not None:
+        sql += f" JOIN {Reservation._meta.db_table} r ON r.id = {FTS_TABLE}.rowid"
+        where += " AND r.restaurant_id = %s"
+        params.append(restaurant_id)
+    with connections[using].cursor() as cursor:
+        cursor.execute(f"{sql} {where} ORDER BY rank LIMIT %s", params + [limit])
+        return [row[0] for row in cursor.fetchall()]
@@ -0,0 +1,46 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import Reservation
+from . import changes, events, guests, kitchen, notifications
+
+# Status yang perlu diberitahukan ke tamu saat staf mengubahnya
+NOTIFIED_STATUSES = {'CONFIRMED', 'CANCELLED', 'WAITLISTED'}
+
+
+# ===================================================================
+# PERUBAHAN STATUS RESERVASI
+# ===================================================================
+def bulk_set_status(queryset, status, conflicts=None):
+    """
+    Mengubah status semua reservasi di `queryset` dalam satu transaksi dan
+    mengantrikan notifikasi, log perubahan dan statistik profil tamunya di
+    transaksi yang sama.
+    Baris yang statusnya sudah sama dilewati agar tamu tidak menerima
+    notifikasi ganda. Setiap baris diubah dengan compare-and-swap pada kolom
+    version: baris yang diubah pihak lain di antara baca dan tulis dilewati,
+    dan id-nya ditambahkan ke list `conflicts` jika diberikan. Mengembalikan
+    jumlah baris yang berubah.
+    """
+    with transaction.atomic():
+        rows = list(queryset.exclude(status=status).values('pk', 'version', 'guest_id', *kitchen.MANIFEST_FIELDS))
+        now = timezone.now()
+        changed = []
+        for row in rows:
+            # queryset.update() melewati auto_now, jadi updated_at diisi manual
+            if Reservation.objects.filter(pk=row['pk'], version=row['version']).update(status=status, version=F('version') + 1, updated_at=now):
+                changed.append(row)
+            elif conflicts is not None:
+                conflicts.append(row['pk'])
+        if not changed:
+            return 0
+        ids = [row['pk'] for row in changed]
+        # queryset.update() tidak memicu signals, jadi log perubahan ditulis di sini
+        changes.record_bulk(ids, 'STATUS_CHANGED', ['status'])
+        guests.refresh_stats(row['guest_id'] for row in changed)
+        if status in NOTIFIED_STATUSES:
+            notifications.enqueue_for_ids(ids, status)
+        events.schedule_occupancy_publish((row['restaurant_id'], row['reservation_date'], row['room_type_id']) for row in changed)
+        kitchen.schedule_update((row, {**row, 'status': status}) for row in changed)
+    return len(changed)
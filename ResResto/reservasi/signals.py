@@ -0,0 +1,95 @@
+from django.db.models.signals import post_save, post_delete, pre_save
+from django.dispatch import receiver
+
+from .models import Room, FoodPackage, RestaurantProfile, Reservation, ScheduleException
+from . import catalog, changes, events, guests, kitchen
+
+
+# ===================================================================
+# INVALIDASI CACHE KATALOG & PROFIL
+# ===================================================================
+@receiver(post_save, sender=Room)
+@receiver(post_delete, sender=Room)
+@receiver(post_save, sender=FoodPackage)
+@receiver(post_delete, sender=FoodPackage)
+@receiver(post_save, sender=ScheduleException)
+@receiver(post_delete, sender=ScheduleException)
+def invalidate_catalog(sender, instance, **kwargs):
+    # Versi katalog per cabang: perubahan di satu cabang tidak membuang cache cabang lain
+    catalog.bump_catalog_version(instance.restaurant_id)
+
+
+@receiver(post_save, sender=RestaurantProfile)
+@receiver(post_delete, sender=RestaurantProfile)
+def invalidate_profile(sender, **kwargs):
+    catalog.bump_profile_version()
+
+
+# ===================================================================
+# PUSH KETERSEDIAAN SLOT (SSE) SETIAP KALI RESERVASI BERUBAH
+# ===================================================================
+@receiver(post_save, sender=Reservation)
+@receiver(post_delete, sender=Reservation)
+def publish_reservation_occupancy(sender, instance, **kwargs):
+    keys = {(instance.restaurant_id, instance.reservation_date, instance.room_type_id)}
+    loaded = getattr(instance, '_loaded_values', None)
+    if loaded:
+        # Reservasi dipindah tanggal/ruangan: slot lamanya juga ikut berubah
+        keys.add((loaded.get('restaurant_id'), loaded.get('reservation_date'), loaded.get('room_type_id')))
+    events.schedule_occupancy_publish(keys)
+
+
+# ===================================================================
+# LOG PERUBAHAN RESERVASI (feed untuk POS, kitchen display, analitik)
+# ===================================================================
+@receiver(post_save, sender=Reservation)
+def log_reservation_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return  # loaddata: bukan perubahan bisnis
+    changes.record_saved(instance, created)
+
+
+@receiver(post_delete, sender=Reservation)
+def log_reservation_deleted(sender, instance, **kwargs):
+    changes.record(instance, 'DELETED')
+
+
+# ===================================================================
+# PROFIL TAMU: hubungkan reservasi & perbarui statistik kunjungan
+# ===================================================================
+@receiver(pre_save, sender=Reservation)
+def link_reservation_guest(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    guests.link_guest(instance)
+
+
+@receiver(post_save, sender=Reservation)
+def refresh_guest_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    if created or loaded.get('status') != instance.status or loaded.get('guest_id') != instance.guest_id:
+        guests.refresh_stats([instance.guest_id, loaded.get('guest_id')])
+
+
+@receiver(post_delete, sender=Reservation)
+def refresh_guest_stats_on_delete(sender, instance, **kwargs):
+    guests.refresh_stats([instance.guest_id])
+
+
+# ===================================================================
+# MANIFEST DAPUR: terapkan selisih reservasi ke manifest yang di-cache
+# ===================================================================
+@receiver(post_save, sender=Reservation)
+def update_kitchen_manifest_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    loaded = None if created else getattr(instance, '_loaded_values', None)
+    kitchen.schedule_update([(loaded, kitchen.instance_values(instance))])
+
+
+@receiver(post_delete, sender=Reservation)
+def update_kitchen_manifest_on_delete(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', None) or kitchen.instance_values(instance)
+    kitchen.schedule_update([(loaded, None)])
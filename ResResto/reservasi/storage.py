@@ -0,0 +1,62 @@
+import gzip
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # ada di requirements.txt; jika tidak terpasang hanya .gz yang dibuat
+    brotli = None
+
+# Ekstensi berbasis teks yang layak dikompres. Gambar seperti .jpg/.png sudah
+# terkompresi, jadi dilewati.
+COMPRESSIBLE_EXTENSIONS = {'.css', '.js', '.mjs', '.json', '.map', '.svg', '.txt', '.html', '.xml', '.ico'}
+# File sekecil ini tidak sebanding dengan biaya dekompresi di browser
+MIN_COMPRESS_SIZE = 256
+
+
+# ===================================================================
+# STORAGE STATIC: nama ber-hash (manifest) + varian .gz/.br siap saji
+# ===================================================================
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage yang, setelah `collectstatic` menulis file
+    ber-hash, juga membuat varian gzip (dan brotli jika terpasang) untuk file
+    teks. Varian ini dilayani oleh PrecompressedStaticMiddleware.
+    """
+
+    manifest_strict = False
+
+    def stored_name(self, name):
+        try:
+            return super().stored_name(name)
+        except ValueError:
+            # Belum pernah collectstatic (mis. saat test): pakai nama aslinya
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run=dry_run, **options)
+        if dry_run:
+            return
+        for name in list(self.hashed_files.values()) + list(paths):
+            if self.exists(name):
+                self.compress(name)
+
+    def compress(self, name):
+        if os.path.splitext(name)[1].lower() not in COMPRESSIBLE_EXTENSIONS:
+            return
+        path = self.path(name)
+        with open(path, 'rb') as source:
+            content = source.read()
+        if len(content) < MIN_COMPRESS_SIZE:
+            return
+
+        # mtime=0 agar hasil gzip deterministik antar build
+        variants = [('.gz', gzip.compress(content, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append(('.br', brotli.compress(content)))
+        for suffix, compressed in variants:
+            # Hanya simpan varian yang benar-benar lebih kecil
+            if len(compressed) < len(content):
+                with open(path + suffix, 'wb') as target:
+                    target.write(compressed)
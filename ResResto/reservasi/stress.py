@@ -0,0 +1,395 @@
+import datetime
+import os
+import random
+import re
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connections
+from django.urls import reverse
+from django.utils import timezone
+
+from . import audit, catalog, changes, kitchen
+from .forms import ReservationForm
+from .models import FoodPackage, Reservation, ReservationChange, RestaurantProfile, Room
+from .occupancy import ACTIVE_STATUSES, build_slot_grid
+
+# Bobot relatif setiap jenis operasi yang dipilih acak oleh worker
+OPERATION_WEIGHTS = {
+    'book': 6,             # tamu membuat reservasi (kadang dengan join_waitlist)
+    'cancel': 2,           # tamu membatalkan reservasinya sendiri
+    'admin_confirm': 2,    # aksi massal admin: konfirmasi reservasi PENDING
+    'admin_waitlist': 1,   # aksi massal admin: pindahkan ke waiting list
+    'admin_cancel': 1,     # aksi massal admin: batalkan
+    'admin_edit': 2,       # staf menyimpan form ubah reservasi di admin
+}
+
+# SQLite berbasis file dengan WAL dan busy timeout, seperti deployment kecil
+SQLITE_OPTIONS = {
+    'timeout': 30,
+    'transaction_mode': 'IMMEDIATE',
+    'init_command': 'PRAGMA journal_mode=WAL;',
+}
+
+# Fixture: satu cabang dengan ruangan berkapasitas kecil agar cepat penuh
+ROOMS = (('Meja Kecil', 6), ('Ruang Keluarga', 10), ('VIP', 4))
+PACKAGES = (('Paket Hemat', 50000, 60), ('Paket Lengkap', 120000, 120))
+STAFF_USERNAME = 'stres-staf'
+GUEST_USERNAME = 'stres-tamu-{}'
+
+# Rate limit dan load shedding dimatikan: yang diuji logika kapasitas, bukan throttling
+HARNESS_SETTINGS = {
+    'RESERVASI_RATE_LIMITS': {},
+    'RESERVASI_LOAD_SHEDDING': {'DB_LATENCY_THRESHOLD_MS': 10 ** 9},
+}
+
+SUCCESS_URL_RE = re.compile(r'/reservasi-sukses/(\d+)/')
+# Penanda unik di special_requests untuk setiap simpan dari form admin
+EDIT_MARKER = 'stres-edit-{seed}-{worker}-{n}'
+
+
+# ===================================================================
+# DATABASE SQLITE KHUSUS STRESS TEST
+# ===================================================================
+@contextmanager
+def use_database(path):
+    """
+    Mengarahkan alias 'default' (semua thread) ke file SQLite `path`, dengan
+    cara yang sama seperti test runner Django membuat database test.
+    """
+    connections.close_all()
+    settings_dict = connections['default'].settings_dict
+    original = settings_dict['NAME'], settings_dict.get('OPTIONS', {})
+    settings_dict['NAME'] = str(path)
+    settings_dict['OPTIONS'] = dict(original[1], **SQLITE_OPTIONS)
+    try:
+        yield
+    finally:
+        connections.close_all()
+        settings_dict['NAME'], settings_dict['OPTIONS'] = original
+
+
+@contextmanager
+def booking_gap(seconds):
+    """
+    Menyisipkan jeda `seconds` antara form.is_valid() (cek kapasitas) dan
+    save() di jalur booking, sehingga booking serentak benar-benar berebut
+    jendela cek-lalu-insert yang bisa menyebabkan overbooking.
+    """
+    original = ReservationForm.is_valid
+
+    def is_valid(form):
+        valid = original(form)
+        if valid and seconds and type(form) is ReservationForm:
+            time.sleep(seconds)
+        return valid
+
+    ReservationForm.is_valid = is_valid
+    try:
+        yield
+    finally:
+        ReservationForm.is_valid = original
+
+
+def prepare_template(path, guests):
+    """Migrasi dan isi fixture sekali; setiap run memakai salinan file ini."""
+    from django.contrib.auth.models import User
+
+    with use_database(path):
+        call_command('migrate', verbosity=0, interactive=False)
+        restaurant = RestaurantProfile.objects.create(name='Stress Test', slug='stres')
+        for name, capacity in ROOMS:
+            Room.objects.create(restaurant=restaurant, name=name, capacity=capacity)
+        for name, price, duration in PACKAGES:
+            FoodPackage.objects.create(restaurant=restaurant, name=name, price=price, default_duration_minutes=duration)
+        User.objects.create_superuser(STAFF_USERNAME, 'staf@stres.local', 'stres')
+        for i in range(guests):
+            User.objects.create_user(GUEST_USERNAME.format(i), f'tamu{i}@stres.local', 'stres')
+    connections.close_all()
+
+
+# ===================================================================
+# WORKER: operasi acak lewat view yang sebenarnya
+# ===================================================================
+class Worker:
+    """
+    Satu thread = satu tamu yang login dan satu sesi staf di admin. Urutan
+    operasi ditentukan oleh seed dan nomor worker, jadi seed yang sama
+    menghasilkan operasi yang sama (interleaving antar thread tetap acak).
+    """
+
+    def __init__(self, seed, index, operations, days, think_time):
+        from django.contrib.auth.models import User
+        from django.test import Client
+
+        self.seed, self.index, self.operations = seed, index, operations
+        self.days, self.think_time = days, think_time
+        self.rng = random.Random(f'{seed}:{index}')
+        self.guest = Client(HTTP_HOST='localhost', raise_request_exception=False)
+        self.guest.force_login(User.objects.get(username=GUEST_USERNAME.format(index)))
+        self.staff = Client(HTTP_HOST='localhost', raise_request_exception=False)
+        self.staff.force_login(User.objects.get(username=STAFF_USERNAME))
+        self.profile = catalog.default_branch()
+        self.rooms = list(catalog.get_rooms(self.profile.id))
+        self.packages = list(catalog.get_food_packages(self.profile.id))
+        self.slots = build_slot_grid(self.profile.opening_time, self.profile.closing_time, self.profile.slot_interval_minutes)
+        self.my_reservations = []
+        # Hasil: (operasi, status_http, detik) dan maksud setiap edit admin
+        self.results, self.edits, self.errors = [], [], []
+
+    def run(self):
+        names, weights = zip(*OPERATION_WEIGHTS.items())
+        try:
+            for n in range(self.operations):
+                name = self.rng.choices(names, weights)[0]
+                start = time.perf_counter()
+                try:
+                    status = getattr(self, name)(n)
+                except Exception as exc:  # satu operasi gagal tidak menghentikan worker
+                    status = 'error'
+                    self.errors.append(f"{name}: {exc!r}")
+                self.results.append((name, status, time.perf_counter() - start))
+        finally:
+            connections.close_all()
+
+    def pause(self):
+        # Jeda "berpikir" agar baca-lalu-tulis antar thread saling menyela
+        if self.think_time:
+            time.sleep(self.rng.uniform(0, self.think_time))
+
+    def pick_ids(self, statuses, k):
+        ids = list(
+            Reservation.objects.filter(restaurant=self.profile, status__in=statuses)
+            .order_by('-id').values_list('id', flat=True)[:50]
+        )
+        return self.rng.sample(ids, min(k, len(ids)))
+
+    def book(self, n):
+        room = self.rng.choice(self.rooms)
+        date = timezone.localdate() + datetime.timedelta(days=self.rng.randint(1, self.days))
+        data = {
+            'room_type': room.id,
+            'reservation_date': date.strftime('%Y-%m-%d'),
+            'reservation_time': self.rng.choice(self.slots).strftime('%H:%M:%S'),
+            'number_of_guests': self.rng.randint(1, max(1, room.capacity // 2)),
+            'food_package': self.rng.choice([''] + [package.id for package in self.packages]),
+            'guest_name': f'Tamu {self.index}',
+            'guest_email': f'tamu{self.index}@stres.local',
+            'guest_phone': f'08{self.index:010d}',
+        }
+        if self.rng.random() < 0.3:
+            data['join_waitlist'] = '1'
+        response = self.guest.post(reverse('reservasi:create_reservation'), data)
+        match = SUCCESS_URL_RE.search(response.get('Location', ''))
+        if match:
+            self.my_reservations.append(int(match.group(1)))
+        return response.status_code
+
+    def cancel(self, n):
+        if not self.my_reservations:
+            return self.book(n)
+        reservation_id = self.rng.choice(self.my_reservations)
+        return self.guest.post(reverse('reservasi:cancel_reservation', args=[reservation_id])).status_code
+
+    def admin_action(self, action, statuses):
+        ids = self.pick_ids(statuses, self.rng.randint(1, 5))
+        if not ids:
+            return 'skip'
+        self.pause()
+        response = self.staff.post(
+            reverse('admin:reservasi_reservation_changelist'),
+            {'action': action, '_selected_action': ids, 'index': 0},
+        )
+        return response.status_code
+
+    def admin_confirm(self, n):
+        return self.admin_action('confirm_reservations', ['PENDING'])
+
+    def admin_waitlist(self, n):
+        return self.admin_action('mark_as_waitlisted', ACTIVE_STATUSES)
+
+    def admin_cancel(self, n):
+        return self.admin_action('cancel_reservations', ACTIVE_STATUSES + ['WAITLISTED'])
+
+    def admin_edit(self, n):
+        ids = self.pick_ids(ACTIVE_STATUSES + ['WAITLISTED'], 1)
+        if not ids:
+            return 'skip'
+        # Yang dilihat staf saat membuka form ubah...
+        seen = Reservation.objects.get(pk=ids[0])
+        self.pause()
+        # ...lalu hanya permintaan khusus yang diubah sebelum disimpan
+        marker = EDIT_MARKER.format(seed=self.seed, worker=self.index, n=n)
+        data = {
+            'user': seen.user_id or '',
+            'guest_name': seen.guest_name,
+            'guest_email': seen.guest_email,
+            'guest_phone': seen.guest_phone,
+            'restaurant': seen.restaurant_id,
+            'reservation_date': seen.reservation_date.strftime('%Y-%m-%d'),
+            'reservation_time': seen.reservation_time.strftime('%H:%M:%S'),
+            'room_type': seen.room_type_id or '',
+            'number_of_guests': seen.number_of_guests,
+            'food_package': seen.food_package_id or '',
+            'duration_minutes': seen.duration_minutes or '',
+            'special_requests': marker,
+            'status': seen.status,
+            'expected_version': seen.version,
+            '_save': 'Simpan',
+        }
+        url = reverse('admin:reservasi_reservation_change', args=[seen.pk])
+        response = self.staff.post(url, data)
+        if response.status_code == 200:
+            return 'form-error'  # form tampil lagi, biasanya karena konflik versi
+        if response.status_code == 302 and response['Location'] == url:
+            return 'conflict'  # konflik saat simpan: halaman dibuka ulang
+        if response.status_code == 302:
+            self.edits.append({'reservation_id': seen.pk, 'marker': marker, 'status_seen': seen.status})
+        return response.status_code
+
+
+# ===================================================================
+# INVARIAN
+# ===================================================================
+def overbooking_violations(queryset=None):
+    """Ruangan-slot yang okupansi aktifnya melebihi kapasitas (lewat modul audit)."""
+    violations = []
+    for finding in audit.audit(queryset):
+        if finding.get('slots'):
+            violations.append({
+                'invariant': 'kapasitas',
+                'message': f"{finding['room']} {finding['date']} melebihi kapasitas {finding['capacity']}",
+                'detail': finding,
+            })
+    return violations
+
+
+def lost_update_violations(edits=()):
+    """
+    Mencari perubahan yang tertimpa tanpa disadari penulisnya, dari log
+    perubahan (ReservationChange) yang urut sesuai commit:
+
+    - baris log yang nilai suatu kolomnya berbeda dari baris sebelumnya,
+      padahal kolom itu tidak ada di changed_fields penulisnya;
+    - simpan form admin (`edits`) yang mengembalikan status ke nilai yang
+      dilihat staf, padahal status sempat diubah pihak lain sejak itu.
+    """
+    markers = {edit['marker']: edit for edit in edits}
+    violations = []
+    previous = {}
+    for change in ReservationChange.objects.exclude(kind='DELETED').order_by('seq').iterator():
+        before = previous.get(change.reservation_id)
+        previous[change.reservation_id] = change
+        if before is None:
+            continue
+        for field, value in change.data.items():
+            if field == 'created_at' or field in changes.IGNORED_FIELDS or field in change.changed_fields:
+                continue
+            if before.data.get(field) != value:
+                violations.append({
+                    'invariant': 'lost-update',
+                    'message': f"Reservasi #{change.reservation_id}: {field} kembali ke {value!r} (seq {change.seq})",
+                    'detail': {'seq': change.seq, 'field': field, 'before': before.data.get(field), 'after': value},
+                })
+        # Hanya baris simpan form itu sendiri; marker tetap ada di perubahan sesudahnya
+        edit = markers.get(change.data.get('special_requests')) if before.data.get('special_requests') != change.data.get('special_requests') else None
+        if edit and before.data.get('status') != edit['status_seen'] and change.data.get('status') == edit['status_seen']:
+            violations.append({
+                'invariant': 'lost-update',
+                'message': (
+                    f"Reservasi #{change.reservation_id}: status {before.data.get('status')} ditimpa "
+                    f"form admin lama menjadi {edit['status_seen']} (seq {change.seq})"
+                ),
+                'detail': {'seq': change.seq, 'field': 'status', 'before': before.data.get('status'), 'after': edit['status_seen']},
+            })
+    return violations
+
+
+def manifest_violations(days=()):
+    """
+    Manifest dapur di cache yang berbeda dari hasil hitung ulang, untuk setiap
+    (restaurant_id, tanggal) di `days` yang sudah di-cache sebelum worker mulai.
+    """
+    violations = []
+    for restaurant_id, date in days:
+        cached = kitchen.get_counts(restaurant_id, date)
+        expected = kitchen.build_counts(restaurant_id, date)
+        if cached != expected:
+            violations.append({
+                'invariant': 'manifest-dapur',
+                'message': f"Manifest dapur cabang #{restaurant_id} {date} tidak sama dengan hitung ulang",
+                'detail': {
+                    'date': date.isoformat(),
+                    'cells': sorted(str(key) for key in set(cached) | set(expected) if cached.get(key) != expected.get(key)),
+                },
+            })
+    return violations
+
+
+def check_invariants(edits=(), manifest_days=()):
+    return overbooking_violations() + lost_update_violations(edits) + manifest_violations(manifest_days)
+
+
+# ===================================================================
+# MENJALANKAN SATU SEED
+# ===================================================================
+def run_seed(template, workdir, seed, threads, operations, days=3, think_time=0.005, booking_gap_time=0.005):
+    """
+    Menjalankan `threads` worker x `operations` operasi terhadap salinan baru
+    database template, lalu memeriksa invarian. Mengembalikan dict hasil.
+    `think_time` adalah jeda baca-tulis aksi admin, `booking_gap_time` jeda
+    antara cek kapasitas dan insert booking (lihat booking_gap).
+    """
+    from django.test.utils import override_settings
+
+    path = os.path.join(workdir, f'stres-{seed}.sqlite3')
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    shutil.copyfile(template, path)
+    cache.clear()
+    catalog._local.clear()
+
+    with use_database(path), override_settings(**HARNESS_SETTINGS), booking_gap(booking_gap_time):
+        # Manifest dapur di-cache lebih dulu agar pembaruan inkrementalnya ikut diuji
+        manifest_days = [
+            (branch.id, timezone.localdate() + datetime.timedelta(days=offset))
+            for branch in catalog.get_branches() for offset in range(1, days + 1)
+        ]
+        for restaurant_id, date in manifest_days:
+            kitchen.get_counts(restaurant_id, date)
+        workers = [Worker(seed, i, operations, days, think_time) for i in range(threads)]
+        pool = [threading.Thread(target=worker.run, name=f'stres-{seed}-{i}') for i, worker in enumerate(workers)]
+        start = time.perf_counter()
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        seconds = time.perf_counter() - start
+
+        results = [result for worker in workers for result in worker.results]
+        edits = [edit for worker in workers for edit in worker.edits]
+        violations = check_invariants(edits, manifest_days)
+
+    latencies = sorted(result[2] for result in results)
+    by_operation = {}
+    for name, status, _ in results:
+        counts = by_operation.setdefault(name, {})
+        counts[str(status)] = counts.get(str(status), 0) + 1
+    return {
+        'seed': seed,
+        'threads': threads,
+        'operations': len(results),
+        'seconds': seconds,
+        'throughput': len(results) / seconds if seconds else 0.0,
+        'p50_ms': latencies[len(latencies) // 2] * 1000 if latencies else 0.0,
+        'p95_ms': latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0,
+        'by_operation': by_operation,
+        'errors': [error for worker in workers for error in worker.errors],
+        'violations': violations,
+        'database': path,
+    }
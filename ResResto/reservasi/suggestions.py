@@ -0,0 +1,130 @@
+import datetime
+import heapq
+from array import array
+
+from django.utils import timezone
+
+from .models import Reservation
+from . import catalog
+from .occupancy import build_slot_grid, load_range_occupancy, slot_span
+from .schedule import effective_hours
+
+# Bobot jarak (dalam "menit setara") untuk mengurutkan alternatif.
+# Pindah satu hari dianggap sejauh bergeser 3 jam, pindah ruangan sejauh 1 jam.
+DAY_DISTANCE_MINUTES = 180
+ROOM_DISTANCE_MINUTES = 60
+
+
+# ===================================================================
+# MESIN SARAN: alternatif terdekat ketika slot yang diminta penuh
+# ===================================================================
+def _free_vector(capacity, occupancy, n_slots):
+    """Sisa kapasitas per slot sebagai array integer."""
+    free = array('i', [capacity]) * n_slots
+    if occupancy:
+        for i, guests in enumerate(occupancy):
+            free[i] = capacity - guests
+    return free
+
+
+def _feasible_starts(free, num_guests, span_length):
+    """
+    Indeks slot awal yang sisa kapasitasnya cukup selama `span_length` slot.
+    Memakai prefix sum dari slot yang "tidak cukup", jadi O(slot) per ruangan/hari.
+    """
+    n_slots = len(free)
+    blocked = array('i', [0]) * (n_slots + 1)
+    for i in range(n_slots):
+        blocked[i + 1] = blocked[i] + (1 if free[i] < num_guests else 0)
+    for i in range(n_slots):
+        end = min(n_slots, i + span_length)
+        if blocked[end] - blocked[i] == 0:
+            yield i
+
+
+def suggest_alternatives(profile, room, date, time_obj, num_guests, food_package=None, limit=5, day_window=3):
+    """
+    Mengembalikan hingga `limit` alternatif terdekat untuk permintaan
+    (room, date, time_obj, num_guests) yang ditolak karena penuh: jam lain di
+    hari yang sama, ruangan lain, dan jam yang sama di hari-hari sekitarnya.
+
+    Semua okupansi dalam jendela pencarian dimuat dengan satu query, lalu tiap
+    (tanggal, ruangan) diperiksa lewat vektor sisa kapasitas. Hari/ruangan
+    yang tutup dan jam khusus diambil dari kalender pengecualian jadwal.
+    """
+    if num_guests <= 0:
+        return []
+
+    today = timezone.localdate()
+    now = timezone.localtime()
+    first_date = max(today, date - datetime.timedelta(days=day_window))
+    last_date = date + datetime.timedelta(days=day_window)
+    if last_date < first_date:
+        return []
+
+    rooms = [r for r in catalog.get_rooms(profile.id) if r.capacity >= num_guests]
+    if not rooms:
+        return []
+
+    # Jam buka bisa berbeda per hari: grid dasar mencakup jam paling awal
+    # sampai paling akhir di jendela ini, lalu slot tiap hari disaring.
+    days = [first_date + datetime.timedelta(days=n) for n in range((last_date - first_date).days + 1)]
+    open_hours = [hours for hours in (effective_hours(profile, day) for day in days) if not hours.is_closed]
+    if not open_hours:
+        return []
+    opening = min(hours.opening_time for hours in open_hours)
+    interval = profile.slot_interval_minutes
+    grid = build_slot_grid(opening, max(hours.closing_time for hours in open_hours), interval)
+    if not grid:
+        return []
+    occupancy = load_range_occupancy(profile.id, first_date, last_date, opening, interval, len(grid))
+    requested_minutes = time_obj.hour * 60 + time_obj.minute
+    room_id = room.id if room else None
+
+    candidates = []
+    for current in days:
+        day_distance = abs((current - date).days) * DAY_DISTANCE_MINUTES
+        for candidate_room in rooms:
+            hours = effective_hours(profile, current, candidate_room.id)
+            if hours.is_closed:
+                continue
+            duration = Reservation.resolve_duration(candidate_room, food_package)
+            i0, i1 = slot_span(opening, interval, len(grid), grid[0], duration)
+            free = _free_vector(candidate_room.capacity, occupancy.get((current, candidate_room.id)), len(grid))
+            room_distance = 0 if candidate_room.id == room_id else ROOM_DISTANCE_MINUTES
+            for i in _feasible_starts(free, num_guests, i1 - i0):
+                slot = grid[i]
+                if not (hours.opening_time <= slot < hours.closing_time):
+                    continue
+                if current == today and slot <= now.time():
+                    continue
+                slot_minutes = slot.hour * 60 + slot.minute
+                if current == date and slot == time_obj and room_distance == 0:
+                    continue
+                distance = day_distance + room_distance + abs(slot_minutes - requested_minutes)
+                candidates.append((distance, current, slot_minutes, candidate_room, slot, free[i]))
+
+    best = heapq.nsmallest(limit, candidates, key=lambda c: (c[0], c[1], c[2], c[3].name))
+    return [
+        {
+            'date': candidate_date,
+            'time': slot,
+            'room': candidate_room,
+            'remaining_capacity': remaining,
+            'distance': distance,
+        }
+        for distance, candidate_date, _, candidate_room, slot, remaining in best
+    ]
+
+
+def serialize_suggestion(suggestion):
+    """Bentuk JSON dari satu saran, selaras dengan format ajax_get_time_slots."""
+    return {
+        'date': suggestion['date'].strftime('%Y-%m-%d'),
+        'date_display': suggestion['date'].strftime('%d %B %Y'),
+        'time_value': suggestion['time'].strftime('%H:%M:%S'),
+        'time_display': suggestion['time'].strftime('%H:%M %p'),
+        'room_id': suggestion['room'].id,
+        'room_name': suggestion['room'].name,
+        'remaining_capacity': suggestion['remaining_capacity'],
+    }
@@ -1,3 +1,1068 @@
-from django.test import TestCase # type: ignore
+import asyncio
+import datetime
+import faulthandler
+import io
+import json
+import os
+import tempfile
+import threading
 
-# Create your tests here.
+from django.contrib.admin.sites import AdminSite # type: ignore
+from django.contrib.auth.models import User # type: ignore
+from django.core import mail # type: ignore
+from django.core.cache import cache # type: ignore
+from django.http import HttpResponse # type: ignore
+from django.core.management import call_command # type: ignore
+from django.db import connection, transaction # type: ignore
+from django.test.utils import CaptureQueriesContext # type: ignore
+from django.test import AsyncRequestFactory, RequestFactory, TestCase, override_settings # type: ignore
+from django.utils import timezone # type: ignore
+from unittest import mock
+
+from .admin import ReservationAdmin
+from .middleware import IMMUTABLE_CACHE_CONTROL, PrecompressedStaticMiddleware, RateLimitMiddleware
+from .forms import ReservationForm
+from .models import FoodPackage, GuestProfile, OutboxMessage, ProfiledRequest, Reservation, ReservationConflict, RestaurantProfile, Room, ScheduleException
+from .schedule import effective_hours
+from .search import FTS_TABLE, ranked_reservation_ids, search_reservations
+from .services import bulk_set_status
+from .suggestions import suggest_alternatives
+from .views import get_available_time_slots, slot_events_view
+from . import catalog, guests, kitchen, load, notifications, stress, warmup
+
+
+class OutboxNotificationTests(TestCase):
+    """Outbox notifikasi: ditulis bersama perubahan status, dikirim oleh process_outbox."""
+
+    def setUp(self):
+        cache.clear()
+        self.restaurant = RestaurantProfile.objects.create()
+        self.room = Room.objects.create(restaurant=self.restaurant, name="VIP", capacity=10)
+        self.date = timezone.localdate() + datetime.timedelta(days=3)
+
+    def make_reservation(self, **kwargs):
+        data = {
+            'guest_name': "Budi",
+            'guest_email': "budi@example.com",
+            'guest_phone': "08123456789",
+            'reservation_date': self.date,
+            'reservation_time': datetime.time(19, 0),
+            'number_of_guests': 2,
+            'room_type': self.room,
+        }
+        data.update(kwargs)
+        return Reservation.objects.create(**data)
+
+    def test_booking_enqueues_and_worker_sends(self):
+        response = self.client.post('/buat-reservasi/', {
+            'room_type': self.room.id,
+            'reservation_date': self.date.strftime('%Y-%m-%d'),
+            'reservation_time': '19:00:00',
+            'number_of_guests': 2,
+            'guest_name': "Budi",
+            'guest_email': "budi@example.com",
+            'guest_phone': "08123456789",
+        })
+        self.assertEqual(response.status_code, 302)
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.kind, message.status), ('RECEIVED', 'PENDING'))
+        # Tidak ada email yang dikirim di dalam request booking
+        self.assertEqual(len(mail.outbox), 0)
+
+        call_command('process_outbox', stdout=mock.MagicMock())
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["budi@example.com"])
+        message.refresh_from_db()
+        self.assertEqual(message.status, 'SENT')
+        self.assertIsNotNone(message.sent_at)
+
+    def test_admin_bulk_confirm_enqueues_once(self):
+        first = self.make_reservation()
+        second = self.make_reservation(guest_email="ani@example.com")
+        admin = ReservationAdmin(Reservation, AdminSite())
+        request = RequestFactory().post('/admin/')
+        admin.confirm_reservations(request, Reservation.objects.filter(pk__in=[first.pk, second.pk]))
+        admin.confirm_reservations(request, Reservation.objects.filter(pk__in=[first.pk, second.pk]))
+
+        self.assertEqual(OutboxMessage.objects.filter(kind='CONFIRMED').count(), 2)
+        self.assertEqual(set(Reservation.objects.values_list('status', flat=True)), {'CONFIRMED'})
+
+        notifications.dispatch_batch(batch_size=10, workers=2)
+        self.assertEqual(sorted(m.to[0] for m in mail.outbox), ["ani@example.com", "budi@example.com"])
+
+    def test_reminders_are_queued_once_inside_window(self):
+        now = timezone.localtime()
+        soon = now + datetime.timedelta(hours=3)
+        later = now + datetime.timedelta(days=5)
+        due = self.make_reservation(status='CONFIRMED', reservation_date=soon.date(), reservation_time=soon.time().replace(microsecond=0))
+        self.make_reservation(status='CONFIRMED', reservation_date=later.date())
+        self.make_reservation(status='PENDING', reservation_date=soon.date(), reservation_time=soon.time().replace(microsecond=0))
+
+        self.assertEqual(notifications.queue_due_reminders(), 1)
+        self.assertEqual(notifications.queue_due_reminders(), 0)
+        self.assertEqual(list(OutboxMessage.objects.values_list('reservation_id', 'kind')), [(due.pk, 'REMINDER')])
+
+    def test_failed_send_is_retried_later(self):
+        reservation = self.make_reservation()
+        notifications.enqueue(reservation, 'RECEIVED')
+        with mock.patch('reservasi.notifications.send_mail', side_effect=OSError("SMTP down")):
+            self.assertEqual(notifications.dispatch_batch(), (0, 1))
+
+        message = OutboxMessage.objects.get()
+        self.assertEqual((message.status, message.attempts), ('PENDING', 1))
+        self.assertGreater(message.available_at, timezone.now())
+        self.assertIn("SMTP down", message.last_error)
+        # Belum jatuh tempo, jadi batch berikutnya tidak mengambilnya
+        self.assertEqual(notifications.dispatch_batch(), (0, 0))
+
+
+@override_settings(ALLOWED_HOSTS=['*'])
+class BranchTests(TestCase):
+    """Beberapa cabang dalam satu proses: data, cache dan URL terpisah per cabang."""
+
+    def setUp(self):
+        cache.clear()
+        self.jakarta = RestaurantProfile.objects.create(name="Resto Jakarta", slug='jakarta', max_guests_per_slot=20)
+        self.bandung = RestaurantProfile.objects.create(name="Resto Bandung", slug='bandung', host='bandung.resresto.test', max_guests_per_slot=8)
+        # Nama ruangan sama di dua cabang
+        self.jakarta_room = Room.objects.create(restaurant=self.jakarta, name="VIP", capacity=10)
+        self.bandung_room = Room.objects.create(restaurant=self.bandung, name="VIP", capacity=6)
+        self.date = timezone.localdate() + datetime.timedelta(days=3)
+
+    def booking_data(self, room, **kwargs):
+        data = {
+            'room_type': room.id,
+            'reservation_date': self.date.strftime('%Y-%m-%d'),
+            'reservation_time': '19:00:00',
+            'number_of_guests': 4,
+            'guest_name': "Budi",
+            'guest_email': "budi@example.com",
+            'guest_phone': "08123456789",
+        }
+        data.update(kwargs)
+        return data
+
+    def test_url_prefix_scopes_booking_and_links(self):
+        response = self.client.post('/bandung/buat-reservasi/', self.booking_data(self.bandung_room))
+        reservation = Reservation.objects.get()
+        self.assertEqual(reservation.restaurant, self.bandung)
+        # reverse() di dalam cabang menghasilkan link dengan prefix cabang
+        self.assertRedirects(response, f'/bandung/reservasi-sukses/{reservation.id}/')
+        self.assertEqual(self.client.get(f'/jakarta/reservasi-sukses/{reservation.id}/').status_code, 404)
+
+        # Ruangan cabang lain tidak termasuk pilihan
+        response = self.client.post('/bandung/buat-reservasi/', self.booking_data(self.jakarta_room))
+        self.assertIn('room_type', response.context['form'].errors)
+
+    def test_host_resolves_branch_and_slots_are_per_branch(self):
+        Reservation.objects.create(
+            restaurant=self.bandung, room_type=self.bandung_room, guest_name="Ani", guest_email="ani@example.com",
+            guest_phone="0812", reservation_date=self.date, reservation_time=datetime.time(19, 0), number_of_guests=5,
+        )
+        url = f'/ajax/get-time-slots/?date={self.date:%Y-%m-%d}'
+        bandung = {s['time_value']: s['remaining_capacity'] for s in self.client.get(url, HTTP_HOST='bandung.resresto.test').json()['time_slots']}
+        jakarta = {s['time_value']: s['remaining_capacity'] for s in self.client.get(url).json()['time_slots']}
+        self.assertEqual(bandung['19:00:00'], 3)
+        self.assertEqual(jakarta['19:00:00'], 20)
+
+    def test_staff_search_only_returns_current_branch(self):
+        for restaurant, room in ((self.jakarta, self.jakarta_room), (self.bandung, self.bandung_room)):
+            Reservation.objects.create(
+                restaurant=restaurant, room_type=room, guest_name="Budi Santoso", guest_email="budi@example.com",
+                guest_phone="0812", reservation_date=self.date, reservation_time=datetime.time(12, 0), number_of_guests=2,
+            )
+        bandung_ids = list(Reservation.objects.filter(restaurant=self.bandung).values_list('id', flat=True))
+        self.assertEqual(ranked_reservation_ids("budi", restaurant_id=self.bandung.id), bandung_ids)
+        self.assertEqual(len(ranked_reservation_ids("budi")), 2)
+
+
+class SearchTests(TestCase):
+    """Pencarian full-text FTS5: sinkronisasi trigger, telepon, awalan, input aneh."""
+
+    def setUp(self):
+        self.restaurant = RestaurantProfile.objects.create()
+        self.room = Room.objects.create(restaurant=self.restaurant, name="VIP", capacity=10)
+        self.budi = self.make("Budi Santoso", "budi@example.com", "0812-3456-7890", "Kue ulang tahun")
+
+    def make(self, name, email, phone, requests=""):
+        return Reservation.objects.create(
+            restaurant=self.restaurant, room_type=self.room, guest_name=name, guest_email=email, guest_phone=phone,
+            special_requests=requests, reservation_date=timezone.localdate() + datetime.timedelta(days=1),
+            reservation_time=datetime.time(19, 0), number_of_guests=2,
+        )
+
+    def search(self, text):
+        return sorted(search_reservations(Reservation.objects.all(), text).values_list('id', flat=True))
+
+    def test_triggers_keep_index_in_sync(self):
+        # Migrasi yang membangun ulang tabel (0007, 0011) harus memasang ulang trigger
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'trigger' AND tbl_name = 'reservasi_reservation'")
+            triggers = {row[0] for row in cursor.fetchall()}
+        self.assertTrue({f'{FTS_TABLE}_ai', f'{FTS_TABLE}_ad', f'{FTS_TABLE}_au'} <= triggers)
+
+        self.assertEqual(ranked_reservation_ids("santoso"), [self.budi.pk])
+        self.budi.guest_name = "Budi Hartono"
+        self.budi.save()
+        self.assertEqual(ranked_reservation_ids("santoso"), [])
+        self.assertEqual(ranked_reservation_ids("hartono"), [self.budi.pk])
+        Reservation.objects.filter(pk=self.budi.pk).update(special_requests="Kursi roda")
+        self.assertEqual(ranked_reservation_ids("kursi"), [self.budi.pk])
+        self.assertEqual(ranked_reservation_ids("ulang"), [])
+        self.budi.delete()
+        self.assertEqual(ranked_reservation_ids("hartono"), [])
+
+    def test_phone_matches_with_or_without_separators(self):
+        plain = self.make("Siti", "siti@example.com", "081122223333")
+        self.assertEqual(self.search("0812-3456 7890"), [self.budi.pk])
+        self.assertEqual(self.search("081234567890"), [self.budi.pk])
+        self.assertEqual(self.search("(0811) 2222.3333"), [plain.pk])
+
+    def test_prefix_matching(self):
+        other = self.make("Budiman", "man@example.com", "0899")
+        self.assertEqual(self.search("bud"), sorted([self.budi.pk, other.pk]))
+        self.assertEqual(self.search("budi san"), [self.budi.pk])
+        self.assertEqual(ranked_reservation_ids("exam"), ranked_reservation_ids("example"))
+
+    def test_fts_syntax_and_empty_tokens_do_not_raise(self):
+        for text in ('"', '*', '---', '()', 'AND', 'OR NOT', '"budi', 'NEAR(budi', 'budi*"'):
+            self.search(text)
+            ranked_reservation_ids(text)
+        for text in ('"', '*', '---', '()', 'AND', 'OR NOT'):
+            self.assertEqual(self.search(text), [], text)
+            self.assertEqual(ranked_reservation_ids(text), [], text)
+        # Tanda kutip/bintang tidak mengubah arti kata yang dicari
+        self.assertEqual(self.search('"budi'), [self.budi.pk])
+        self.assertEqual(self.search('budi*"'), [self.budi.pk])
+
+
+class CatalogInvalidationTests(TestCase):
+    """Simpan/hapus Room, FoodPackage dan RestaurantProfile menaikkan versi cache yang tepat."""
+
+    def setUp(self):
+        cache.clear()
+        catalog._local.clear()
+        self.restaurant = RestaurantProfile.objects.create(name="Resto Jakarta", slug='jakarta')
+        self.other = RestaurantProfile.objects.create(name="Resto Bandung", slug='bandung')
+        self.room = Room.objects.create(restaurant=self.restaurant, name="VIP", capacity=10)
+
+    def choices(self, field):
+        form = ReservationForm(restaurant=self.restaurant)
+        return [label for value, label in form.fields[field].choices if value != ""]
+
+    def booking_page(self):
+        return self.client.get('/buat-reservasi/').content.decode()
+
+    def test_room_and_package_changes_refresh_choices_and_fragments(self):
+        self.assertIn("VIP", self.booking_page())
+        self.assertEqual(len(self.choices('room_type')), 1)
+        other_version = catalog.get_catalog_version(self.other.id)
+
+        for change in (
+            lambda: Room.objects.filter(pk=self.room.pk).get().save(),
+            lambda: FoodPackage.objects.create(restaurant=self.restaurant, name="Paket Nusantara", price=100000),
+        ):
+            version = catalog.get_catalog_version(self.restaurant.id)
+            page_version = catalog.page_cache_version(self.restaurant.id)
+            change()
+            self.assertGreater(catalog.get_catalog_version(self.restaurant.id), version)
+            self.assertNotEqual(catalog.page_cache_version(self.restaurant.id), page_version)
+
+        self.room.name = "Ruang Kaca"
+        self.room.save()
+        page = self.booking_page()
+        self.assertIn("Ruang Kaca", page)
+        self.assertIn("Paket Nusantara", page)
+        self.assertIn("Paket Nusantara", " ".join(self.choices('food_package')))
+
+        FoodPackage.objects.get().delete()
+        self.room.delete()
+        page = self.booking_page()
+        self.assertNotIn("Ruang Kaca", page)
+        self.assertNotIn("Paket Nusantara", page)
+        self.assertEqual(self.choices('room_type'), [])
+        # Cabang lain tidak ikut kehilangan cache-nya
+        self.assertEqual(catalog.get_catalog_version(self.other.id), other_version)
+
+    def test_profile_changes_refresh_branches_and_fragments(self):
+        self.assertContains(self.client.get('/'), "Resto Jakarta")
+        version = catalog.get_profile_version()
+        self.restaurant.name = "Resto Menteng"
+        self.restaurant.save()
+        self.assertGreater(catalog.get_profile_version(), version)
+        self.assertEqual(catalog.get_profile(self.restaurant.id).name, "Resto Menteng")
+        self.assertContains(self.client.get('/'), "Resto Menteng")
+
+        version = catalog.get_profile_version()
+        self.other.delete()
+        self.assertGreater(catalog.get_profile_version(), version)
+        self.assertEqual([branch.slug for branch in catalog.get_branches()], ['jakarta'])
+
+
+class ScheduleExceptionTests(TestCase):
+    """Pengecualian jadwal dikompilasi menjadi kalender dan dipakai form serta slot."""
+
+    def setUp(self):
+        cache.clear()
+        catalog._local.clear()
+        self.restaurant = RestaurantProfile.objects.create(opening_time=datetime.time(10, 0), closing_time=datetime.time(22, 0))
+        self.room = Room.objects.create(restaurant=self.restaurant, name="VIP", capacity=10)
+        self.hall = Room.objects.create(restaurant=self.restaurant, name="Aula", capacity=30)
+        self.date = timezone.localdate() + datetime.timedelta(days=10)
+
+    def add(self, **kwargs):
+        data = {'restaurant': self.restaurant, 'name': "Pengecualian", 'start_date': self.date}
+        data.update(kwargs)
+        return ScheduleException.objects.create(**data)
+
+    def test_calendar_resolves_priorities_without_queries(self):
+        ramadan_end = self.date + datetime.timedelta(days=29)
+        self.add(name="Jam Ramadan", end_date=ramadan_end, opening_time=datetime.time(16, 0), closing_time=datetime.time(23, 0))
+        self.add(name="Idul Fitri", start_date=ramadan_end, is_closed=True)
+        self.add(name="Tutup Senin", start_date=self.date - datetime.timedelta(days=self.date.weekday()) - datetime.timedelta(days=7), recurrence='WEEKLY', is_closed=True)
+        self.add(name="Acara Privat", room=self.hall, start_date=self.date + datetime.timedelta(days=1), is_closed=True)
+        effective_hours(self.restaurant, self.date)  # kompilasi + isi cache
+
+        monday_in_ramadan = self.date + datetime.timedelta(days=7 - self.date.weekday())
+        monday_after = ramadan_end + datetime.timedelta(days=7 - ramadan_end.weekday())
+        with self.assertNumQueries(0):
+            ramadan = effective_hours(self.restaurant, self.date)
+            eid = effective_hours(self.restaurant, ramadan_end)
+            ramadan_monday = effective_hours(self.restaurant, monday_in_ramadan)
+            normal_monday = effective_hours(self.restaurant, monday_after)
+            hall = effective_hours(self.restaurant, self.date + datetime.timedelta(days=1), self.hall.id)
+            vip = effective_hours(self.restaurant, self.date + datetime.timedelta(days=1), self.room.id)
+
+        self.assertEqual((ramadan.opening_time, ramadan.closing_time, ramadan.is_closed), (datetime.time(16, 0), datetime.time(23, 0), False))
+        self.assertEqual((eid.is_closed, eid.reason), (True, "Idul Fitri"))
+        # Rentang tanggal mengalahkan pengulangan mingguan
+        self.assertEqual((ramadan_monday.is_closed, ramadan_monday.reason), (False, "Jam Ramadan"))
+        self.assertEqual((normal_monday.is_closed, normal_monday.reason), (True, "Tutup Senin"))
+        self.assertTrue(hall.is_closed)
+        self.assertFalse(vip.is_closed)
+
+    def test_yearly_rule_starts_at_its_first_occurrence(self):
+        self.add(name="Jam Lama", start_date=self.date.replace(year=self.date.year - 3), recurrence='YEARLY', opening_time=datetime.time(12, 0))
+        self.add(name="Ulang Tahun Resto", recurrence='YEARLY', is_closed=True)
+        year = lambda offset: self.date.replace(year=self.date.year + offset)
+        self.assertTrue(effective_hours(self.restaurant, self.date).is_closed)
+        self.assertTrue(effective_hours(self.restaurant, year(2)).is_closed)
+        # Tahun lalu: libur baru belum berlaku, aturan tahunan yang lebih lama tetap berlaku
+        last_year = effective_hours(self.restaurant, year(-1))
+        self.assertEqual((last_year.is_closed, last_year.reason), (False, "Jam Lama"))
+        self.assertEqual(effective_hours(self.restaurant, year(-4)).reason, '')
+
+    def test_slots_and_form_follow_exceptions(self):
+        self.add(name="Jam Ramadan", opening_time=datetime.time(17, 0))
+        slots = get_available_time_slots(self.date.strftime('%Y-%m-%d'), self.restaurant)
+        self.assertEqual(slots[0]['time_value'], '17:00:00')
+
+        data = {
+            'room_type': self.room.id, 'reservation_date': self.date.strftime('%Y-%m-%d'),
+            'reservation_time': '12:00:00', 'number_of_guests': 2,
+            'guest_name': "Budi", 'guest_email': "budi@example.com", 'guest_phone': "0812",
+        }
+        form = ReservationForm(data, restaurant=self.restaurant)
+        self.assertIn('reservation_time', form.errors)
+
+        self.add(name="Renovasi", room=self.room, start_date=self.date, is_closed=True)
+        form = ReservationForm(dict(data, reservation_time='18:00:00'), restaurant=self.restaurant)
+        self.assertIn("Renovasi", str(form.errors['reservation_date']))
+        form = ReservationForm(dict(data, reservation_time='18:00:00', room_type=self.hall.id), restaurant=self.restaurant)
+        self.assertTrue(form.is_valid(), form.errors)
+
+
+class AuditCapacityTests(TestCase):
+    """audit_capacity: laporan JSON slot kelebihan kapasitas dan perbaikan --fix."""
+
+    def setUp(self):
+        cache.clear()
+        self.restaurant = RestaurantProfile.objects.create()
+        self.room = Room.objects.create(restaurant=self.restaurant, name="VIP", capacity=10)
+        self.date = timezone.localdate() + datetime.timedelta(days=2)
+
+    def book(self, time, guests, **kwargs):
+        # Dibuat langsung (seperti edit manual staf), melewati validasi form
+        return Reservation.objects.create(
+            restaurant=self.restaurant, room_type=self.room, guest_name="Tamu", guest_email="tamu@example.com",
+            guest_phone="0812", reservation_date=self.date, reservation_time=time, number_of_guests=guests, **kwargs,
+        )
+
+    def run_audit(self, *args):
+        stdout = io.StringIO()
+        call_command('audit_capacity', *args, stdout=stdout, stderr=io.StringIO())
+        return json.loads(stdout.getvalue())
+
+    def test_reports_and_waitlists_newest_excess(self):
+        first = self.book(datetime.time(19, 0), 6)
+        second = self.book(datetime.time(19, 30), 4)
+        newest = self.book(datetime.time(20, 0), 3)
+        self.book(datetime.time(12, 0), 3)
+
+        report = self.run_audit()
+        self.assertEqual(report['summary']['scanned'], 4)
+        [finding] = report['findings']
+        self.assertEqual(finding['excess_reservation_ids'], [newest.id])
+        self.assertEqual(finding['slots'][0], {'time': '20:00', 'guests': 13})
+        self.assertEqual(Reservation.objects.filter(status='WAITLISTED').count(), 0)
+
+        report = self.run_audit('--fix', '--batch-size', '1')
+        self.assertEqual(report['summary']['waitlisted'], 1)
+        self.assertEqual(Reservation.objects.get(pk=newest.pk).status, 'WAITLISTED')
+        self.assertEqual(set(Reservation.objects.filter(pk__in=[first.pk, second.pk]).values_list('status', flat=True)), {'PENDING'})
+        self.assertTrue(OutboxMessage.objects.filter(reservation=newest, kind='WAITLISTED').exists())
+        self.assertEqual(self.run_audit()['findings'], [])
+
+
+class CapacityCheckTests(TestCase):
+    """Cek kapasitas lewat okupansi prefix sum pada seluruh durasi, dan durasi otomatis."""
+
+    def setUp(self):
+        cache.clear()
+        catalog._local.clear()
+        self.restaurant = RestaurantProfile.objects.create(opening_time=datetime.time(10, 0), closing_time=datetime.time(22, 0))
+        self.room = Room.objects.create(restaurant=self.restaurant, name="VIP", capacity=10, default_duration_minutes=60)
+        self.hall = Room.objects.create(restaurant=self.restaurant, name="Aula", capacity=30, default_duration_minutes=90)
+        self.date = timezone.localdate() + datetime.timedelta(days=2)
+        self.existing = Reservation.objects.create(
+            restaurant=self.restaurant, room_type=self.room, guest_name="Ani", guest_email="ani@example.com",
+            guest_phone="0812", reservation_date=self.date, reservation_time=datetime.time(19, 0), number_of_guests=6,
+        )
+
+    def form(self, time, guests):
+        return ReservationForm({
+            'room_type': self.room.id, 'reservation_date': self.date.strftime('%Y-%m-%d'),
+            'reservation_time': time, 'number_of_guests': guests,
+            'guest_name': "Budi", 'guest_email': "budi@example.com", 'guest_phone': "0813",
+        }, restaurant=self.restaurant)
+
+    def test_overlapping_booking_is_rejected(self):
+        # 19:00-20:00 sudah berisi 6 tamu
+        for time in ('18:30:00', '19:30:00'):
+            form = self.form(time, 5)
+            self.assertFalse(form.is_valid(), time)
+            self.assertTrue(form.is_waitlist_candidate)
+
+    def test_back_to_back_bookings_do_not_overlap(self):
+        self.assertTrue(self.form('18:00:00', 10).is_valid())  # selesai tepat 19:00
+        self.assertTrue(self.form('20:00:00', 10).is_valid())  # mulai tepat saat yang lain selesai
+
+    def test_party_that_exactly_fills_the_room_is_accepted(self):
+        self.assertTrue(self.form('19:30:00', 4).is_valid())
+        self.assertFalse(self.form('19:30:00', 5).is_valid())
+
+    def test_duration_follows_room_change_unless_set_by_staff(self):
+        self.assertEqual(self.existing.duration_minutes, 60)
+        reservation = Reservation.objects.get(pk=self.existing.pk)
+        reservation.room_type = self.hall
+        reservation.save()
+        self.assertEqual(Reservation.objects.get(pk=reservation.pk).duration_minutes, 90)
+
+        # Durasi khusus dari staf tetap dipertahankan saat ruangan diganti lagi
+        Reservation.objects.filter(pk=reservation.pk).update(duration_minutes=150)
+        reservation = Reservation.objects.get(pk=reservation.pk)
+        reservation.room_type = self.room
+        reservation.save()
+        self.assertEqual(Reservation.objects.get(pk=reservation.pk).duration_minutes, 150)
+
+        # Ruangan dan durasi diubah bersamaan: durasi baru yang dipakai
+        reservation.room_type = self.hall
+        reservation.duration_minutes = 45
+        reservation.save()
+        self.assertEqual(Reservation.objects.get(pk=reservation.pk).duration_minutes, 45)
+
+
+class ChangeFeedTests(TestCase):
+    """Log perubahan append-only dan API cursor ?since=<seq>."""
+
+    def setUp(self):
+        cache.clear()
+        self.restaurant = RestaurantProfile.objects.create()
+        self.room = Room.objects.create(restaurant=self.restaurant, name="VIP", capacity=10)
+        self.staff = User.objects.create_user('staf', password='rahasia', is_staff=True)
+
+    def test_every_change_is_logged_and_paged_by_cursor(self):
+        reservation = Reservation.objects.create(
+            restaurant=self.restaurant, room_type=self.room, guest_name="Budi", guest_email="budi@example.com",
+            guest_phone="0812", reservation_date=timezone.localdate() + datetime.timedelta(days=1),
+            reservation_time=datetime.time(19, 0), number_of_guests=2,
+        )
+        reservation.number_of_guests = 4
+        reservation.save()
+        reservation.save()  # tanpa perubahan: tidak dicatat
+        bulk_set_status(Reservation.objects.filter(pk=reservation.pk), 'CONFIRMED')
+        Reservation.objects.get(pk=reservation.pk).delete()
+
+        self.client.force_login(self.staff)
+        url = '/api/reservasi/perubahan/'
+        first = self.client.get(url, {'since': 0, 'limit': 2}).json()
+        self.assertTrue(first['has_more'])
+        second = self.client.get(url, {'since': first['next_since'], 'limit': 2}).json()
+        self.assertFalse(second['has_more'])
+
+        events = first['changes'] + second['changes']
+        self.assertEqual([e['kind'] for e in events], ['CREATED', 'UPDATED', 'STATUS_CHANGED', 'DELETED'])
+        self.assertEqual(events[1]['changed_fields'], ['number_of_guests'])
+        self.assertEqual(events[2]['data']['status'], 'CONFIRMED')
+        self.assertEqual(self.client.get(url, {'since': second['next_since']}).json()['changes'], [])
+
+
+class StressInvariantTests(TestCase):
+    """Pemeriksa invarian yang dipakai perintah stress_test."""
+
+    def test_detects_overbooking_and_stale_overwrite(self):
+        restaurant = RestaurantProfile.objects.create()
+        room = Room.objects.create(restaurant=restaurant, name="VIP", capacity=4)
+        date = timezone.localdate() + datetime.timedelta(days=1)
+        make = lambda guests: Reservation.objects.create(
+            restaurant=restaurant, room_type=room, guest_name="Tamu", guest_email="tamu@example.com",
+            guest_phone="0812", reservation_date=date, reservation_time=datetime.time(19, 0), number_of_guests=guests,
+        )
+        first = make(3)
+        self.assertEqual(stress.check_invariants(), [])
+
+        # Form lama menyimpan ulang status PENDING setelah reservasi dibatalkan,
+        # melewati pemeriksaan versi (perilaku sebelum kolom version)
+        stale = Reservation.objects.get(pk=first.pk)
+        bulk_set_status(Reservation.objects.filter(pk=first.pk), 'CANCELLED')
+        stale.special_requests = "Kursi bayi"
+        stale.version = Reservation.objects.get(pk=first.pk).version
+        stale.save()
+        make(3)
+
+        self.assertEqual(
+            sorted(violation['invariant'] for violation in stress.check_invariants()),
+            ['kapasitas', 'lost-update'],
+        )
+
+
+class ForecastTests(TestCase):
+    """Prakiraan okupansi per hari dalam minggu x slot x ruangan (NumPy)."""
+
+    def test_fill_rate_and_waitlist_from_history(self):
+        from . import forecast
+
+        cache.clear()
+        catalog._local.clear()
+        restaurant = RestaurantProfile.objects.create()
+        room = Room.objects.create(restaurant=restaurant, name="VIP", capacity=4)
+        today = timezone.localdate()
+        for weeks_ago in range(1, 5):
+            for guests, status in ((4, 'CONFIRMED'), (2, 'CANCELLED')):
+                Reservation.objects.create(
+                    restaurant=restaurant, room_type=room, guest_name="Tamu", guest_email="tamu@example.com",
+                    guest_phone="0812", reservation_date=today - datetime.timedelta(weeks=weeks_ago),
+                    reservation_time=datetime.time(19, 0), duration_minutes=60, number_of_guests=guests, status=status,
+                )
+
+        result = forecast.forecast_branch(restaurant, today=today)
+        slot = [s.strftime('%H:%M') for s in result.grid].index('19:00')
+        weekday = today.weekday()
+        # Setiap minggu slot ini penuh dan sepertiga tamu membatalkan
+        self.assertEqual(result.fill_rate[weekday, slot:slot + 2, 0].tolist(), [1.0, 1.0])
+        self.assertEqual(result.waitlist[weekday, slot, 0], 2)
+        self.assertEqual(result.fill_rate[weekday, slot + 2, 0], 0.0)
+        self.assertEqual(result.fill_rate[(weekday + 1) % 7].sum(), 0.0)
+
+
+class MyReservationsApiTests(TestCase):
+    """API JSON reservasi milik user: projection values() + ETag/304."""
+
+    def test_etag_answers_304_until_history_changes(self):
+        cache.clear()
+        restaurant = RestaurantProfile.objects.create()
+        room = Room.objects.create(restaurant=restaurant, name="VIP", capacity=10)
+        user = User.objects.create_user('budi', password='rahasia')
+        reservation = Reservation.objects.create(
+            restaurant=restaurant, room_type=room, user=user, guest_name="Budi", guest_email="budi@example.com",
+            guest_phone="0812", reservation_date=timezone.localdate() + datetime.timedelta(days=1),
+            reservation_time=datetime.time(19, 0), number_of_guests=2,
+        )
+        url = '/api/reservasi/saya/'
+        self.assertEqual(self.client.get(url).status_code, 401)
+
+        self.client.force_login(user)
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['reservations'][0]['room_name'], "VIP")
+        etag = response['ETag']
+
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        bulk_set_status(Reservation.objects.filter(pk=reservation.pk), 'CONFIRMED')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['reservations'][0]['status'], 'CONFIRMED')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_changes_with_catalog_and_branch(self):
+        cache.clear()
+        catalog._local.clear()
+        restaurant = RestaurantProfile.objects.create(slug='jakarta')
+        RestaurantProfile.objects.create(slug='bandung')
+        room = Room.objects.create(restaurant=restaurant, name="VIP", capacity=10)
+        user = User.objects.create_user('budi', password='rahasia')
+        Reservation.objects.create(
+            restaurant=restaurant, room_type=room, user=user, guest_name="Budi", guest_email="budi@example.com",
+            guest_phone="0812", reservation_date=timezone.localdate() + datetime.timedelta(days=1),
+            reservation_time=datetime.time(19, 0), number_of_guests=2,
+        )
+        self.client.force_login(user)
+        url = '/api/reservasi/saya/'
+        etag = self.client.get(url)['ETag']
+
+        # Cabang lain tanpa reservasi tidak boleh berbagi ETag
+        self.assertEqual(self.client.get('/bandung' + url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        # Ruangan diganti nama: reservasi tidak berubah, tetapi isi respons berubah
+        room.name = "Ruang VIP"
+        room.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['reservations'][0]['room_name'], "Ruang VIP")
+
+
+class GuestProfileTests(TestCase):
+    """Profil tamu: kunci email/telepon ternormalisasi, backfill, statistik kunjungan."""
+
+    def setUp(self):
+        self.restaurant = RestaurantProfile.objects.create()
+        self.room = Room.objects.create(restaurant=self.restaurant, name="VIP", capacity=10)
+
+    def make(self, email, phone, days_ago=7):
+        return Reservation.objects.create(
+            restaurant=self.restaurant, room_type=self.room, guest_name="Siti", guest_email=email, guest_phone=phone,
+            reservation_date=timezone.localdate() - datetime.timedelta(days=days_ago),
+            reservation_time=datetime.time(19, 0), number_of_guests=2,
+        )
+
+    def test_normalized_keys_link_repeat_guest(self):
+        self.assertEqual(guests.normalize_phone('0812-3456-7890'), '+6281234567890')
+        self.assertEqual(guests.normalize_phone('+62 812 3456 7890'), '+6281234567890')
+        self.assertEqual(guests.normalize_phone('0062 81234567890'), '+6281234567890')
+        self.assertIsNone(guests.normalize_phone('12'))
+
+        first = self.make('Siti@Example.com ', '0812-3456-7890')
+        second = self.make('siti@example.com', '+6281234567890', days_ago=14)
+        third = self.make('lain@example.com', '081234567890', days_ago=21)  # email baru, telepon sama
+        self.assertEqual(GuestProfile.objects.count(), 1)
+        self.assertEqual({first.guest_id, second.guest_id, third.guest_id}, {first.guest_id})
+
+        bulk_set_status(Reservation.objects.filter(pk__in=[first.pk, second.pk]), 'COMPLETED')
+        bulk_set_status(Reservation.objects.filter(pk=third.pk), 'NO_SHOW')
+        guest = guests.find_guest('SITI@example.com')
+        self.assertEqual((guest.visit_count, guest.no_show_count), (2, 1))
+        self.assertAlmostEqual(guest.no_show_rate, 1 / 3)
+        self.assertEqual(guest.last_visit_date, first.reservation_date)
+
+    def test_backfill_links_existing_reservations_in_batches(self):
+        for i, (email, phone) in enumerate([('a@example.com', '0811111111'), ('A@example.com', ''), ('b@example.com', '0822222222')]):
+            self.make(email, phone, days_ago=i + 1)
+        Reservation.objects.update(guest=None)
+        GuestProfile.objects.all().delete()
+
+        call_command('backfill_guests', batch_size=2, stdout=io.StringIO())
+        self.assertFalse(Reservation.objects.filter(guest__isnull=True).exists())
+        self.assertEqual(
+            sorted(GuestProfile.objects.values_list('email_key', 'reservation_count')),
+            [('a@example.com', 2), ('b@example.com', 1)],
+        )
+
+    def test_visit_count_on_success_page_only_for_owner_or_staff(self):
+        cache.clear()
+        catalog._local.clear()
+        owner = User.objects.create_user('siti', password='rahasia')
+        bulk_set_status(Reservation.objects.filter(pk=self.make('siti@example.com', '0812').pk), 'COMPLETED')
+        reservation = self.make('siti@example.com', '0812', days_ago=-3)
+        Reservation.objects.filter(pk=reservation.pk).update(user=owner)
+        url = f'/reservasi-sukses/{reservation.pk}/'
+        welcome = 'kunjungan ke-2'
+
+        self.assertNotContains(self.client.get(url), welcome)
+        self.client.force_login(User.objects.create_user('orang_lain', password='rahasia'))
+        self.assertNotContains(self.client.get(url), welcome)
+        self.client.force_login(owner)
+        self.assertContains(self.client.get(url), welcome)
+        self.client.force_login(User.objects.create_user('staf', password='rahasia', is_staff=True))
+        self.assertContains(self.client.get(url), welcome)
+
+
+class OptimisticConcurrencyTests(TestCase):
+    """Kolom version: simpan dengan versi basi ditolak, bukan menimpa diam-diam."""
+
+    def setUp(self):
+        self.restaurant = RestaurantProfile.objects.create()
+        self.room = Room.objects.create(restaurant=self.restaurant, name="VIP", capacity=10)
+        self.reservation = Reservation.objects.create(
+            restaurant=self.restaurant, room_type=self.room, guest_name="Budi", guest_email="budi@example.com",
+            guest_phone="0812", reservation_date=timezone.localdate() + datetime.timedelta(days=3),
+            reservation_time=datetime.time(19, 0), number_of_guests=2,
+        )
+
+    def test_stale_save_raises_conflict(self):
+        first = Reservation.objects.get(pk=self.reservation.pk)
+        stale = Reservation.objects.get(pk=self.reservation.pk)
+        first.status = 'CONFIRMED'
+        first.save()
+        self.assertEqual(first.version, 2)
+
+        stale.status = 'CANCELLED'
+        with self.assertRaises(ReservationConflict), transaction.atomic():
+            stale.save()
+        self.assertEqual(stale.version, 1)
+        self.assertEqual(Reservation.objects.get(pk=self.reservation.pk).status, 'CONFIRMED')
+
+    def test_bulk_set_status_reports_conflicts(self):
+        queryset = Reservation.objects.filter(pk=self.reservation.pk)
+        conflicts = []
+        with mock.patch.object(type(queryset), 'update', return_value=0):
+            self.assertEqual(bulk_set_status(queryset, 'CONFIRMED', conflicts=conflicts), 0)
+        self.assertEqual(conflicts, [self.reservation.pk])
+
+        self.assertEqual(bulk_set_status(queryset, 'CONFIRMED'), 1)
+        self.assertEqual(Reservation.objects.get(pk=self.reservation.pk).version, 2)
+
+    def test_admin_rejects_stale_form(self):
+        staff = User.objects.create_superuser('staf', 'staf@example.com', 'rahasia')
+        self.client.force_login(staff)
+        url = f'/admin/reservasi/reservation/{self.reservation.pk}/change/'
+        self.assertContains(self.client.get(url), 'name="expected_version" value="1"')
+        data = {
+            'restaurant': self.restaurant.pk, 'guest_name': "Budi", 'guest_email': "budi@example.com", 'guest_phone': "0812",
+            'reservation_date': self.reservation.reservation_date.isoformat(), 'reservation_time': '19:00',
+            'room_type': self.room.pk, 'number_of_guests': 2, 'duration_minutes': 120,
+            'status': 'CANCELLED', 'expected_version': 1,
+        }
+
+        bulk_set_status(Reservation.objects.filter(pk=self.reservation.pk), 'CONFIRMED')
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['adminform'].form.errors.as_data()['__all__'][0].code, 'conflict')
+        self.assertEqual(Reservation.objects.get(pk=self.reservation.pk).status, 'CONFIRMED')
+
+
+class KitchenManifestTests(TestCase):
+    """Manifest dapur di cache diperbarui per perubahan reservasi, tanpa query ulang."""
+
+    def setUp(self):
+        cache.clear()
+        self.restaurant = RestaurantProfile.objects.create()
+        self.room = Room.objects.create(restaurant=self.restaurant, name="VIP", capacity=20)
+        self.package = FoodPackage.objects.create(restaurant=self.restaurant, name="Paket Ayam", description="Nasi, ayam", price=50000)
+        self.date = timezone.localdate() + datetime.timedelta(days=1)
+
+    def make(self, guests, package=None, hour=19):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Reservation.objects.create(
+                restaurant=self.restaurant, room_type=self.room, food_package=package, guest_name="Tamu",
+                guest_email="tamu@example.com", guest_phone="0812", reservation_date=self.date,
+                reservation_time=datetime.time(hour, 0), number_of_guests=guests,
+            )
+
+    def test_incremental_updates_match_rebuild(self):
+        first = self.make(2, self.package)
+        self.make(4)
+        self.assertEqual(kitchen.get_counts(self.restaurant.id, self.date), {('19:00', self.room.id, self.package.id, 2): 1, ('19:00', self.room.id, None, 4): 1})
+
+        second = self.make(2, self.package)
+        third = self.make(3, self.package, hour=12)
+        with self.captureOnCommitCallbacks(execute=True):
+            first.number_of_guests = 5
+            first.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            bulk_set_status(Reservation.objects.filter(pk=second.pk), 'CANCELLED')
+        with self.captureOnCommitCallbacks(execute=True):
+            third.delete()
+
+        with self.assertNumQueries(0):
+            cached = kitchen.get_counts(self.restaurant.id, self.date)
+        self.assertEqual(cached, kitchen.build_counts(self.restaurant.id, self.date))
+
+    def test_manifest_page_and_api(self):
+        self.make(2, self.package)
+        self.make(4, self.package)
+        self.make(3)
+        self.client.force_login(User.objects.create_user('koki', password='rahasia', is_staff=True))
+
+        data = self.client.get('/api/dapur/manifest/', {'date': self.date.isoformat()}).json()
+        self.assertEqual((data['reservations'], data['guests']), (3, 9))
+        self.assertEqual(data['packages'][0], {
+            'id': self.package.id, 'name': "Paket Ayam", 'reservations': 2, 'guests': 6,
+            'party_sizes': [{'guests': 2, 'count': 1}, {'guests': 4, 'count': 1}],
+        })
+        self.assertEqual(data['packages'][1]['name'], "Tanpa paket")
+        self.assertEqual(self.client.get('/api/dapur/manifest/', {'date': 'besok'}).status_code, 400)
+        self.assertContains(self.client.get('/staf/dapur/', {'date': self.date.isoformat()}), "Paket Ayam")
+
+
+class ProfilerMiddlewareTests(TestCase):
+    """Profiler request: mati secara bawaan, menyala per request (staf) atau lewat sampling."""
+
+    def setUp(self):
+        cache.clear()
+        RestaurantProfile.objects.create()
+
+    def test_off_by_default_and_on_demand_for_staff_only(self):
+        self.client.get('/', {'_profile': '1'})
+        self.assertFalse(ProfiledRequest.objects.exists())
+
+        self.client.force_login(User.objects.create_superuser('staf', 'staf@example.com', 'rahasia'))
+        response = self.client.get('/', {'_profile': '1'})
+        record = ProfiledRequest.objects.get()
+        self.assertEqual(response['X-Profile-Id'], str(record.pk))
+        self.assertEqual((record.sampled_by, record.view_name, record.status_code), ('MANUAL', 'reservasi:home', 200))
+        self.assertTrue(any('views.py' in row['function'] for row in record.functions))
+        self.assertEqual(record.query_count, sum(row['count'] for row in record.queries))
+
+        response = self.client.get(f'/admin/reservasi/profiledrequest/{record.pk}/change/')
+        self.assertContains(response, 'Query Terlama')
+
+    @override_settings(RESERVASI_PROFILER={'SAMPLE_RATE': 1.0, 'MAX_RECORDS': 2})
+    def test_sampling_rate_with_bounded_retention(self):
+        for _ in range(4):
+            self.client.get('/')
+        self.assertEqual(ProfiledRequest.objects.count(), 2)
+        self.assertEqual(set(ProfiledRequest.objects.values_list('sampled_by', flat=True)), {'RATE'})
+
+
+class SlotEventsTests(TestCase):
+    """SSE hanya dilayani di ASGI; di WSGI endpoint harus langsung selesai."""
+
+    def setUp(self):
+        cache.clear()
+        self.restaurant = RestaurantProfile.objects.create()
+
+    def test_wsgi_returns_promptly_without_stream(self):
+        date = (timezone.localdate() + datetime.timedelta(days=1)).isoformat()
+        # Jika view kembali memblok, proses test dihentikan dengan traceback alih-alih menggantung
+        faulthandler.dump_traceback_later(10, exit=True)
+        try:
+            response = self.client.get('/ajax/slot-events/', {'date': date})
+        finally:
+            faulthandler.cancel_dump_traceback_later()
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(response.streaming)
+        self.assertIs(self.client.get('/buat-reservasi/').context['slot_events_enabled'], False)
+
+    def test_asgi_request_gets_event_stream(self):
+        request = AsyncRequestFactory().get('/ajax/slot-events/', {'date': timezone.localdate().isoformat()})
+        request.restaurant = self.restaurant
+        response = asyncio.run(slot_events_view(request))
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+
+
+class WarmupTests(TestCase):
+    """Warm-up dijalankan saat worker start: tidak boleh menulis apa pun ke database."""
+
+    def setUp(self):
+        cache.clear()
+        catalog._local.clear()
+
+    def assertNoWrites(self, queries):
+        writes = [q['sql'] for q in queries if q['sql'].lstrip().split(' ', 1)[0].upper() in ('INSERT', 'UPDATE', 'DELETE')]
+        self.assertEqual(writes, [])
+
+    def test_empty_deployment_stays_empty(self):
+        with CaptureQueriesContext(connection) as queries, mock.patch.dict('os.environ', {'RESRESTO_WARMUP': '1', 'RESRESTO_WARMUP_DAYS': '2'}):
+            warmup.run_if_enabled()
+        self.assertNoWrites(queries.captured_queries)
+        self.assertFalse(RestaurantProfile.objects.exists())
+
+    def test_renders_pages_for_existing_branch_without_writes(self):
+        Room.objects.create(restaurant=RestaurantProfile.objects.create(), name="VIP", capacity=10)
+        with CaptureQueriesContext(connection) as queries:
+            results = {name: outcome for name, _, outcome in warmup.run(days=2)}
+        self.assertNoWrites(queries.captured_queries)
+        self.assertEqual(results['pages'], [200, 200])
+
+
+class RateLimitAndLoadSheddingTests(TestCase):
+    """Token bucket per klien per endpoint, dan mode degradasi saat DB lambat."""
+
+    def setUp(self):
+        cache.clear()
+        catalog._local.clear()
+        load._state['ewma_ms'] = 0.0
+        self.addCleanup(load._state.update, ewma_ms=0.0)
+        self.restaurant = RestaurantProfile.objects.create(opening_time=datetime.time(10, 0), closing_time=datetime.time(14, 0))
+        self.room = Room.objects.create(restaurant=self.restaurant, name="VIP", capacity=10)
+        self.date = (timezone.localdate() + datetime.timedelta(days=3)).isoformat()
+
+    def slots(self, **extra):
+        return self.client.get('/ajax/get-time-slots/', {'date': self.date}, **extra)
+
+    @override_settings(RESERVASI_RATE_LIMITS={'reservasi:ajax_get_time_slots': {'rate': 0.01, 'burst': 2}})
+    def test_burst_then_429_with_retry_after_per_client(self):
+        self.assertEqual([self.slots().status_code for _ in range(2)], [200, 200])
+        response = self.slots()
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('error', response.json())
+        self.assertGreaterEqual(int(response['Retry-After']), 1)
+
+        # Klien lain (IP lain, atau user yang login dari IP yang sama) punya bucket sendiri
+        self.assertEqual(self.slots(REMOTE_ADDR='10.0.0.2').status_code, 200)
+        self.client.force_login(User.objects.create_user('budi', password='rahasia'))
+        self.assertEqual(self.slots().status_code, 200)
+
+    def test_client_key_prefers_user_then_session_then_ip(self):
+        request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.9')
+        request.user = mock.Mock(is_authenticated=False)
+        request.session = mock.Mock(session_key='abc')
+        self.assertEqual(RateLimitMiddleware.client_key(request), 'ip:10.0.0.9')
+        self.assertEqual(RateLimitMiddleware.client_key(request, 'session'), 'session:abc')
+        request.user = mock.Mock(is_authenticated=True, pk=7)
+        self.assertEqual(RateLimitMiddleware.client_key(request, 'session'), 'user:7')
+
+    @override_settings(RESERVASI_RATE_LIMITS={'reservasi:create_reservation': {'rate': 0.01, 'burst': 1, 'methods': ['POST']}})
+    def test_methods_filter_limits_only_listed_methods(self):
+        self.assertEqual([self.client.get('/buat-reservasi/').status_code for _ in range(3)], [200, 200, 200])
+        self.assertNotEqual(self.client.post('/buat-reservasi/', {}).status_code, 429)
+        self.assertEqual(self.client.post('/buat-reservasi/', {}).status_code, 429)
+
+    @override_settings(RESERVASI_LOAD_SHEDDING={'DB_LATENCY_THRESHOLD_MS': 0, 'COOLDOWN_SECONDS': 30}, RESERVASI_RATE_LIMITS={})
+    def test_slow_database_switches_to_cached_slots(self):
+        # Ambang 0 ms: query apa pun membuat EWMA melewati ambang
+        fresh = self.slots()
+        self.assertNotIn('stale', fresh.json())
+        self.assertEqual(fresh['X-Load-Shedding'], 'on')
+        self.assertTrue(load.is_degraded())
+
+        with self.assertNumQueries(0):
+            cached = self.slots()
+        self.assertEqual(cached.json(), {'time_slots': fresh.json()['time_slots'], 'stale': True})
+        suggestions = self.client.get('/ajax/suggest-slots/', {'room': self.room.id, 'date': self.date, 'time': '12:00:00', 'guests': 2})
+        self.assertEqual(suggestions.json(), {'suggestions': [], 'degraded': True, 'retry_after': 30})
+        self.assertEqual(suggestions['Retry-After'], '30')
+
+    def test_token_bucket_refills_at_rate_up_to_burst(self):
+        key = 'reservasi:ratelimit:test'
+        self.assertEqual([load.take_token(key, 1, 2, now=0)[0] for _ in range(3)], [True, True, False])
+        self.assertAlmostEqual(load.take_token(key, 1, 2, now=0.25)[1], 0.75)
+        self.assertEqual([load.take_token(key, 1, 2, now=1.5)[0] for _ in range(2)], [True, False])
+        # Lama diam tidak menumpuk token melebihi burst
+        self.assertEqual([load.take_token(key, 1, 2, now=100)[0] for _ in range(3)], [True, True, False])
+
+    def test_concurrent_requests_cannot_exceed_burst(self):
+        start = threading.Barrier(20)
+        allowed = []
+
+        def hit():
+            start.wait()
+            allowed.append(load.take_token('reservasi:ratelimit:serentak', 0.01, 5, now=0)[0])
+
+        pool = [threading.Thread(target=hit) for _ in range(20)]
+        for thread in pool:
+            thread.start()
+        for thread in pool:
+            thread.join()
+        self.assertEqual(allowed.count(True), 5)
+
+    def test_ewma_below_threshold_stays_normal(self):
+        load.record_query_time(5)
+        self.assertFalse(load.is_degraded())
+        self.assertNotIn('X-Load-Shedding', self.slots())
+
+
+class SuggestionTests(TestCase):
+    """Urutan saran alternatif dan batas kapasitas ruangan."""
+
+    def setUp(self):
+        cache.clear()
+        catalog._local.clear()
+        self.restaurant = RestaurantProfile.objects.create(opening_time=datetime.time(10, 0), closing_time=datetime.time(14, 0))
+        self.vip = Room.objects.create(restaurant=self.restaurant, name="VIP", capacity=4, default_duration_minutes=60)
+        self.hall = Room.objects.create(restaurant=self.restaurant, name="Aula", capacity=4, default_duration_minutes=60)
+        self.small = Room.objects.create(restaurant=self.restaurant, name="Kecil", capacity=2, default_duration_minutes=60)
+        self.date = timezone.localdate() + datetime.timedelta(days=3)
+        # VIP penuh pukul 12:00-13:00
+        Reservation.objects.create(
+            restaurant=self.restaurant, room_type=self.vip, guest_name="Penuh", guest_email="penuh@contoh.id",
+            guest_phone="0811", reservation_date=self.date, reservation_time=datetime.time(12, 0), number_of_guests=4,
+        )
+
+    def suggest(self, **kwargs):
+        kwargs.setdefault('limit', 50)
+        kwargs.setdefault('day_window', 1)
+        return [
+            (item['date'], item['time'].strftime('%H:%M'), item['room'].name)
+            for item in suggest_alternatives(self.restaurant, self.vip, self.date, datetime.time(12, 0), 4, **kwargs)
+        ]
+
+    def test_same_day_before_other_room_before_other_day(self):
+        results = self.suggest()
+        next_day = self.date + datetime.timedelta(days=1)
+        self.assertEqual(results[:3], [
+            (self.date, '11:00', 'VIP'),   # 60 menit lebih awal, ruangan sama
+            (self.date, '12:00', 'Aula'),  # jam sama, ruangan lain
+            (self.date, '13:00', 'VIP'),   # 60 menit lebih lambat
+        ])
+        self.assertLess(results.index((self.date, '10:00', 'VIP')), results.index((next_day, '12:00', 'VIP')))
+        distances = [item['distance'] for item in suggest_alternatives(self.restaurant, self.vip, self.date, datetime.time(12, 0), 4, limit=50, day_window=1)]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_capacity_and_overlap_are_respected(self):
+        results = self.suggest()
+        # Ruangan yang terlalu kecil tidak pernah disarankan
+        self.assertNotIn('Kecil', {room for _, _, room in results})
+        # 11:30 dan 12:30 bertumpuk dengan reservasi 12:00-13:00; 11:00 dan 13:00 bersebelahan
+        same_day_vip = {slot for day, slot, room in results if day == self.date and room == 'VIP'}
+        self.assertTrue({'11:00', '13:00'} <= same_day_vip)
+        self.assertFalse({'11:30', '12:00', '12:30'} & same_day_vip)
+
+    def test_non_numeric_package_returns_400(self):
+        response = self.client.get('/ajax/suggest-slots/', {
+            'room': self.vip.id, 'date': self.date.isoformat(), 'time': '12:00:00', 'guests': 4, 'package': 'abc',
+        })
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('error', response.json())
+
+
+class PrecompressedStaticTests(TestCase):
+    """Negosiasi Accept-Encoding untuk file hasil collectstatic."""
+
+    def setUp(self):
+        root = tempfile.TemporaryDirectory()
+        self.addCleanup(root.cleanup)
+        files = {
+            'app.0123456789ab.css': b'body{}', 'app.0123456789ab.css.gz': b'gz', 'app.0123456789ab.css.br': b'br',
+            'logo.png': b'png', 'staticfiles.json': b'{}', 'staticfiles.json.gz': b'gz',
+        }
+        for name, content in files.items():
+            with open(os.path.join(root.name, name), 'wb') as handle:
+                handle.write(content)
+        with override_settings(STATIC_ROOT=root.name, STATIC_URL='static/'):
+            self.middleware = PrecompressedStaticMiddleware(lambda request: HttpResponse(status=404))
+
+    def get(self, path, accept=''):
+        response = self.middleware(RequestFactory().get(path, HTTP_ACCEPT_ENCODING=accept))
+        self.addCleanup(response.close)
+        return response
+
+    def body(self, response):
+        return b''.join(response.streaming_content)
+
+    def test_prefers_br_then_gzip_then_identity(self):
+        path = '/static/app.0123456789ab.css'
+        for accept, encoding, body in (
+            ('gzip, deflate, br', 'br', b'br'),
+            ('gzip, br;q=0', 'gzip', b'gz'),
+            ('deflate', None, b'body{}'),
+            ('', None, b'body{}'),
+        ):
+            response = self.get(path, accept)
+            self.assertEqual(response.get('Content-Encoding'), encoding, accept)
+            self.assertEqual(self.body(response), body)
+            # Tipe konten tetap milik file asli, bukan arsipnya
+            self.assertEqual(response['Content-Type'], 'text/css')
+            self.assertEqual(response['Vary'], 'Accept-Encoding')
+            self.assertEqual(response['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
+
+    def test_variant_requested_directly_is_served_as_archive(self):
+        response = self.get('/static/app.0123456789ab.css.gz', 'gzip')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_manifest_and_paths_outside_static_url_pass_through(self):
+        for path in ('/static/staticfiles.json', '/static/staticfiles.json.gz', '/static/../staticfiles.json', '/logo.png', '/static/tidak-ada.css'):
+            self.assertEqual(self.get(path, 'gzip').status_code, 404, path)
+        self.assertNotEqual(self.get('/static/logo.png')['Cache-Control'], IMMUTABLE_CACHE_CONTROL)
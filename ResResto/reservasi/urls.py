@@ -1,6 +1,5 @@
 from django.urls import path # type: ignore
 from . import views
-from django.contrib.auth import views as auth_views # type: ignore
 
 app_name = 'reservasi'
 
@@ -9,14 +8,25 @@ urlpatterns = [
     path('buat-reservasi/', views.create_reservation_view, name='create_reservation'),
     path('reservasi-sukses/<int:reservation_id>/', views.reservation_success_view, name='reservation_success'),
     path('ajax/get-time-slots/', views.ajax_get_time_slots, name='ajax_get_time_slots'),
+    path('ajax/suggest-slots/', views.ajax_suggest_slots, name='ajax_suggest_slots'),
+    path('ajax/slot-events/', views.slot_events_view, name='slot_events'),
     
     # URL untuk pengguna terdaftar
     path('reservasi-saya/', views.my_reservations_view, name='my_reservations'),
     path('batalkan-reservasi/<int:reservation_id>/', views.cancel_reservation_view, name='cancel_reservation'),
+
+    # URL untuk staf
+    path('staf/cari-reservasi/', views.staff_search_view, name='staff_search'),
+    path('staf/dapur/', views.kitchen_manifest_view, name='kitchen_manifest'),
+
+    # API untuk sistem lain
+    path('api/reservasi/perubahan/', views.reservation_changes_view, name='reservation_changes'),
+    path('api/reservasi/saya/', views.my_reservations_api, name='my_reservations_api'),
+    path('api/dapur/manifest/', views.kitchen_manifest_api, name='kitchen_manifest_api'),
     
     # URL Autentikasi
     path('register/', views.register_view, name='register'),
-    path('login/', auth_views.LoginView.as_view(template_name='registration/login.html'), name='login'), 
+    path('login/', views.login_view, name='login'), 
     path('logout/', views.logout_view, name='logout'), 
     
 ]
\ No newline at end of file
@@ -1,28 +1,45 @@
 from django.shortcuts import render, redirect, get_object_or_404 # type: ignore
 from django.contrib import messages # type: ignore
-from .models import RestaurantProfile, Reservation
+from .models import RestaurantProfile, Reservation, ReservationConflict, Room, FoodPackage
 from .forms import ReservationForm
+from .occupancy import build_slot_grid, load_day_occupancy, total_occupancy
+from .suggestions import suggest_alternatives, serialize_suggestion
+from .search import ranked_reservation_ids, search_reservations, fts_available
+from .schedule import effective_hours
+from . import catalog, changes, kitchen, load, notifications, events
 from django.utils import timezone # type: ignore
 import datetime
-from django.http import JsonResponse # type: ignore
+import logging
+import re
+from django.core.cache import cache # type: ignore
+from django.db import transaction # type: ignore
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse, StreamingHttpResponse # type: ignore
+from django.db.models import Count, F, Max # type: ignore
+from django.views.decorators.http import condition, require_GET # type: ignore
+from django.views.decorators.vary import vary_on_cookie # type: ignore
 from django.contrib.auth.decorators import login_required # type: ignore 
-from django.contrib.auth.forms import UserCreationForm # type: ignore
-from django.contrib.auth import login, authenticate, logout # type: ignore
-from django.db.models import Sum # type: ignore 
+from django.contrib.admin.views.decorators import staff_member_required # type: ignore
+from django.contrib.auth import login, logout # type: ignore
+# django.contrib.auth.forms/views diimpor di dalam view yang memakainya agar
+# tidak ikut dimuat saat worker start (lihat perintah bench_cold_start)
 
-def get_restaurant_profile():
-    profile = RestaurantProfile.objects.first()
+logger = logging.getLogger(__name__)
+
+def get_restaurant_profile(request=None):
+    # Cabang yang sudah ditentukan BranchMiddleware, atau cabang bawaan
+    profile = getattr(request, 'restaurant', None) or catalog.get_profile()
     if not profile:
         profile = RestaurantProfile.objects.create() 
-        messages.warning(None, "Profil restoran default telah dibuat. Harap konfigurasikan di halaman admin.")
+        # messages butuh request, jadi cukup dicatat di log server
+        logger.info("Profil restoran default telah dibuat. Harap konfigurasikan di halaman admin.")
     return profile
 
 def home_view(request):
-    profile = get_restaurant_profile()
-    return render(request, 'reservasi/home.html', {'profile': profile})
+    profile = get_restaurant_profile(request)
+    return render(request, 'reservasi/home.html', {'profile': profile, 'page_cache_version': catalog.page_cache_version(profile.id)})
 
 def create_reservation_view(request):
-    profile = get_restaurant_profile()
+    profile = get_restaurant_profile(request)
     initial_data = {}
     if request.user.is_authenticated:
         initial_data['guest_name'] = request.user.get_full_name() or request.user.username
@@ -30,7 +47,7 @@ def create_reservation_view(request):
         # initial_data['guest_phone'] = # ... jika ada
         
     if request.method == 'POST':
-        form = ReservationForm(request.POST, user=request.user) 
+        form = ReservationForm(request.POST, user=request.user, restaurant=profile) 
         if form.is_valid():
             # Semua logika untuk form yang VALID ada di dalam blok if ini
             reservation = form.save(commit=False)
@@ -56,70 +73,158 @@ def create_reservation_view(request):
                 reservation.status = 'PENDING'
                 messages.success(request, f"Reservasi Anda untuk {reservation.number_of_guests} orang pada {reservation.reservation_date.strftime('%d %B %Y')} pukul {reservation.reservation_time.strftime('%H:%M')} telah diterima dan sedang diproses.")
 
-            reservation.save()
+            # Simpan reservasi dan notifikasinya dalam satu transaksi (outbox);
+            # email dikirim belakangan oleh perintah process_outbox
+            with transaction.atomic():
+                reservation.save()
+                notifications.enqueue(reservation, 'WAITLISTED' if reservation.status == 'WAITLISTED' else 'RECEIVED')
             return redirect('reservasi:reservation_success', reservation_id=reservation.id)
         
         else: # Blok ini dieksekusi jika form.is_valid() adalah False
-            print("-----------------------------------")
-            print("Form is NOT valid. Errors:")
-            for field, errors in form.errors.items():
-                print(f"Field: {field}")
-                for error in errors:
-                    print(f"  - Error: {error}")
-            if form.non_field_errors():
-                print("Non-field errors:")
-                for error in form.non_field_errors():
-                    print(f"  - Error: {error}")
-            
-            print("Cleaned data (jika ada sebagian):")
-            print(form.cleaned_data)
-            print("Data POST:")
-            print(request.POST)
-            print("-----------------------------------")
+            logger.debug(
+                "Form reservasi tidak valid. Errors: %s; cleaned data: %s; data POST: %s",
+                form.errors.as_json(), form.cleaned_data, request.POST,
+            )
             messages.error(request, "Harap perbaiki kesalahan pada form di bawah.")
             
     else: # Jika request.method bukan 'POST' (misalnya 'GET')
-        form = ReservationForm(user=request.user, initial=initial_data) 
+        form = ReservationForm(user=request.user, restaurant=profile, initial=initial_data) 
 
     # Ini akan merender template dengan form (baik form baru untuk GET, 
     # atau form yang tidak valid dengan error untuk POST)
-    return render(request, 'reservasi/create_reservation.html', {'form': form, 'profile': profile})
+    return render(request, 'reservasi/create_reservation.html', {
+        'form': form,
+        'profile': profile,
+        'page_cache_version': catalog.page_cache_version(profile.id),
+        'slot_events_enabled': events.streaming_supported(request),
+    })
 
 def reservation_success_view(request, reservation_id):
-    reservation = get_object_or_404(Reservation, id=reservation_id)
-    return render(request, 'reservasi/reservation_success.html', {'reservation': reservation})
+    profile = get_restaurant_profile(request)
+    reservation = get_object_or_404(Reservation.objects.select_related('guest'), id=reservation_id, restaurant=profile)
+    # Halaman ini bisa dibuka siapa saja lewat id berurutan: riwayat kunjungan
+    # tamu hanya ditampilkan ke pemilik reservasi atau staf.
+    user = request.user
+    can_see_history = user.is_staff or (user.is_authenticated and reservation.user_id == user.pk)
+    visit_number = None
+    if can_see_history and reservation.guest and reservation.guest.visit_count:
+        visit_number = reservation.guest.visit_count + 1
+    return render(request, 'reservasi/reservation_success.html', {
+        'reservation': reservation, 'profile': profile, 'visit_number': visit_number,
+    })
+
+# Ketersediaan slot terakhir per tanggal disimpan di cache; dipakai saat
+# aplikasi dalam mode degradasi (DB lambat) agar endpoint ini tidak ikut membebani DB.
+SLOTS_CACHE_TIMEOUT = 300
+
+
+def slots_cache_key(restaurant_id, date_str):
+    if not re.fullmatch(r'\d{4}-\d{2}-\d{2}', date_str or ''):
+        return None
+    # Versi katalog ikut di kunci: pengecualian jadwal baru langsung berlaku
+    return f'reservasi:{restaurant_id}:slots:{catalog.page_cache_version(restaurant_id)}:{date_str}'
+
+
+def refresh_time_slots_cache(profile, date_str):
+    """Menghitung slot tersedia dan menyimpannya ke cache (dipakai juga oleh warmup)."""
+    slots = get_available_time_slots(date_str, profile)
+    cache_key = slots_cache_key(profile.id, date_str)
+    if cache_key:
+        cache.set(cache_key, slots, SLOTS_CACHE_TIMEOUT)
+    return slots
+
 
 def ajax_get_time_slots(request):
     date_str = request.GET.get('date')
     if not date_str:
         return JsonResponse({'error': 'Tanggal tidak disediakan'}, status=400)
+
+    profile = get_restaurant_profile(request)
+    cache_key = slots_cache_key(profile.id, date_str)
+    if cache_key and load.is_degraded():
+        cached_slots = cache.get(cache_key)
+        if cached_slots is not None:
+            return JsonResponse({'time_slots': cached_slots, 'stale': True})
     
     # Tambahkan try-except di sini untuk menangkap error dari get_available_time_slots
     try:
-        slots = get_available_time_slots(date_str) 
+        slots = refresh_time_slots_cache(profile, date_str)
         return JsonResponse({'time_slots': slots})
     except Exception as e:
-        # Log error ini dengan lebih baik di produksi
-        print(f"Error in ajax_get_time_slots calling get_available_time_slots: {e}")
-        import traceback
-        traceback.print_exc()
+        logger.exception("Gagal mengambil slot waktu untuk %s", date_str)
         return JsonResponse({'error': 'Terjadi kesalahan internal saat mengambil slot waktu.', 'details': str(e)}, status=500)
 
 
-def get_available_time_slots(date_selected_str):
-    profile = get_restaurant_profile()
+def ajax_suggest_slots(request):
+    # Parameter: room, date (YYYY-MM-DD), time (HH:MM:SS), guests, package (opsional)
+    profile = get_restaurant_profile(request)
+    try:
+        room = Room.objects.get(pk=request.GET.get('room'), restaurant=profile)
+        date_selected = datetime.datetime.strptime(request.GET.get('date', ''), '%Y-%m-%d').date()
+        time_selected = datetime.datetime.strptime(request.GET.get('time', ''), '%H:%M:%S').time()
+        num_guests = int(request.GET.get('guests', ''))
+    except (Room.DoesNotExist, ValueError, TypeError):
+        return JsonResponse({'error': 'Parameter room, date, time dan guests wajib diisi dengan benar'}, status=400)
+    package_id = request.GET.get('package', '')
+    if package_id and not package_id.isdigit():
+        return JsonResponse({'error': 'Parameter package harus berupa id paket'}, status=400)
+
+    if load.is_degraded():
+        # Saran bukan hal mendesak; lewati saat database sedang kewalahan dan
+        # minta klien mencoba lagi setelah cooldown (lihat catatan di load.py)
+        retry_after = load.retry_after_seconds()
+        response = JsonResponse({'suggestions': [], 'degraded': True, 'retry_after': retry_after})
+        response['Retry-After'] = str(retry_after)
+        return response
+
+    food_package = None
+    if package_id:
+        food_package = FoodPackage.objects.filter(pk=int(package_id), restaurant=profile).first()
+
+    limit = request.GET.get('limit', '5')
+    limit = min(int(limit), 20) if limit.isdigit() and int(limit) > 0 else 5
+    suggestions = suggest_alternatives(
+        profile, room, date_selected, time_selected, num_guests,
+        food_package=food_package, limit=limit,
+    )
+    return JsonResponse({'suggestions': [serialize_suggestion(s) for s in suggestions]})
+
+
+async def slot_events_view(request):
+    # Server-Sent Events: perubahan sisa kapasitas untuk satu tanggal,
+    # didorong setiap kali ada reservasi yang mengubah okupansi
+    if not events.streaming_supported(request):
+        # 204 membuat EventSource berhenti mencoba lagi; klien beralih ke polling
+        return HttpResponse(status=204)
+    try:
+        date_selected = datetime.datetime.strptime(request.GET.get('date', ''), '%Y-%m-%d').date()
+    except ValueError:
+        return JsonResponse({'error': 'Parameter date (YYYY-MM-DD) wajib diisi'}, status=400)
+    restaurant = getattr(request, 'restaurant', None)
+    if restaurant is None:
+        return JsonResponse({'error': 'Cabang restoran tidak ditemukan'}, status=404)
+
+    channel = events.channel_for_date(restaurant.id, date_selected)
+    response = StreamingHttpResponse(events.event_stream(channel), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # matikan buffering di nginx
+    return response
+
+
+def get_available_time_slots(date_selected_str, profile=None):
+    profile = profile or get_restaurant_profile()
     if not profile: # Tambahkan pengecekan eksplisit jika profile None
-        print("[DEBUG] get_available_time_slots: No restaurant profile found.")
+        logger.debug("get_available_time_slots: profil restoran tidak ditemukan.")
         return []
     
     if not date_selected_str: 
-        print("[DEBUG] get_available_time_slots: date_selected_str is empty.")
+        logger.debug("get_available_time_slots: tanggal kosong.")
         return []
 
     try: 
         date_selected = datetime.datetime.strptime(date_selected_str, '%Y-%m-%d').date()
     except ValueError: 
-        print(f"[DEBUG] get_available_time_slots: Invalid date format for '{date_selected_str}'.")
+        logger.debug("get_available_time_slots: format tanggal tidak valid: %r", date_selected_str)
         return []
     
     available_slots = []
@@ -127,30 +232,23 @@ def get_available_time_slots(date_selected_str):
     # Pastikan opening_time dan closing_time adalah objek time
     if not isinstance(profile.opening_time, datetime.time) or \
        not isinstance(profile.closing_time, datetime.time):
-        print("[DEBUG] get_available_time_slots: opening_time or closing_time is not a valid time object.")
+        logger.debug("get_available_time_slots: jam buka/tutup bukan objek time.")
         # Bisa return error atau default slots
         return []
 
-    current_dt = datetime.datetime.combine(date_selected, profile.opening_time)
-    closing_dt = datetime.datetime.combine(date_selected, profile.closing_time)
-    
-    # Safety break untuk loop
-    max_loops = (24 * 60) / profile.slot_interval_minutes if profile.slot_interval_minutes > 0 else 100 
-    loop_count = 0
+    # Jam efektif tanggal ini (libur, jam Ramadan, dll.) dari kalender ter-cache
+    hours = effective_hours(profile, date_selected)
+    if hours.is_closed:
+        logger.debug("Restoran tutup pada %s (%s).", date_selected, hours.reason)
+        return []
+    grid = build_slot_grid(hours.opening_time, hours.closing_time, hours.interval_minutes)
 
-    while current_dt < closing_dt and loop_count < max_loops:
-        loop_count += 1
-        time_slot = current_dt.time()
-        
-        # aggregate menggunakan 'Sum' yang sudah diimpor
-        existing_reservations = Reservation.objects.filter(
-            reservation_date=date_selected, 
-            reservation_time=time_slot, 
-            status__in=['CONFIRMED', 'PENDING'] # Mungkin Anda juga ingin menghitung PENDING
-        ).aggregate(total_guests=Sum('number_of_guests')) # Menggunakan Sum
-        
-        reserved_guests = existing_reservations['total_guests'] or 0
-        
+    # Satu query untuk seluruh hari, lalu sweep-line: reservasi berdurasi
+    # 2 jam ikut mengurangi sisa kapasitas di semua slot yang dilewatinya.
+    occupancy_by_room = load_day_occupancy(profile.id, date_selected, hours.opening_time, hours.interval_minutes, len(grid))
+    reserved_per_slot = total_occupancy(occupancy_by_room, len(grid))
+
+    for time_slot, reserved_guests in zip(grid, reserved_per_slot):
         if reserved_guests < profile.max_guests_per_slot:
             remaining_capacity = profile.max_guests_per_slot - reserved_guests
             available_slots.append({
@@ -158,22 +256,56 @@ def get_available_time_slots(date_selected_str):
                 'time_display': time_slot.strftime('%H:%M %p'),
                 'remaining_capacity': remaining_capacity
             })
-        current_dt += datetime.timedelta(minutes=profile.slot_interval_minutes)
-    
-    if loop_count >= max_loops:
-        print(f"[DEBUG] get_available_time_slots: Max loop count reached for date {date_selected_str}.")
 
     return available_slots
 
 
 @login_required
 def my_reservations_view(request):
-    reservations = Reservation.objects.filter(user=request.user).order_by('-reservation_date', '-reservation_time')
-    return render(request, 'reservasi/my_reservations.html', {'reservations': reservations})
+    profile = get_restaurant_profile(request)
+    reservations = Reservation.objects.filter(restaurant=profile, user=request.user).order_by('-reservation_date', '-reservation_time')
+    return render(request, 'reservasi/my_reservations.html', {'reservations': reservations, 'profile': profile})
+
+# API JSON untuk aplikasi mobile: reservasi milik user yang login. Dibaca
+# langsung dari values() (tanpa membuat objek model), dan ETag dihitung dari
+# jumlah baris + updated_at terbaru sehingga riwayat yang tidak berubah
+# dijawab 304 tanpa serialisasi sama sekali.
+MY_RESERVATIONS_API_FIELDS = (
+    'id', 'status', 'reservation_date', 'reservation_time', 'number_of_guests',
+    'duration_minutes', 'guest_name', 'guest_email', 'guest_phone', 'special_requests',
+    'room_type_id', 'food_package_id', 'created_at', 'updated_at',
+)
+
+def user_reservations(request):
+    return Reservation.objects.filter(restaurant=get_restaurant_profile(request), user=request.user)
+
+def my_reservations_etag(request):
+    if not request.user.is_authenticated:
+        return None
+    profile = get_restaurant_profile(request)
+    stats = user_reservations(request).aggregate(count=Count('id'), last=Max('updated_at'))
+    last = stats['last'].timestamp() if stats['last'] else 0
+    # Nama ruangan/paket ikut di respons: versi katalog cabang harus ikut di ETag
+    return f"{request.user.pk}-{catalog.page_cache_version(profile.id)}-{stats['count']}-{last:.6f}"
+
+@require_GET
+@vary_on_cookie
+@condition(etag_func=my_reservations_etag)
+def my_reservations_api(request):
+    if not request.user.is_authenticated:
+        return JsonResponse({'error': 'Silakan login terlebih dahulu.'}, status=401)
+    rows = user_reservations(request).order_by('-reservation_date', '-reservation_time').values(
+        *MY_RESERVATIONS_API_FIELDS, room_name=F('room_type__name'), food_package_name=F('food_package__name'),
+    )
+    response = JsonResponse({'reservations': list(rows)})
+    # Boleh disimpan klien, tetapi wajib divalidasi ulang (If-None-Match) setiap kali
+    response['Cache-Control'] = 'private, no-cache'
+    return response
 
 @login_required
 def cancel_reservation_view(request, reservation_id):
-    reservation = get_object_or_404(Reservation, id=reservation_id, user=request.user) 
+    profile = get_restaurant_profile(request)
+    reservation = get_object_or_404(Reservation, id=reservation_id, restaurant=profile, user=request.user) 
     
     # Logika can_cancel dipindahkan ke model atau bisa tetap di sini
     # Untuk konsistensi, jika Anda menggunakan @property di model, gunakan itu.
@@ -190,17 +322,112 @@ def cancel_reservation_view(request, reservation_id):
     if request.method == 'POST':
         if can_cancel:
             reservation.status = 'CANCELLED'
-            reservation.save()
+            try:
+                with transaction.atomic():
+                    reservation.save()  # compare-and-swap pada versi yang dibaca di atas
+                    notifications.enqueue(reservation, 'CANCELLED')
+            except ReservationConflict:
+                messages.error(request, "Reservasi ini baru saja diubah oleh restoran. Silakan periksa statusnya lalu coba lagi.")
+                return redirect('reservasi:my_reservations')
             messages.success(request, "Reservasi Anda telah berhasil dibatalkan.")
         else:
             messages.error(request, "Reservasi ini tidak dapat dibatalkan saat ini.")
         return redirect('reservasi:my_reservations')
     
-    return render(request, 'reservasi/confirm_cancel_reservation.html', {'reservation': reservation, 'can_cancel': can_cancel})
+    return render(request, 'reservasi/confirm_cancel_reservation.html', {'reservation': reservation, 'can_cancel': can_cancel, 'profile': profile})
+
+
+# VIEW UNTUK STAF: pencarian cepat reservasi (meja depan)
+@staff_member_required
+def staff_search_view(request):
+    query = request.GET.get('q', '').strip()
+    limit = request.GET.get('limit', '20')
+    limit = min(int(limit), 100) if limit.isdigit() and int(limit) > 0 else 20
+    if not query:
+        return JsonResponse({'results': []})
+
+    profile = get_restaurant_profile(request)
+    if fts_available():
+        ids = ranked_reservation_ids(query, limit, restaurant_id=profile.id)
+    else:
+        ids = list(search_reservations(Reservation.objects.filter(restaurant=profile), query).values_list('id', flat=True)[:limit])
+
+    rows = Reservation.objects.filter(pk__in=ids, restaurant=profile).values(
+        'id', 'guest_name', 'guest_email', 'guest_phone', 'reservation_date',
+        'reservation_time', 'number_of_guests', 'status', 'room_type__name',
+        # Riwayat tamu untuk meja depan: ikut satu join ke profil tamu
+        'guest__visit_count', 'guest__no_show_count',
+    )
+    # Pertahankan urutan relevansi dari indeks
+    by_id = {row['id']: row for row in rows}
+    return JsonResponse({'results': [by_id[pk] for pk in ids if pk in by_id]})
+
+
+# API UNTUK SISTEM LAIN (POS, kitchen display, analitik): feed perubahan
+# reservasi berbasis cursor. Klien menyimpan `next_since` lalu memanggil lagi
+# dengan ?since=<next_since> sampai has_more bernilai false.
+CHANGE_FEED_MAX_LIMIT = 1000
+
+@staff_member_required
+def reservation_changes_view(request):
+    since = request.GET.get('since', '0')
+    limit = request.GET.get('limit', '500')
+    if not since.isdigit():
+        return JsonResponse({'error': 'Parameter since harus berupa angka seq'}, status=400)
+    limit = min(int(limit), CHANGE_FEED_MAX_LIMIT) if limit.isdigit() and int(limit) > 0 else 500
+
+    profile = get_restaurant_profile(request)
+    # Ambil satu baris lebih untuk mengetahui apakah masih ada halaman berikutnya
+    rows = changes.changes_since(int(since), limit + 1, restaurant_id=profile.id)
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    return JsonResponse({
+        'changes': rows,
+        'next_since': rows[-1]['seq'] if rows else int(since),
+        'has_more': has_more,
+    })
+
+
+# MANIFEST DAPUR: jumlah porsi per paket, slot dan ruangan untuk satu tanggal.
+# Manifest diambil dari cache yang diperbarui setiap kali reservasi berubah
+# (lihat reservasi/kitchen.py), jadi tetap instan saat jam makan ramai.
+def _manifest_date(request):
+    value = request.GET.get('date')
+    if not value:
+        return timezone.localdate()
+    try:
+        return datetime.datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+@staff_member_required
+def kitchen_manifest_view(request):
+    date = _manifest_date(request)
+    if date is None:
+        return HttpResponseBadRequest("Format tanggal tidak valid (YYYY-MM-DD).")
+    profile = get_restaurant_profile(request)
+    return render(request, 'reservasi/kitchen_manifest.html', {
+        'manifest': kitchen.manifest(profile, date),
+        'date': date,
+        'previous_date': date - datetime.timedelta(days=1),
+        'next_date': date + datetime.timedelta(days=1),
+    })
+
+@staff_member_required
+def kitchen_manifest_api(request):
+    date = _manifest_date(request)
+    if date is None:
+        return JsonResponse({'error': 'Format tanggal tidak valid (YYYY-MM-DD).'}, status=400)
+    return JsonResponse(kitchen.manifest(get_restaurant_profile(request), date))
 
 
 # VIEWS UNTUK AUTENTIKASI
+def login_view(request, *args, **kwargs):
+    from django.contrib.auth import views as auth_views # type: ignore
+    return auth_views.LoginView.as_view(template_name='registration/login.html')(request, *args, **kwargs)
+
 def register_view(request):
+    from django.contrib.auth.forms import UserCreationForm # type: ignore
     if request.method == 'POST':
         form = UserCreationForm(request.POST)
         if form.is_valid():
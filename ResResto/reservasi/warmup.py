@@ -0,0 +1,128 @@
+import datetime
+import logging
+import os
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.template import engines
+from django.template.loader import get_template
+from django.urls import get_resolver, reverse
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+# Halaman publik yang dirender sekali saat warm-up. View dipanggil langsung
+# dengan cabang yang sudah ada (lihat warm_pages), jadi tidak ada yang ditulis ke database.
+WARMUP_URLS = ['reservasi:home', 'reservasi:create_reservation']
+
+
+# ===================================================================
+# WARM-UP: isi cache & struktur internal sebelum request pertama
+# ===================================================================
+def _template_names():
+    """Semua nama template .html di direktori template proyek dan aplikasi."""
+    names = set()
+    for engine in engines.all():
+        for directory in engine.template_dirs:
+            root = Path(directory)
+            if root.is_dir():
+                names.update(str(path.relative_to(root)) for path in root.rglob('*.html'))
+    # Template admin bawaan Django tidak perlu: halaman admin jarang jadi request pertama
+    return sorted(name for name in names if not name.startswith('admin/'))
+
+
+def warm_urls():
+    resolver = get_resolver()
+    # Memaksa resolver membangun reverse_dict/namespace untuk semua pola
+    resolver.reverse_dict
+    resolver.namespace_dict
+    for name in WARMUP_URLS:
+        reverse(name)
+    return len(resolver.url_patterns)
+
+
+def warm_templates():
+    names = _template_names()
+    for name in names:
+        # Loader ter-cache menyimpan hasil kompilasi per proses
+        get_template(name)
+    return len(names)
+
+
+def warm_catalog():
+    from . import catalog
+
+    rooms = 0
+    for branch in catalog.get_branches():
+        rooms += len(catalog.get_rooms(branch.id))
+        catalog.get_food_packages(branch.id)
+        catalog.page_cache_version(branch.id)
+    return rooms
+
+
+def warm_time_slots(days):
+    from . import catalog
+    from .views import refresh_time_slots_cache
+
+    today = timezone.localdate()
+    branches = catalog.get_branches()
+    for branch in branches:
+        for offset in range(days):
+            refresh_time_slots_cache(branch, (today + datetime.timedelta(days=offset)).strftime('%Y-%m-%d'))
+    return days * len(branches)
+
+
+def warm_pages():
+    # View dan template dirender lewat RequestFactory, bukan handler penuh:
+    # request.restaurant diisi cabang dari katalog (hanya-baca), sehingga
+    # get_restaurant_profile tidak pernah membuat profil baru pada deployment
+    # yang masih kosong. Tanpa cabang, tidak ada halaman yang dirender.
+    from django.contrib.auth.models import AnonymousUser
+    from django.test import RequestFactory
+    from django.urls import resolve
+    from . import catalog
+
+    host = next((h for h in settings.ALLOWED_HOSTS if h and h != '*' and not h.startswith('.')), 'localhost')
+    factory = RequestFactory(HTTP_HOST=host)
+    statuses = []
+    for branch in catalog.get_branches():
+        for name in WARMUP_URLS:
+            path = reverse(name)
+            request = factory.get(path)
+            request.restaurant = branch
+            request.user = AnonymousUser()
+            statuses.append(resolve(path).func(request).status_code)
+    return statuses
+
+
+def run(days=7):
+    """
+    Menjalankan semua langkah warm-up dan mengembalikan daftar
+    (nama_langkah, detik, hasil). Kegagalan satu langkah tidak menghentikan
+    langkah lain, supaya warm-up tidak pernah menggagalkan start worker.
+    """
+    steps = [
+        ('urls', warm_urls),
+        ('templates', warm_templates),
+        ('catalog', warm_catalog),
+        ('time_slots', lambda: warm_time_slots(days)),
+        ('pages', warm_pages),
+    ]
+    results = []
+    for name, step in steps:
+        start = time.perf_counter()
+        try:
+            outcome = step()
+        except Exception as e:
+            outcome = f"gagal: {type(e).__name__}: {e}"
+        elapsed = time.perf_counter() - start
+        results.append((name, elapsed, outcome))
+        logger.info("Warm-up %s: %.1f ms (%s)", name, elapsed * 1000, outcome)
+    return results
+
+
+def run_if_enabled():
+    """Dipanggil dari wsgi.py/asgi.py; aktif jika RESRESTO_WARMUP=1."""
+    if os.environ.get('RESRESTO_WARMUP') == '1':
+        run(days=int(os.environ.get('RESRESTO_WARMUP_DAYS', '7')))